@@ -0,0 +1,285 @@
+from concurrent.futures import Future
+from typing import List, Dict, Any, Optional, Callable
+import asyncio
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# File names written by `optimum-cli export onnx` and `optimum-cli onnxruntime quantize`,
+# in order of preference
+ONNX_MODEL_FILES = ("model_quantized.onnx", "model.onnx")
+TOKENIZER_FILE = "tokenizer.json"
+
+# OnnxEmbeddings options that change the vectors (the rest only change speed)
+VECTOR_PARAM_KEYS = ("model_file", "max_length", "query_prefix", "document_prefix", "normalize")
+
+
+class MicroBatcher:
+    """
+    Queue that coalesces concurrent single-text requests into batched calls.
+
+    A worker thread takes the first waiting request, then keeps collecting
+    requests for up to max_wait_ms (or until max_batch_size is reached) and
+    answers all of them with one call of the batch function. Under load this
+    turns many one-row forward passes into a few full ones; a lone request
+    waits at most max_wait_ms.
+    """
+
+    def __init__(self,
+                 batch_fn: Callable[[List[str]], np.ndarray],
+                 max_batch_size: int = 32,
+                 max_wait_ms: float = 5.0) -> None:
+        """
+        Start the batching thread.
+
+        Args:
+            batch_fn: Function mapping a list of texts to one vector per text
+            max_batch_size: Maximum number of requests answered by one call
+            max_wait_ms: Time to wait for more requests after the first one
+        """
+
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.requests = 0
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="embedding-micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        """
+        Queue a text for embedding.
+
+        Args:
+            text: Text to embed
+
+        Returns:
+            Future resolving to the text's vector
+        """
+
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def _collect(self) -> List[tuple]:
+        first = self._queue.get()
+        if first is None:
+            return []
+
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Answer what was collected, then stop
+                self._queue.put(None)
+                break
+            batch.append(item)
+
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            if not batch:
+                return
+
+            # Requests cancelled while waiting are dropped from the batch
+            batch = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            try:
+                vectors = self.batch_fn([text for text, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.requests += len(batch)
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
+
+    def stats(self) -> Dict[str, float]:
+        """Return the number of batches, requests and the mean batch size."""
+
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "mean_batch_size": self.requests / self.batches if self.batches else 0.0
+        }
+
+    def close(self) -> None:
+        """Stop the worker thread after the queued requests are answered."""
+
+        self._queue.put(None)
+        self._thread.join()
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    Local sentence embeddings from an ONNX-exported (optionally int8-quantized) model.
+
+    The model directory is the output of `optimum-cli export onnx` (and, for
+    int8, `optimum-cli onnxruntime quantize`): an .onnx file next to the
+    Hugging Face tokenizer.json. Only onnxruntime and tokenizers are needed at
+    run time, so air-gapped deployments embed without an API round-trip.
+
+    Documents are sorted by token length before batching, so each batch is
+    padded only to the length of its own longest text. Queries go through a
+    MicroBatcher, so concurrent queries share one forward pass.
+    """
+
+    def __init__(self,
+                 model_path: str,
+                 model_file: Optional[str] = None,
+                 intra_op_threads: Optional[int] = None,
+                 batch_size: int = 32,
+                 max_length: int = 512,
+                 query_prefix: str = "",
+                 document_prefix: str = "",
+                 normalize: bool = True,
+                 micro_batch_size: int = 32,
+                 micro_batch_wait_ms: float = 5.0) -> None:
+        """
+        Load the model and tokenizer.
+
+        Args:
+            model_path: Directory with the .onnx model and tokenizer.json
+            model_file: Model file name (default: model_quantized.onnx if present, else model.onnx)
+            intra_op_threads: Threads used by one forward pass (default: CPU count);
+                forward passes are serialized, so this is the total used by the model
+            batch_size: Maximum number of documents per forward pass
+            max_length: Maximum number of tokens per text; longer texts are truncated
+            query_prefix: Prefix added to queries (e.g. "query: " for e5 models)
+            document_prefix: Prefix added to documents (e.g. "passage: " for e5 models)
+            normalize: Scale vectors to unit length
+            micro_batch_size: Maximum number of concurrent queries per forward pass
+            micro_batch_wait_ms: Time a query waits for others to share its forward pass;
+                0 disables micro-batching
+
+        Raises:
+            ImportError: If onnxruntime or tokenizers is not installed
+            FileNotFoundError: If the model directory has no model or tokenizer file
+        """
+
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError:
+            raise ImportError(
+                "onnxruntime and tokenizers are required for the ONNX embedding backend. "
+                "Install them with: pip install onnxruntime tokenizers"
+            )
+
+        model_file = model_file or next(
+            (name for name in ONNX_MODEL_FILES if os.path.exists(os.path.join(model_path, name))),
+            ONNX_MODEL_FILES[-1]
+        )
+        for path in (os.path.join(model_path, model_file), os.path.join(model_path, TOKENIZER_FILE)):
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"ONNX embedding model file not found: {path}")
+
+        self.model_path = model_path
+        self.model_file = model_file
+        self.batch_size = batch_size
+        self.query_prefix = query_prefix
+        self.document_prefix = document_prefix
+        self.normalize = normalize
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_path, TOKENIZER_FILE))
+        self.tokenizer.no_padding()
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.pad_id = next(
+            (self.tokenizer.token_to_id(token) for token in ("<pad>", "[PAD]")
+             if self.tokenizer.token_to_id(token) is not None),
+            0
+        )
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads or os.cpu_count() or 1
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        # Idle threads spinning between micro-batches would only steal CPU from the server
+        options.add_session_config_entry("session.intra_op.allow_spinning", "0")
+
+        self.session = ort.InferenceSession(
+            os.path.join(model_path, model_file), sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+        self._run_lock = threading.Lock()
+
+        self.batcher = None
+        if micro_batch_wait_ms > 0:
+            self.batcher = MicroBatcher(self._embed_batch, micro_batch_size, micro_batch_wait_ms)
+
+    def _forward(self, encodings: List[Any]) -> np.ndarray:
+        # Pad to the longest text of this batch only
+        length = max(len(encoding.ids) for encoding in encodings)
+        input_ids = np.full((len(encodings), length), self.pad_id, dtype=np.int64)
+        attention_mask = np.zeros((len(encodings), length), dtype=np.int64)
+        for row, encoding in enumerate(encodings):
+            input_ids[row, :len(encoding.ids)] = encoding.ids
+            attention_mask[row, :len(encoding.ids)] = 1
+
+        feed = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feed["token_type_ids"] = np.zeros_like(input_ids)
+
+        # One forward pass at a time: concurrent runs would oversubscribe the pinned threads
+        with self._run_lock:
+            hidden = self.session.run(None, feed)[0]
+
+        # Mean pooling over real tokens, as sentence-transformers does for e5 models
+        mask = attention_mask[:, :, None].astype(np.float32)
+        vectors = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+
+        if self.normalize:
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        return vectors.astype(np.float32)
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+
+        # Longest first, so each batch holds texts of similar length
+        order = np.argsort([-len(encoding.ids) for encoding in encodings], kind="stable")
+        vectors = None
+        for start in range(0, len(order), self.batch_size):
+            rows = order[start:start + self.batch_size]
+            batch_vectors = self._forward([encodings[row] for row in rows])
+            if vectors is None:
+                vectors = np.empty((len(texts), batch_vectors.shape[1]), dtype=np.float32)
+            vectors[rows] = batch_vectors
+
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return self._embed_batch([self.document_prefix + text for text in texts]).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        if self.batcher is None:
+            return self._embed_batch([self.query_prefix + text])[0].tolist()
+        return self.batcher.submit(self.query_prefix + text).result().tolist()
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await asyncio.get_running_loop().run_in_executor(None, self.embed_documents, texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        if self.batcher is None:
+            return await asyncio.get_running_loop().run_in_executor(None, self.embed_query, text)
+        # Wait on the batcher's future directly instead of holding an executor thread
+        vector = await asyncio.wrap_future(self.batcher.submit(self.query_prefix + text))
+        return vector.tolist()
@@ -1,3 +1,4 @@
+import os
 import streamlit as st
 from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
 from langchain_huggingface import HuggingFacePipeline
@@ -7,6 +8,7 @@ from langchain_core.output_parsers import StrOutputParser
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_community.vectorstores import Chroma
 from langchain.schema.runnable import RunnableLambda, RunnablePassthrough
+from onnx_embeddings import OnnxEmbeddings
 st.set_page_config(page_title="EXAONE-3.5-7.8B-RAG")
 st.title("EXAONE-3.5-7.8B-RAG")
 st.markdown(
@@ -48,9 +50,22 @@ llm = st.session_state.llm
 # RAG, retriever 불러오기
 #########################################
 
+embedding_model_path = 'C://Users//AFOC//Desktop//llm_mark2//models//multilingual-e5-large-instruct'
+# optimum-cli export onnx --model <embedding_model_path> --task feature-extraction <onnx_model_path>
+# (int8: optimum-cli onnxruntime quantize --onnx_model <onnx_model_path> --avx2 -o <onnx_model_path>)
+onnx_model_path = embedding_model_path + '-onnx'
+
+@st.cache_resource
+def load_embeddings():
+    # 모든 세션이 임베딩 모델 하나를 공유 -> 동시에 들어온 질문들은 한 번의 forward pass로 묶여서 처리됨
+    # ONNX 변환 모델이 없으면 기존 HuggingFaceEmbeddings 사용 (mean pooling + 정규화로 같은 벡터가 나옴)
+    if os.path.exists(onnx_model_path):
+        return OnnxEmbeddings(onnx_model_path, intra_op_threads=4)
+    return HuggingFaceEmbeddings(model_name=embedding_model_path)
+
 if "retriever" not in st.session_state:
     persist_directory = 'C://Users//AFOC//Desktop//llm_mark2//langchain-streamlit//vectordb'
-    vectordb = Chroma(persist_directory=persist_directory, embedding_function=HuggingFaceEmbeddings(model_name='C://Users//AFOC//Desktop//llm_mark2//models//multilingual-e5-large-instruct'))
+    vectordb = Chroma(persist_directory=persist_directory, embedding_function=load_embeddings())
     st.session_state.retriever = vectordb.as_retriever(search_kwargs={"k": 4})
 
 retriever = st.session_state.retriever
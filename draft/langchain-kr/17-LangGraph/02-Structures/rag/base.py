@@ -2,6 +2,7 @@ from langchain_core.prompts import load_prompt
 from langchain_core.output_parsers import StrOutputParser
 from langchain_community.vectorstores import FAISS
 from langchain_openai import OpenAIEmbeddings, ChatOpenAI
+from rag.embedding_cache import CachedEmbeddings
 
 from abc import ABC, abstractmethod
 from operator import itemgetter
@@ -28,7 +29,11 @@ class RetrievalChain(ABC):
         return text_splitter.split_documents(docs)
 
     def create_embedding(self):
-        return OpenAIEmbeddings(model="text-embedding-3-small")
+        # 동일한 청크와 질문은 디스크 캐시에서 임베딩을 가져옵니다.
+        return CachedEmbeddings(
+            OpenAIEmbeddings(model="text-embedding-3-small"),
+            model_name="text-embedding-3-small",
+        )
 
     def create_vectorstore(self, split_docs):
         return FAISS.from_documents(
@@ -0,0 +1,417 @@
+from typing import List, Dict, Optional, Iterable
+from array import array
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from langchain_core.embeddings import Embeddings
+
+DEFAULT_CACHE_PATH = os.getenv(
+    "EMBEDDING_CACHE_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "rag-embeddings", "embeddings.sqlite3")
+)
+DEFAULT_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "1000000"))
+
+# SQLite limits the number of bound parameters per statement
+_SQL_BATCH_SIZE = 500
+
+
+class EmbeddingCache:
+    """
+    Content-addressed, on-disk embedding store with LRU eviction.
+
+    Vectors are stored as float32 blobs in SQLite, keyed by a hash of the
+    embedding model name and the input text. Every lookup refreshes the access
+    time of the hit entries, and the least recently used entries are evicted
+    once the store grows past max_entries.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        """
+        Open (or create) an embedding cache.
+
+        Args:
+            path: SQLite database file
+            max_entries: Maximum number of cached vectors before LRU eviction
+        """
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_access ON embeddings (last_access)"
+        )
+        self._conn.commit()
+        self._size = self._count()
+
+    @staticmethod
+    def make_key(namespace: str, text: str) -> str:
+        """
+        Build the cache key of a text.
+
+        Args:
+            namespace: Embedding model name (and query/document kind)
+            text: Input text
+
+        Returns:
+            Hex digest identifying the (namespace, text) pair
+        """
+
+        return hashlib.sha256(f"{namespace}\x00{text}".encode("utf-8")).hexdigest()
+
+    def _count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    @staticmethod
+    def _batches(items: List, size: int = _SQL_BATCH_SIZE) -> Iterable[List]:
+        for start in range(0, len(items), size):
+            yield items[start:start + size]
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        """
+        Look up cached vectors and refresh their access time.
+
+        Args:
+            keys: Cache keys
+
+        Returns:
+            Mapping of found keys to their vectors
+        """
+
+        found: Dict[str, List[float]] = {}
+        unique_keys = list(dict.fromkeys(keys))
+
+        with self._lock:
+            for batch in self._batches(unique_keys):
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self._conn.commit()
+
+            self.hits += sum(1 for key in keys if key in found)
+            self.misses += sum(1 for key in keys if key not in found)
+
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]) -> None:
+        """
+        Store vectors, evicting least recently used entries if the cache is full.
+
+        Args:
+            items: Mapping of cache keys to vectors
+        """
+
+        if not items:
+            return
+
+        now = time.time()
+        rows = [(key, array("f", vector).tobytes(), now) for key, vector in items.items()]
+
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)", rows
+            )
+            self._conn.commit()
+            self._size += self._conn.total_changes - before
+
+            if self._size > self.max_entries:
+                self._evict()
+
+    def _evict(self) -> None:
+        # Other processes may share the file, so recount before evicting
+        self._size = self._count()
+        excess = self._size - self.max_entries
+        if excess <= 0:
+            return
+
+        # Evict an extra 10% so eviction does not run on every insert
+        limit = excess + self.max_entries // 10
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE key IN "
+            "(SELECT key FROM embeddings ORDER BY last_access LIMIT ?)",
+            (limit,)
+        )
+        self._conn.commit()
+        self._size = self._count()
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Return cache counters.
+
+        Returns:
+            Dictionary with hits, misses, hit_rate and size
+        """
+
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": self._size
+        }
+
+    def clear(self) -> None:
+        """Delete all cached vectors and reset the counters."""
+
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self._size = 0
+            self.hits = 0
+            self.misses = 0
+
+
+_caches: Dict[str, EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_embedding_cache(path: Optional[str] = None) -> EmbeddingCache:
+    """
+    Return the process-wide cache stored at path, opening it on first use.
+
+    Args:
+        path: SQLite database file (default: EMBEDDING_CACHE_PATH)
+
+    Returns:
+        A shared EmbeddingCache instance
+    """
+
+    path = os.path.abspath(path or DEFAULT_CACHE_PATH)
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = EmbeddingCache(path)
+        return _caches[path]
+
+
+# Models that embed a query exactly like a document (embed_query is
+# embed_documents([text])[0]), matched by class name so that their optional
+# packages need not be imported
+SYMMETRIC_EMBEDDINGS = (
+    "OpenAIEmbeddings",
+    "AzureOpenAIEmbeddings",
+    "DeterministicFakeEmbedding",
+    "FakeEmbeddings",
+)
+
+
+def embeds_queries_as_documents(embeddings: Embeddings) -> bool:
+    """Whether the model applies no query/document prefix, so queries can go through embed_documents."""
+
+    return any(cls.__name__ in SYMMETRIC_EMBEDDINGS for cls in type(embeddings).__mro__)
+
+
+def embed_queries(embeddings: Embeddings, texts: List[str]) -> List[List[float]]:
+    """
+    Embed several search queries as queries, not as documents.
+
+    Models with a batched embed_queries method (e.g. local models applying a
+    query prefix) embed them together, and models in SYMMETRIC_EMBEDDINGS
+    embed them in one embed_documents request; others embed one query at a
+    time.
+
+    Args:
+        embeddings: Embedding model
+        texts: Query texts
+
+    Returns:
+        One vector per query
+    """
+
+    if hasattr(embeddings, "embed_queries"):
+        return embeddings.embed_queries(texts)
+    if embeds_queries_as_documents(embeddings):
+        return embeddings.embed_documents(texts)
+    return [embeddings.embed_query(text) for text in texts]
+
+
+async def aembed_queries(embeddings: Embeddings, texts: List[str]) -> List[List[float]]:
+    """Async version of embed_queries."""
+
+    if hasattr(embeddings, "aembed_queries"):
+        return await embeddings.aembed_queries(texts)
+    if embeds_queries_as_documents(embeddings):
+        return await embeddings.aembed_documents(texts)
+    return list(await asyncio.gather(*(embeddings.aembed_query(text) for text in texts)))
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that serves repeated texts from an EmbeddingCache.
+
+    Document and query embeddings are cached under separate namespaces, since
+    some models embed queries and passages differently.
+    """
+
+    def __init__(self,
+                 embeddings: Embeddings,
+                 model_name: str,
+                 cache: Optional[EmbeddingCache] = None) -> None:
+        """
+        Wrap an embedding model with a cache.
+
+        Args:
+            embeddings: Underlying embedding model
+            model_name: Model name used in the cache key
+            cache: Embedding cache (default: the shared cache at EMBEDDING_CACHE_PATH)
+        """
+
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.cache = cache or get_embedding_cache()
+
+    def _keys(self, kind: str, texts: List[str]) -> List[str]:
+        namespace = f"{self.model_name}:{kind}"
+        return [EmbeddingCache.make_key(namespace, text) for text in texts]
+
+    def _missing(self, keys: List[str], texts: List[str], found: Dict[str, List[float]]) -> Dict[str, str]:
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        return missing
+
+    async def _aget_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        # SQLite may wait up to its busy timeout for another process; keep that off the event loop
+        return await asyncio.get_running_loop().run_in_executor(None, self.cache.get_many, keys)
+
+    async def _aput_many(self, items: Dict[str, List[float]]) -> None:
+        await asyncio.get_running_loop().run_in_executor(None, self.cache.put_many, items)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed documents, computing only the texts that are not cached.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            One vector per text
+        """
+
+        keys = self._keys("document", texts)
+        found = self.cache.get_many(keys)
+
+        missing = self._missing(keys, texts, found)
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            self.cache.put_many(computed)
+            found.update(computed)
+
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Embed a query, serving it from the cache if it was seen before.
+
+        Args:
+            text: Query text
+
+        Returns:
+            Query vector
+        """
+
+        key = self._keys("query", [text])[0]
+        found = self.cache.get_many([key])
+        if key in found:
+            return found[key]
+
+        vector = self.embeddings.embed_query(text)
+        self.cache.put_many({key: vector})
+        return vector
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed several queries, computing only the ones that are not cached.
+
+        Args:
+            texts: Query texts
+
+        Returns:
+            One vector per query
+        """
+
+        keys = self._keys("query", texts)
+        found = self.cache.get_many(keys)
+
+        missing = self._missing(keys, texts, found)
+        if missing:
+            vectors = embed_queries(self.embeddings, list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            self.cache.put_many(computed)
+            found.update(computed)
+
+        return [found[key] for key in keys]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Async version of embed_documents."""
+
+        keys = self._keys("document", texts)
+        found = await self._aget_many(keys)
+
+        missing = self._missing(keys, texts, found)
+        if missing:
+            vectors = await self.embeddings.aembed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            await self._aput_many(computed)
+            found.update(computed)
+
+        return [found[key] for key in keys]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Async version of embed_query."""
+
+        key = self._keys("query", [text])[0]
+        found = await self._aget_many([key])
+        if key in found:
+            return found[key]
+
+        vector = await self.embeddings.aembed_query(text)
+        await self._aput_many({key: vector})
+        return vector
+
+    async def aembed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Async version of embed_queries."""
+
+        keys = self._keys("query", texts)
+        found = await self._aget_many(keys)
+
+        missing = self._missing(keys, texts, found)
+        if missing:
+            vectors = await aembed_queries(self.embeddings, list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            await self._aput_many(computed)
+            found.update(computed)
+
+        return [found[key] for key in keys]
+
+    def stats(self) -> Dict[str, float]:
+        """Return the hit/miss counters of the underlying cache."""
+
+        return self.cache.stats()
@@ -1,4 +1,5 @@
 import streamlit as st
+from stream_renderer import StreamRenderer
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.messages import ChatMessage
 from langchain_core.prompts import PromptTemplate
@@ -68,8 +69,10 @@ if user_input := st.chat_input():
         stream_response = st.session_state["chain"].stream(
             {"question": user_input}
         )  # 문서에 대한 질의
-        ai_answer = ""
+        # 토큰을 모아 두었다가 50ms 간격으로만 다시 그린다.
+        renderer = StreamRenderer(chat_container)
         for chunk in stream_response:
-            ai_answer += chunk
-            chat_container.markdown(ai_answer)
+            renderer.write(chunk)
+        ai_answer = renderer.close()
+        st.caption(renderer.format_stats())
         add_history("ai", ai_answer)
@@ -0,0 +1,291 @@
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+import json
+import os
+import threading
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from langchain_core.runnables import RunnableConfig
+
+try:
+    import tiktoken
+
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception:
+    # Without tiktoken (or its encoding files) fall back to ~4 characters per token
+    _encoding = None
+
+# Tokens of conversation kept verbatim in the prompt
+DEFAULT_MAX_TOKENS = int(os.getenv("HISTORY_MAX_TOKENS", "4000"))
+# Share of max_tokens left verbatim after older turns are folded into the summary,
+# so a summary is generated every few turns rather than on every turn
+DEFAULT_KEEP_RATIO = float(os.getenv("HISTORY_KEEP_RATIO", "0.5"))
+
+# Per-message overhead of the chat format (role, separators)
+_MESSAGE_OVERHEAD = 4
+
+SUMMARY_PROMPT = (
+    "Progressively summarize the conversation below, adding onto the previous summary. "
+    "Keep facts, names, numbers, decisions and open questions; drop small talk. "
+    "Answer with the new summary only, in the language of the conversation.\n\n"
+    "Previous summary:\n{summary}\n\n"
+    "New lines of conversation:\n{conversation}"
+)
+
+
+@lru_cache(maxsize=8192)
+def _count_text(text: str) -> int:
+    if _encoding is None:
+        return len(text) // 4 + 1
+    return len(_encoding.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(message: BaseMessage) -> int:
+    """
+    Return the (approximate) token count of a message.
+
+    Counts are cached by message text, so messages replayed on every turn are
+    only tokenized once.
+    """
+
+    content = message.content
+    if not isinstance(content, str):
+        content = json.dumps(content, ensure_ascii=False)
+    tokens = _count_text(content) + _MESSAGE_OVERHEAD
+    if isinstance(message, AIMessage) and message.tool_calls:
+        tokens += _count_text(json.dumps(message.tool_calls, ensure_ascii=False))
+    return tokens
+
+
+def _render(messages: Sequence[BaseMessage]) -> str:
+    lines = []
+    for message in messages:
+        content = message.text() if hasattr(message, "text") else str(message.content)
+        if isinstance(message, AIMessage) and message.tool_calls:
+            calls = ", ".join(f"{call['name']}({json.dumps(call['args'], ensure_ascii=False)})"
+                              for call in message.tool_calls)
+            content = f"{content}\n[tool calls: {calls}]".strip()
+        lines.append(f"{message.type}: {content}")
+    return "\n".join(lines)
+
+
+@dataclass
+class _Conversation:
+    summary: str = ""
+    # Number of leading messages folded into the summary
+    covered: int = 0
+    pending: Optional[Future] = None
+
+
+class HistoryManager:
+    """
+    Token-budgeted view of growing conversations with a rolling summary.
+
+    prepare() returns what is sent to the model: the summary of older turns
+    followed by the most recent turns, verbatim, within max_tokens. Turns are
+    cut at human messages only, so tool calls stay next to their results.
+    Once turns fall out of the budget they are folded into the summary by a
+    background thread while the current turn runs; until the summary is
+    ready they are simply left out, so a turn never waits for it.
+
+    Conversations are told apart by a key (session_id or thread_id). Message
+    lists must be append-only, as ChatMessageHistory and LangGraph's
+    add_messages state are.
+    """
+
+    def __init__(self,
+                 max_tokens: int = DEFAULT_MAX_TOKENS,
+                 keep_ratio: float = DEFAULT_KEEP_RATIO,
+                 count_tokens: Callable[[BaseMessage], int] = count_message_tokens) -> None:
+        """
+        Args:
+            max_tokens: Tokens of recent conversation kept verbatim
+            keep_ratio: Share of max_tokens kept verbatim after a summarization
+            count_tokens: Token counter for one message
+        """
+
+        self.max_tokens = max_tokens
+        self.keep_ratio = keep_ratio
+        self.count_tokens = count_tokens
+        self._conversations: Dict[str, _Conversation] = {}
+        self._lock = threading.Lock()
+
+    def prepare(self,
+                key: str,
+                messages: Sequence[BaseMessage],
+                summarizer: Optional[BaseChatModel] = None) -> List[BaseMessage]:
+        """
+        Return the messages to send to the model for a conversation.
+
+        Args:
+            key: Conversation ID
+            messages: Full conversation so far
+            summarizer: Chat model folding old turns into the summary; without
+                one, old turns are only trimmed
+
+        Returns:
+            Summary system message (if any) followed by the recent messages
+        """
+
+        summary, recent = self._trim(key, messages, summarizer)
+        if summary:
+            return [SystemMessage(content=f"Summary of the earlier conversation:\n{summary}")] + recent
+        return recent
+
+    def _trim(self,
+              key: str,
+              messages: Sequence[BaseMessage],
+              summarizer: Optional[BaseChatModel]) -> Tuple[str, List[BaseMessage]]:
+        with self._lock:
+            conversation = self._conversations.setdefault(key, _Conversation())
+            self._collect(conversation)
+            # The conversation was cleared or replaced
+            if conversation.covered > len(messages):
+                conversation.summary, conversation.covered = "", 0
+
+            tail = list(messages[conversation.covered:])
+            tokens = [self.count_tokens(message) for message in tail]
+            start = self._fit(tail, tokens, self.max_tokens)
+
+            if start and summarizer is not None and conversation.pending is None:
+                # Fold further than needed, so the next turns fit without a new summary
+                fold = max(start, self._fit(tail, tokens, int(self.max_tokens * self.keep_ratio)))
+                conversation.pending = _get_executor().submit(
+                    self._summarize, summarizer, conversation.summary, tail[:fold], conversation.covered + fold
+                )
+
+            return conversation.summary, tail[start:]
+
+    @staticmethod
+    def _fit(messages: List[BaseMessage], tokens: List[int], budget: int) -> int:
+        # Earliest turn start from which the rest fits the budget; the last turn is always kept
+        turn_starts = [i for i, message in enumerate(messages) if isinstance(message, HumanMessage)]
+        remaining = sum(tokens)
+        if remaining <= budget or not turn_starts:
+            return 0
+        previous = 0
+        for i in turn_starts:
+            remaining -= sum(tokens[previous:i])
+            previous = i
+            if remaining <= budget:
+                return i
+        return turn_starts[-1]
+
+    @staticmethod
+    def _summarize(summarizer: BaseChatModel,
+                   summary: str,
+                   messages: List[BaseMessage],
+                   covered: int) -> Tuple[str, int]:
+        response = summarizer.invoke(
+            SUMMARY_PROMPT.format(summary=summary or "(none)", conversation=_render(messages))
+        )
+        return response.text() if hasattr(response, "text") else str(response.content), covered
+
+    @staticmethod
+    def _collect(conversation: _Conversation) -> None:
+        if conversation.pending is None or not conversation.pending.done():
+            return
+        future, conversation.pending = conversation.pending, None
+        try:
+            conversation.summary, conversation.covered = future.result()
+        except Exception:
+            # Keep the old summary; the next turn schedules a new attempt
+            pass
+
+    def as_prompt(self,
+                  system_prompt: str,
+                  summarizer: Optional[BaseChatModel] = None) -> Callable[..., List[BaseMessage]]:
+        """
+        Return a LangGraph create_react_agent prompt trimming the message state per thread_id.
+
+        Args:
+            system_prompt: System prompt sent before the summary and recent messages
+            summarizer: Chat model generating the rolling summary
+        """
+
+        def prompt(state: Dict[str, Any], config: RunnableConfig) -> List[BaseMessage]:
+            thread_id = config.get("configurable", {}).get("thread_id", "default")
+            summary, recent = self._trim(thread_id, state["messages"], summarizer)
+            # Merged into one system message, since some models accept only one
+            if summary:
+                system_prompt_with_summary = f"{system_prompt}\n\nSummary of the earlier conversation:\n{summary}"
+                return [SystemMessage(content=system_prompt_with_summary)] + recent
+            return [SystemMessage(content=system_prompt)] + recent
+
+        return prompt
+
+    def forget(self, key: str) -> None:
+        """Drop the summary of a conversation."""
+
+        with self._lock:
+            conversation = self._conversations.pop(key, None)
+        if conversation is not None and conversation.pending is not None:
+            conversation.pending.cancel()
+
+    def stats(self, key: str) -> Dict[str, Any]:
+        """Return the summarized message count and whether a summary is being generated."""
+
+        with self._lock:
+            conversation = self._conversations.get(key, _Conversation())
+            return {
+                "summarized_messages": conversation.covered,
+                "summary_tokens": _count_text(conversation.summary) if conversation.summary else 0,
+                "summarizing": conversation.pending is not None,
+            }
+
+
+class SummarizingChatMessageHistory(BaseChatMessageHistory):
+    """
+    Chat history for RunnableWithMessageHistory that sends a token-budgeted view.
+
+    The full conversation is still stored in the wrapped history; only the
+    messages read by the chain go through HistoryManager.prepare().
+    """
+
+    def __init__(self,
+                 history: BaseChatMessageHistory,
+                 manager: HistoryManager,
+                 key: str,
+                 summarizer: Optional[BaseChatModel] = None) -> None:
+        self.history = history
+        self.manager = manager
+        self.key = key
+        self.summarizer = summarizer
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        return self.manager.prepare(self.key, self.history.messages, self.summarizer)
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        self.history.add_messages(messages)
+
+    def clear(self) -> None:
+        self.history.clear()
+        self.manager.forget(self.key)
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_manager: Optional[HistoryManager] = None
+_singleton_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _singleton_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="history-summarizer")
+        return _executor
+
+
+def get_history_manager() -> HistoryManager:
+    """Return the process-wide history manager."""
+
+    global _manager
+    with _singleton_lock:
+        if _manager is None:
+            _manager = HistoryManager()
+        return _manager
@@ -1,6 +1,8 @@
 from urllib import response
 from requests import session
 import streamlit as st
+from stream_renderer import StreamRenderer
+from history_manager import HistoryManager, SummarizingChatMessageHistory
 from langchain_core.messages.chat import ChatMessage
 from langchain_openai import ChatOpenAI
 from langchain_teddynote import logging
@@ -42,6 +44,10 @@ if "messages" not in st.session_state:
 if "store" not in st.session_state:
     st.session_state["store"] = {}
 
+# 최근 대화만 토큰 예산 안에서 그대로 보내고, 이전 대화는 요약으로 압축
+if "history_manager" not in st.session_state:
+    st.session_state["history_manager"] = HistoryManager()
+
 
 # 사이드바 생성
 with st.sidebar:
@@ -71,7 +77,13 @@ def get_session_history(session_ids):
     if session_ids not in st.session_state["store"]:  # 세션 ID가 store에 없는 경우
         # 새로운 ChatMessageHistory 객체를 생성하여 store에 저장
         st.session_state["store"][session_ids] = ChatMessageHistory()
-    return st.session_state["store"][session_ids]  # 해당 세션 ID에 대한 세션 기록 반환
+    # 전체 기록은 store 에 그대로 두고, 체인에는 요약 + 최근 대화만 전달
+    return SummarizingChatMessageHistory(
+        st.session_state["store"][session_ids],
+        st.session_state["history_manager"],
+        session_ids,
+        summarizer=ChatOpenAI(model_name="gpt-4o-mini"),
+    )  # 해당 세션 ID에 대한 세션 기록 반환
 
 
 # 체인 생성
@@ -140,10 +152,12 @@ if user_input:
             # 빈 공간(컨테이너)을 만들어서, 여기에 토큰을 스트리밍 출력한다.
             container = st.empty()
 
-            ai_answer = ""
+            # 토큰을 모아 두었다가 50ms 간격으로만 다시 그린다.
+            renderer = StreamRenderer(container)
             for token in response:
-                ai_answer += token
-                container.markdown(ai_answer)
+                renderer.write(token)
+            ai_answer = renderer.close()
+            st.caption(renderer.format_stats())
 
             # 대화기록을 저장한다.
             add_message("user", user_input)
@@ -1,8 +1,10 @@
 from attr import dataclass
+import uuid
 import streamlit as st
 from langchain_core.messages.chat import ChatMessage
 from langchain_teddynote import logging
 from react_agent import create_agent_executor
+from sqlite_checkpointer import get_checkpointer
 from dotenv import load_dotenv
 from stream_handler import stream_handler, format_search_result
 from custom_tools import WebSearchTool
@@ -23,6 +25,10 @@ if "messages" not in st.session_state:
 if "react_agent" not in st.session_state:
     st.session_state["react_agent"] = None
 
+# 대화 스레드 ID 초기화 (체크포인터를 모든 세션이 공유하므로 세션마다 고유하게)
+if "thread_id" not in st.session_state:
+    st.session_state["thread_id"] = str(uuid.uuid4())
+
 # include_domains 초기화
 if "include_domains" not in st.session_state:
     st.session_state["include_domains"] = []
@@ -110,6 +116,9 @@ def add_message(role, message, msg_type="text", tool_name=""):
 # 초기화 버튼이 눌리면...
 if clear_btn:
     st.session_state["messages"] = []
+    # 에이전트 메모리도 비우고 새 스레드로 시작
+    get_checkpointer().delete_thread(st.session_state["thread_id"])
+    st.session_state["thread_id"] = str(uuid.uuid4())
 
 # 이전 대화 기록 출력
 print_messages()
@@ -137,7 +146,7 @@ if user_input:
     # Config 설정
 
     if agent is not None:
-        config = {"configurable": {"thread_id": "abc123"}}
+        config = {"configurable": {"thread_id": st.session_state["thread_id"]}}
 
         system_message = (
             "한글로 친절하게 답변하세요. 최대한 자세하게 전문적인 어조로 답변하세요"
@@ -1,14 +1,14 @@
 from typing import Any, List
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage
-from langgraph.checkpoint.memory import MemorySaver
+from sqlite_checkpointer import get_checkpointer
 from langgraph.prebuilt import create_react_agent
 from custom_tools import WebSearchTool
 
 
 def create_agent_executor(model_name="gpt-4o-mini", tools=[]):
-    # 메모리 설정
-    memory = MemorySaver()
+    # 메모리 설정 (디스크에 저장되는 프로세스 공용 체크포인터, thread_id 로 대화 구분)
+    memory = get_checkpointer()
 
     # 모델 설정
     model = ChatOpenAI(model_name=model_name)
@@ -1,4 +1,5 @@
 import streamlit as st
+from stream_renderer import StreamRenderer
 
 
 def get_current_tool_message(tool_args, tool_call_id):
@@ -28,8 +29,8 @@ def format_search_result(results):
 def stream_handler(streamlit_container, agent_executor, inputs, config):
     # 결과를 저장할 리스트 초기화
     tool_args = []
-    agent_answer = ""
-    agent_message = None  # agent_message 변수를 미리 선언
+    # 에이전트 메시지 영역은 첫 메시지가 도착할 때 생성 (TTFT 는 지금부터 측정)
+    agent_renderer = StreamRenderer(st.empty)
 
     container = streamlit_container.container()
     with container:
@@ -70,10 +71,11 @@ def stream_handler(streamlit_container, agent_executor, inputs, config):
 
             if metadata["langgraph_node"] == "agent":
                 if chunk_msg.content:
-                    if agent_message is None:
-                        agent_message = st.empty()
-                    # 에이전트 메시지 누적
-                    agent_answer += chunk_msg.content
-                    agent_message.markdown(agent_answer)
+                    # 에이전트 메시지 누적 (50ms 간격으로만 다시 그린다)
+                    agent_renderer.write(chunk_msg.content)
+
+        agent_answer = agent_renderer.close()
+        if agent_renderer.tokens:
+            st.caption(agent_renderer.format_stats())
 
         return container, tool_args, agent_answer
@@ -1,6 +1,7 @@
 import os
 from dotenv import load_dotenv
 import streamlit as st
+from stream_renderer import StreamRenderer
 from langchain_core.messages.chat import ChatMessage
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
@@ -144,10 +145,12 @@ if user_input:
         # 빈 공간(컨테이너)을 만들어서, 여기에 토큰을 스트리밍 출력한다.
         container = st.empty()
 
-        ai_answer = ""
+        # 토큰을 모아 두었다가 50ms 간격으로만 다시 그린다.
+        renderer = StreamRenderer(container)
         for token in response:
-            ai_answer += token
-            container.markdown(ai_answer)
+            renderer.write(token)
+        ai_answer = renderer.close()
+        st.caption(renderer.format_stats())
 
     # 대화기록을 저장한다.
     add_message("user", user_input)
@@ -1,4 +1,5 @@
 import streamlit as st
+from stream_renderer import StreamRenderer
 from langchain_core.messages.chat import ChatMessage
 from rag.pdf import PDFRetrievalChain
 from langchain_teddynote import logging
@@ -147,10 +148,12 @@ if user_input:
             # 빈 공간(컨테이너)을 만들어서, 여기에 토큰을 스트리밍 출력한다.
             container = st.empty()
 
-            ai_answer = ""
+            # 토큰을 모아 두었다가 50ms 간격으로만 다시 그린다.
+            renderer = StreamRenderer(container)
             for token in response:
-                ai_answer += token
-                container.markdown(ai_answer)
+                renderer.write(token)
+            ai_answer = renderer.close()
+            st.caption(renderer.format_stats())
 
             # RAGAS 평가를 위한 결과 저장
             evaluator.add_sample(user_input, ai_answer, context)
@@ -0,0 +1,174 @@
+from typing import Any, Dict, List, Optional
+import time
+
+# Defaults: re-render at most every 50 ms, or sooner once this much text is waiting
+DEFAULT_FLUSH_INTERVAL = 0.05
+DEFAULT_FLUSH_CHARS = 2000
+
+
+class StreamRenderer:
+    """
+    Coalesced markdown renderer for streamed tokens.
+
+    Re-rendering the whole answer on every token costs O(n^2) in the answer
+    length and sends one websocket message per token. Tokens are appended to
+    a list instead, and the placeholder is re-rendered only when
+    flush_interval has passed since the last render or flush_chars of text
+    are waiting, so the number of renders is bounded by the stream duration
+    rather than the token count. Time to first token and tokens per second
+    (streamed chunks per second) are measured along the way.
+    """
+
+    def __init__(self,
+                 placeholder: Any,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 flush_chars: int = DEFAULT_FLUSH_CHARS) -> None:
+        """
+        Args:
+            placeholder: Streamlit element to render into (e.g. st.empty()), or
+                a function creating it, called at the first render
+            flush_interval: Minimum seconds between two renders
+            flush_chars: Pending characters that force a render
+        """
+
+        self._placeholder = placeholder
+        self.flush_interval = flush_interval
+        self.flush_chars = flush_chars
+        self.parts: List[str] = []
+        self.tokens = 0
+        self.renders = 0
+        self.started = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+        self.last_token_at: Optional[float] = None
+        self._pending_chars = 0
+        self._last_flush = 0.0
+
+    @property
+    def placeholder(self) -> Any:
+        if callable(self._placeholder):
+            self._placeholder = self._placeholder()
+        return self._placeholder
+
+    @property
+    def text(self) -> str:
+        return "".join(self.parts)
+
+    def write(self, token: str) -> None:
+        """Append a token, re-rendering if the time or size budget is used up."""
+
+        if not token:
+            return
+        now = time.perf_counter()
+        if self.first_token_at is None:
+            self.first_token_at = now
+        self.last_token_at = now
+        self.tokens += 1
+        self.parts.append(token)
+        self._pending_chars += len(token)
+
+        if now - self._last_flush >= self.flush_interval or self._pending_chars >= self.flush_chars:
+            self.flush()
+
+    def flush(self) -> None:
+        """Render the pending text now."""
+
+        if not self._pending_chars:
+            return
+        # Join once per render, and keep the joined string as the only part
+        text = self.text
+        self.parts = [text]
+        self.placeholder.markdown(text)
+        self.renders += 1
+        self._pending_chars = 0
+        self._last_flush = time.perf_counter()
+
+    def close(self) -> str:
+        """Render the remaining text and return the full answer."""
+
+        self.flush()
+        return self.text
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        """Return the token count, time to first token, tokens per second and render count."""
+
+        ttft = self.first_token_at - self.started if self.first_token_at is not None else None
+        duration = (self.last_token_at - self.first_token_at) if self.first_token_at is not None else 0.0
+        return {
+            "tokens": self.tokens,
+            "ttft": ttft,
+            "tokens_per_second": (self.tokens - 1) / duration if duration > 0 else None,
+            "renders": self.renders
+        }
+
+    def format_stats(self) -> str:
+        stats = self.stats()
+        if stats["ttft"] is None:
+            return "No tokens received"
+        text = f"⚡ TTFT {stats['ttft']:.2f}s · {stats['tokens']} tokens"
+        if stats["tokens_per_second"] is not None:
+            text += f" · {stats['tokens_per_second']:.1f} tokens/s"
+        return text
+
+
+class BlockStreamRenderer:
+    """
+    Incremental renderer for a sequence of markdown blocks (e.g. tool calls and results).
+
+    Finished blocks are rendered once as their own element and never again;
+    only the live block (streamed with write(), e.g. partial tool-call JSON)
+    is re-rendered, through a StreamRenderer.
+    """
+
+    def __init__(self,
+                 container: Any,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 flush_chars: int = DEFAULT_FLUSH_CHARS) -> None:
+        """
+        Args:
+            container: Streamlit container the blocks are added to, or a
+                function creating it, called when the first block arrives
+            flush_interval: Minimum seconds between two renders of the live block
+            flush_chars: Pending characters that force a render of the live block
+        """
+
+        self._container = container
+        self.flush_interval = flush_interval
+        self.flush_chars = flush_chars
+        self.blocks: List[str] = []
+        self._live: Optional[StreamRenderer] = None
+
+    @property
+    def container(self) -> Any:
+        if callable(self._container):
+            self._container = self._container()
+        return self._container
+
+    @property
+    def text(self) -> str:
+        live = [self._live.text] if self._live is not None else []
+        return "".join(self.blocks + live)
+
+    def write(self, token: str) -> None:
+        """Append a token to the live block."""
+
+        if self._live is None:
+            self._live = StreamRenderer(self.container.empty(), self.flush_interval, self.flush_chars)
+        self._live.write(token)
+
+    def add_block(self, block: str) -> None:
+        """Close the live block and render a finished block."""
+
+        self._close_live()
+        self.blocks.append(block)
+        self.container.markdown(block)
+
+    def _close_live(self) -> None:
+        if self._live is not None:
+            self.blocks.append(self._live.close())
+            self._live = None
+
+    def close(self) -> str:
+        """Render the live block and return the text of all blocks."""
+
+        self._close_live()
+        return "".join(self.blocks)
@@ -1,6 +1,5 @@
 import streamlit as st
 import asyncio
-import nest_asyncio
 import json
 import os
 import platform
@@ -8,26 +7,22 @@ import platform
 if platform.system() == "Windows":
     asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
 
-# Apply nest_asyncio: Allow nested calls within an already running event loop
-nest_asyncio.apply()
-
-# Create and reuse global event loop (create once and continue using)
-if "event_loop" not in st.session_state:
-    loop = asyncio.new_event_loop()
-    st.session_state.event_loop = loop
-    asyncio.set_event_loop(loop)
-
 from langgraph.prebuilt import create_react_agent
 from langchain_anthropic import ChatAnthropic
 from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage
+from langchain_core.messages import AIMessage, HumanMessage
 from dotenv import load_dotenv
-from langchain_mcp_adapters.client import MultiServerMCPClient
+from mcp_manager import get_mcp_manager
+from async_worker import get_async_worker
+from stream_renderer import StreamRenderer, BlockStreamRenderer
 from utils import astream_graph, random_uuid
 from langchain_core.messages.ai import AIMessageChunk
 from langchain_core.messages.tool import ToolMessage
-from langgraph.checkpoint.memory import MemorySaver
+from sqlite_checkpointer import get_checkpointer
+from history_manager import get_history_manager
 from langchain_core.runnables import RunnableConfig
+from streamlit import runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 
 # Load environment variables (get API keys and settings from .env file)
 load_dotenv(override=True)
@@ -196,7 +191,6 @@ if "session_initialized" not in st.session_state:
     st.session_state.session_initialized = False  # Session initialization flag
     st.session_state.agent = None  # Storage for ReAct agent object
     st.session_state.history = []  # List for storing conversation history
-    st.session_state.mcp_client = None  # Storage for MCP client object
     st.session_state.timeout_seconds = (
         120  # Response generation time limit (seconds), default 120 seconds
     )
@@ -205,29 +199,40 @@ if "session_initialized" not in st.session_state:
     )
     st.session_state.recursion_limit = 100  # Recursion call limit, default 100
 
-if "thread_id" not in st.session_state:
-    st.session_state.thread_id = random_uuid()
-
 
 # --- Function Definitions ---
 
 
-async def cleanup_mcp_client():
+def load_history(thread_id):
     """
-    Safely terminates the existing MCP client.
+    Rebuilds the chat history of a thread from its latest checkpoint.
 
-    Properly releases resources if an existing client exists.
+    Args:
+        thread_id: Conversation thread ID
+
+    Returns:
+        list: User and assistant messages of the thread (empty for a new thread)
     """
-    if "mcp_client" in st.session_state and st.session_state.mcp_client is not None:
-        try:
+    checkpoint_tuple = get_checkpointer().get_tuple(
+        {"configurable": {"thread_id": thread_id}}
+    )
+    if checkpoint_tuple is None:
+        return []
+
+    history = []
+    for message in checkpoint_tuple.checkpoint["channel_values"].get("messages", []):
+        if isinstance(message, HumanMessage):
+            history.append({"role": "user", "content": message.content})
+        elif isinstance(message, AIMessage) and message.text():
+            history.append({"role": "assistant", "content": message.text()})
+    return history
 
-            await st.session_state.mcp_client.__aexit__(None, None, None)
-            st.session_state.mcp_client = None
-        except Exception as e:
-            import traceback
 
-            # st.warning(f"Error while terminating MCP client: {str(e)}")
-            # st.warning(traceback.format_exc())
+if "thread_id" not in st.session_state:
+    # Conversations are checkpointed on disk, so a thread_id in the URL resumes one
+    st.session_state.thread_id = st.query_params.get("thread_id") or random_uuid()
+    st.query_params["thread_id"] = st.session_state.thread_id
+    st.session_state.history = load_history(st.session_state.thread_id)
 
 
 def print_message():
@@ -272,6 +277,8 @@ def get_streaming_callback(text_placeholder, tool_placeholder):
 
     This function creates a callback function to display responses generated from the LLM in real-time.
     It displays text responses and tool call information in separate areas.
+    Tokens are buffered and rendered at most every 50 ms, and tool call information is added
+    block by block instead of re-rendering everything received so far.
 
     Args:
         text_placeholder: Streamlit component to display text responses
@@ -279,14 +286,17 @@ def get_streaming_callback(text_placeholder, tool_placeholder):
 
     Returns:
         callback_func: Streaming callback function
-        accumulated_text: List to store accumulated text responses
-        accumulated_tool: List to store accumulated tool call information
+        text_renderer: StreamRenderer holding the text response
+        tool_renderer: BlockStreamRenderer holding the tool call information
     """
-    accumulated_text = []
-    accumulated_tool = []
+    text_renderer = StreamRenderer(text_placeholder)
+
+    # The expander is only created once the first tool call arrives
+    tool_renderer = BlockStreamRenderer(
+        lambda: tool_placeholder.expander("🔧 Tool Call Information", expanded=True)
+    )
 
     def callback_func(message: dict):
-        nonlocal accumulated_text, accumulated_tool
         message_content = message.get("content", None)
 
         if isinstance(message_content, AIMessageChunk):
@@ -296,22 +306,17 @@ def get_streaming_callback(text_placeholder, tool_placeholder):
                 message_chunk = content[0]
                 # Process text type
                 if message_chunk["type"] == "text":
-                    accumulated_text.append(message_chunk["text"])
-                    text_placeholder.markdown("".join(accumulated_text))
+                    text_renderer.write(message_chunk["text"])
                 # Process tool use type
                 elif message_chunk["type"] == "tool_use":
                     if "partial_json" in message_chunk:
-                        accumulated_tool.append(message_chunk["partial_json"])
+                        tool_renderer.write(message_chunk["partial_json"])
                     else:
                         tool_call_chunks = message_content.tool_call_chunks
                         tool_call_chunk = tool_call_chunks[0]
-                        accumulated_tool.append(
+                        tool_renderer.add_block(
                             "\n```json\n" + str(tool_call_chunk) + "\n```\n"
                         )
-                    with tool_placeholder.expander(
-                        "🔧 Tool Call Information", expanded=True
-                    ):
-                        st.markdown("".join(accumulated_tool))
             # Process if tool_calls attribute exists (mainly occurs in OpenAI models)
             elif (
                 hasattr(message_content, "tool_calls")
@@ -319,68 +324,65 @@ def get_streaming_callback(text_placeholder, tool_placeholder):
                 and len(message_content.tool_calls[0]["name"]) > 0
             ):
                 tool_call_info = message_content.tool_calls[0]
-                accumulated_tool.append("\n```json\n" + str(tool_call_info) + "\n```\n")
-                with tool_placeholder.expander(
-                    "🔧 Tool Call Information", expanded=True
-                ):
-                    st.markdown("".join(accumulated_tool))
+                tool_renderer.add_block("\n```json\n" + str(tool_call_info) + "\n```\n")
             # Process if content is a simple string
             elif isinstance(content, str):
-                accumulated_text.append(content)
-                text_placeholder.markdown("".join(accumulated_text))
+                text_renderer.write(content)
             # Process if invalid tool call information exists
             elif (
                 hasattr(message_content, "invalid_tool_calls")
                 and message_content.invalid_tool_calls
             ):
                 tool_call_info = message_content.invalid_tool_calls[0]
-                accumulated_tool.append("\n```json\n" + str(tool_call_info) + "\n```\n")
-                with tool_placeholder.expander(
-                    "🔧 Tool Call Information (Invalid)", expanded=True
-                ):
-                    st.markdown("".join(accumulated_tool))
+                tool_renderer.add_block(
+                    "\n(Invalid)\n```json\n" + str(tool_call_info) + "\n```\n"
+                )
             # Process if tool_call_chunks attribute exists
             elif (
                 hasattr(message_content, "tool_call_chunks")
                 and message_content.tool_call_chunks
             ):
                 tool_call_chunk = message_content.tool_call_chunks[0]
-                accumulated_tool.append(
+                tool_renderer.add_block(
                     "\n```json\n" + str(tool_call_chunk) + "\n```\n"
                 )
-                with tool_placeholder.expander(
-                    "🔧 Tool Call Information", expanded=True
-                ):
-                    st.markdown("".join(accumulated_tool))
             # Process if tool_calls exists in additional_kwargs (supports various model compatibility)
             elif (
                 hasattr(message_content, "additional_kwargs")
                 and "tool_calls" in message_content.additional_kwargs
             ):
                 tool_call_info = message_content.additional_kwargs["tool_calls"][0]
-                accumulated_tool.append("\n```json\n" + str(tool_call_info) + "\n```\n")
-                with tool_placeholder.expander(
-                    "🔧 Tool Call Information", expanded=True
-                ):
-                    st.markdown("".join(accumulated_tool))
+                tool_renderer.add_block("\n```json\n" + str(tool_call_info) + "\n```\n")
         # Process if it's a tool message (tool response)
         elif isinstance(message_content, ToolMessage):
-            accumulated_tool.append(
+            tool_renderer.add_block(
                 "\n```json\n" + str(message_content.content) + "\n```\n"
             )
-            with tool_placeholder.expander("🔧 Tool Call Information", expanded=True):
-                st.markdown("".join(accumulated_tool))
         return None
 
-    return callback_func, accumulated_text, accumulated_tool
+    return callback_func, text_renderer, tool_renderer
 
 
-async def process_query(query, text_placeholder, tool_placeholder, timeout_seconds=60):
+def is_session_active():
+    """
+    Checks whether the browser session of the current script run is still connected.
+
+    Returns:
+        bool: False once the user has closed or navigated away from the page
+    """
+    ctx = get_script_run_ctx()
+    if ctx is None or not runtime.exists():
+        return True
+    return runtime.get_instance().is_active_session(ctx.session_id)
+
+
+def process_query(query, text_placeholder, tool_placeholder, timeout_seconds=60):
     """
     Processes user questions and generates responses.
 
-    This function passes the user's question to the agent and streams the response in real-time.
-    Returns a timeout error if the response is not completed within the specified time.
+    The agent runs on the shared background event loop (at most a few runs per model at once),
+    and its streamed chunks are rendered here as they arrive through a thread-safe queue.
+    The run is cancelled on timeout, on a rerun of this script, or when the user leaves the page.
 
     Args:
         query: Text of the question entered by the user
@@ -395,28 +397,37 @@ async def process_query(query, text_placeholder, tool_placeholder, timeout_secon
     """
     try:
         if st.session_state.agent:
-            streaming_callback, accumulated_text_obj, accumulated_tool_obj = (
+            streaming_callback, text_renderer, tool_renderer = (
                 get_streaming_callback(text_placeholder, tool_placeholder)
             )
+            agent = st.session_state.agent
+            config = RunnableConfig(
+                recursion_limit=st.session_state.recursion_limit,
+                thread_id=st.session_state.thread_id,
+            )
+            run = get_async_worker().start(
+                lambda emit: astream_graph(
+                    agent,
+                    {"messages": [HumanMessage(content=query)]},
+                    callback=emit,
+                    config=config,
+                ),
+                model=st.session_state.selected_model,
+                timeout=timeout_seconds,
+            )
             try:
-                response = await asyncio.wait_for(
-                    astream_graph(
-                        st.session_state.agent,
-                        {"messages": [HumanMessage(content=query)]},
-                        callback=streaming_callback,
-                        config=RunnableConfig(
-                            recursion_limit=st.session_state.recursion_limit,
-                            thread_id=st.session_state.thread_id,
-                        ),
-                    ),
-                    timeout=timeout_seconds,
-                )
-            except asyncio.TimeoutError:
+                for message in run.events(is_active=is_session_active):
+                    streaming_callback(message)
+                response = run.result()
+            except TimeoutError:
                 error_msg = f"⏱️ Request time exceeded {timeout_seconds} seconds. Please try again later."
                 return {"error": error_msg}, error_msg, ""
+            finally:
+                run.cancel()
 
-            final_text = "".join(accumulated_text_obj)
-            final_tool = "".join(accumulated_tool_obj)
+            final_text = text_renderer.close()
+            final_tool = tool_renderer.close()
+            st.session_state.last_stream_stats = text_renderer.format_stats()
             return response, final_text, final_tool
         else:
             return (
@@ -431,7 +442,7 @@ async def process_query(query, text_placeholder, tool_placeholder, timeout_secon
         return {"error": error_msg}, error_msg, ""
 
 
-async def initialize_session(mcp_config=None):
+def initialize_session(mcp_config=None):
     """
     Initializes MCP session and agent.
 
@@ -442,17 +453,16 @@ async def initialize_session(mcp_config=None):
         bool: Initialization success status
     """
     with st.spinner("🔄 Connecting to MCP server..."):
-        # First safely clean up existing client
-        await cleanup_mcp_client()
-
         if mcp_config is None:
             # Load settings from config.json file
             mcp_config = load_config_from_json()
-        client = MultiServerMCPClient(mcp_config)
-        await client.__aenter__()
-        tools = client.get_tools()
+
+        # Servers are shared by all sessions; only added or changed servers are (re)started
+        mcp_manager = get_mcp_manager()
+        tools = mcp_manager.apply(mcp_config)
+        for server_name, error in mcp_manager.errors.items():
+            st.warning(f"⚠️ MCP server '{server_name}' failed to start: {error}")
         st.session_state.tool_count = len(tools)
-        st.session_state.mcp_client = client
 
         # Initialize appropriate model based on selection
         selected_model = st.session_state.selected_model
@@ -476,8 +486,9 @@ async def initialize_session(mcp_config=None):
         agent = create_react_agent(
             model,
             tools,
-            checkpointer=MemorySaver(),
-            prompt=SYSTEM_PROMPT,
+            checkpointer=get_checkpointer(),
+            # Sends the recent turns plus a rolling summary instead of the whole thread
+            prompt=get_history_manager().as_prompt(SYSTEM_PROMPT, summarizer=model),
         )
         st.session_state.agent = agent
         st.session_state.session_initialized = True
@@ -740,6 +751,8 @@ with st.sidebar:
     )
     selected_model_name = st.session_state.selected_model
     st.write(f"🧠 Current Model: {selected_model_name}")
+    if "last_stream_stats" in st.session_state:
+        st.write(f"Last response: {st.session_state.last_stream_stats}")
 
     # Move Apply Settings button here
     if st.button(
@@ -774,9 +787,7 @@ with st.sidebar:
             progress_bar.progress(30)
 
             # Run initialization
-            success = st.session_state.event_loop.run_until_complete(
-                initialize_session(st.session_state.pending_mcp_config)
-            )
+            success = initialize_session(st.session_state.pending_mcp_config)
 
             # Update progress
             progress_bar.progress(100)
@@ -799,8 +810,11 @@ with st.sidebar:
 
     # Reset conversation button
     if st.button("Reset Conversation", use_container_width=True, type="primary"):
-        # Reset thread_id
+        # Drop the checkpoints of the old thread and start a new one
+        get_checkpointer().delete_thread(st.session_state.thread_id)
+        get_history_manager().forget(st.session_state.thread_id)
         st.session_state.thread_id = random_uuid()
+        st.query_params["thread_id"] = st.session_state.thread_id
 
         # Reset conversation history
         st.session_state.history = []
@@ -820,6 +834,10 @@ with st.sidebar:
             st.rerun()
 
 # --- Initialize default session (if not initialized) ---
+# Sessions opened while the MCP servers are already running reuse them without a cold start
+if not st.session_state.session_initialized and get_mcp_manager().servers:
+    initialize_session()
+
 if not st.session_state.session_initialized:
     st.info(
         "MCP server and agent are not initialized. Please click the 'Apply Settings' button in the left sidebar to initialize."
@@ -837,15 +855,11 @@ if user_query:
         with st.chat_message("assistant", avatar="🤖"):
             tool_placeholder = st.empty()
             text_placeholder = st.empty()
-            resp, final_text, final_tool = (
-                st.session_state.event_loop.run_until_complete(
-                    process_query(
-                        user_query,
-                        text_placeholder,
-                        tool_placeholder,
-                        st.session_state.timeout_seconds,
-                    )
-                )
+            resp, final_text, final_tool = process_query(
+                user_query,
+                text_placeholder,
+                tool_placeholder,
+                st.session_state.timeout_seconds,
             )
         if "error" in resp:
             st.error(resp["error"])
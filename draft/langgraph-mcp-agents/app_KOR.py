@@ -23,6 +23,7 @@ from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage
 from dotenv import load_dotenv
 from langchain_mcp_adapters.client import MultiServerMCPClient
+from stream_renderer import StreamRenderer, BlockStreamRenderer
 from utils import astream_graph, random_uuid
 from langchain_core.messages.ai import AIMessageChunk
 from langchain_core.messages.tool import ToolMessage
@@ -268,6 +269,8 @@ def get_streaming_callback(text_placeholder, tool_placeholder):
 
     이 함수는 LLM에서 생성되는 응답을 실시간으로 화면에 표시하기 위한 콜백 함수를 생성합니다.
     텍스트 응답과 도구 호출 정보를 각각 다른 영역에 표시합니다.
+    토큰은 버퍼에 모아 최대 50ms마다 한 번씩 렌더링하고, 도구 호출 정보는 지금까지 받은
+    내용 전체를 다시 그리지 않고 블록 단위로 추가합니다.
 
     매개변수:
         text_placeholder: 텍스트 응답을 표시할 Streamlit 컴포넌트
@@ -275,14 +278,17 @@ def get_streaming_callback(text_placeholder, tool_placeholder):
 
     반환값:
         callback_func: 스트리밍 콜백 함수
-        accumulated_text: 누적된 텍스트 응답을 저장하는 리스트
-        accumulated_tool: 누적된 도구 호출 정보를 저장하는 리스트
+        text_renderer: 텍스트 응답을 담는 StreamRenderer
+        tool_renderer: 도구 호출 정보를 담는 BlockStreamRenderer
     """
-    accumulated_text = []
-    accumulated_tool = []
+    text_renderer = StreamRenderer(text_placeholder)
+
+    # 익스팬더는 첫 도구 호출이 도착했을 때 한 번만 생성
+    tool_renderer = BlockStreamRenderer(
+        lambda: tool_placeholder.expander("🔧 도구 호출 정보", expanded=True)
+    )
 
     def callback_func(message: dict):
-        nonlocal accumulated_text, accumulated_tool
         message_content = message.get("content", None)
 
         if isinstance(message_content, AIMessageChunk):
@@ -292,20 +298,17 @@ def get_streaming_callback(text_placeholder, tool_placeholder):
                 message_chunk = content[0]
                 # 텍스트 타입인 경우 처리
                 if message_chunk["type"] == "text":
-                    accumulated_text.append(message_chunk["text"])
-                    text_placeholder.markdown("".join(accumulated_text))
+                    text_renderer.write(message_chunk["text"])
                 # 도구 사용 타입인 경우 처리
                 elif message_chunk["type"] == "tool_use":
                     if "partial_json" in message_chunk:
-                        accumulated_tool.append(message_chunk["partial_json"])
+                        tool_renderer.write(message_chunk["partial_json"])
                     else:
                         tool_call_chunks = message_content.tool_call_chunks
                         tool_call_chunk = tool_call_chunks[0]
-                        accumulated_tool.append(
+                        tool_renderer.add_block(
                             "\n```json\n" + str(tool_call_chunk) + "\n```\n"
                         )
-                    with tool_placeholder.expander("🔧 도구 호출 정보", expanded=True):
-                        st.markdown("".join(accumulated_tool))
             # tool_calls 속성이 있는 경우 처리 (OpenAI 모델 등에서 주로 발생)
             elif (
                 hasattr(message_content, "tool_calls")
@@ -313,54 +316,43 @@ def get_streaming_callback(text_placeholder, tool_placeholder):
                 and len(message_content.tool_calls[0]["name"]) > 0
             ):
                 tool_call_info = message_content.tool_calls[0]
-                accumulated_tool.append("\n```json\n" + str(tool_call_info) + "\n```\n")
-                with tool_placeholder.expander("🔧 도구 호출 정보", expanded=True):
-                    st.markdown("".join(accumulated_tool))
+                tool_renderer.add_block("\n```json\n" + str(tool_call_info) + "\n```\n")
             # 단순 문자열인 경우 처리
             elif isinstance(content, str):
-                accumulated_text.append(content)
-                text_placeholder.markdown("".join(accumulated_text))
+                text_renderer.write(content)
             # 유효하지 않은 도구 호출 정보가 있는 경우 처리
             elif (
                 hasattr(message_content, "invalid_tool_calls")
                 and message_content.invalid_tool_calls
             ):
                 tool_call_info = message_content.invalid_tool_calls[0]
-                accumulated_tool.append("\n```json\n" + str(tool_call_info) + "\n```\n")
-                with tool_placeholder.expander(
-                    "🔧 도구 호출 정보 (유효하지 않음)", expanded=True
-                ):
-                    st.markdown("".join(accumulated_tool))
+                tool_renderer.add_block(
+                    "\n(유효하지 않음)\n```json\n" + str(tool_call_info) + "\n```\n"
+                )
             # tool_call_chunks 속성이 있는 경우 처리
             elif (
                 hasattr(message_content, "tool_call_chunks")
                 and message_content.tool_call_chunks
             ):
                 tool_call_chunk = message_content.tool_call_chunks[0]
-                accumulated_tool.append(
+                tool_renderer.add_block(
                     "\n```json\n" + str(tool_call_chunk) + "\n```\n"
                 )
-                with tool_placeholder.expander("🔧 도구 호출 정보", expanded=True):
-                    st.markdown("".join(accumulated_tool))
             # additional_kwargs에 tool_calls가 있는 경우 처리 (다양한 모델 호환성 지원)
             elif (
                 hasattr(message_content, "additional_kwargs")
                 and "tool_calls" in message_content.additional_kwargs
             ):
                 tool_call_info = message_content.additional_kwargs["tool_calls"][0]
-                accumulated_tool.append("\n```json\n" + str(tool_call_info) + "\n```\n")
-                with tool_placeholder.expander("🔧 도구 호출 정보", expanded=True):
-                    st.markdown("".join(accumulated_tool))
+                tool_renderer.add_block("\n```json\n" + str(tool_call_info) + "\n```\n")
         # 도구 메시지인 경우 처리 (도구의 응답)
         elif isinstance(message_content, ToolMessage):
-            accumulated_tool.append(
+            tool_renderer.add_block(
                 "\n```json\n" + str(message_content.content) + "\n```\n"
             )
-            with tool_placeholder.expander("🔧 도구 호출 정보", expanded=True):
-                st.markdown("".join(accumulated_tool))
         return None
 
-    return callback_func, accumulated_text, accumulated_tool
+    return callback_func, text_renderer, tool_renderer
 
 
 async def process_query(query, text_placeholder, tool_placeholder, timeout_seconds=60):
@@ -383,7 +375,7 @@ async def process_query(query, text_placeholder, tool_placeholder, timeout_secon
     """
     try:
         if st.session_state.agent:
-            streaming_callback, accumulated_text_obj, accumulated_tool_obj = (
+            streaming_callback, text_renderer, tool_renderer = (
                 get_streaming_callback(text_placeholder, tool_placeholder)
             )
             try:
@@ -403,8 +395,9 @@ async def process_query(query, text_placeholder, tool_placeholder, timeout_secon
                 error_msg = f"⏱️ 요청 시간이 {timeout_seconds}초를 초과했습니다. 나중에 다시 시도해 주세요."
                 return {"error": error_msg}, error_msg, ""
 
-            final_text = "".join(accumulated_text_obj)
-            final_tool = "".join(accumulated_tool_obj)
+            final_text = text_renderer.close()
+            final_tool = tool_renderer.close()
+            st.session_state.last_stream_stats = text_renderer.format_stats()
             return response, final_text, final_tool
         else:
             return (
@@ -723,6 +716,8 @@ with st.sidebar:
     st.write(f"🛠️ MCP 도구 수: {st.session_state.get('tool_count', '초기화 중...')}")
     selected_model_name = st.session_state.selected_model
     st.write(f"🧠 현재 모델: {selected_model_name}")
+    if "last_stream_stats" in st.session_state:
+        st.write(f"마지막 응답: {st.session_state.last_stream_stats}")
 
     # 설정 적용하기 버튼을 여기로 이동
     if st.button(
@@ -0,0 +1,165 @@
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional
+from concurrent.futures import Future
+import asyncio
+import os
+import queue
+import threading
+import time
+
+# Agent runs executed at once per model; further runs wait for a slot
+DEFAULT_MAX_CONCURRENCY_PER_MODEL = int(os.getenv("AGENT_MAX_CONCURRENCY_PER_MODEL", "4"))
+
+# Marks the end of a run's event stream
+_DONE = object()
+
+
+class AgentRun:
+    """
+    Handle of a coroutine running on the worker loop.
+
+    The coroutine emits events (e.g. streamed tokens) from the worker thread
+    through a thread-safe queue; the submitting thread iterates over them and
+    then collects the result.
+    """
+
+    def __init__(self) -> None:
+        self.future: Optional[Future] = None
+        self._events: "queue.Queue[Any]" = queue.Queue()
+
+    def emit(self, event: Any) -> None:
+        self._events.put(event)
+
+    def _finish(self) -> None:
+        self._events.put(_DONE)
+
+    def events(self,
+               poll_interval: float = 0.1,
+               is_active: Optional[Callable[[], bool]] = None) -> Iterator[Any]:
+        """
+        Yield emitted events until the run ends.
+
+        Args:
+            poll_interval: Seconds between is_active checks
+            is_active: Called every poll_interval; the run is cancelled once it returns False
+        """
+
+        next_check = time.monotonic() + poll_interval
+        while True:
+            # Checked on a timer, since a steadily streaming run never leaves the queue empty
+            if is_active is not None and time.monotonic() >= next_check:
+                if not is_active():
+                    self.cancel()
+                    return
+                next_check = time.monotonic() + poll_interval
+            try:
+                event = self._events.get(timeout=poll_interval)
+            except queue.Empty:
+                continue
+            if event is _DONE:
+                return
+            yield event
+
+    def result(self, timeout: Optional[float] = None) -> Any:
+        """Return the coroutine result, raising its exception (TimeoutError on timeout)."""
+
+        return self.future.result(timeout)
+
+    def cancel(self) -> None:
+        """Cancel the coroutine on the worker loop (no-op once it finished)."""
+
+        if self.future is not None:
+            self.future.cancel()
+
+    def done(self) -> bool:
+        return self.future is not None and self.future.done()
+
+
+class AsyncWorker:
+    """
+    Long-lived asyncio event loop on a daemon thread, shared by all sessions.
+
+    Script threads submit coroutines and get a future back instead of
+    blocking on a per-session loop. Runs are limited per model with one
+    semaphore each, bounded by a timeout, and cancelled on the loop when the
+    caller cancels them.
+    """
+
+    def __init__(self, max_concurrency_per_model: int = DEFAULT_MAX_CONCURRENCY_PER_MODEL) -> None:
+        """
+        Start the loop thread.
+
+        Args:
+            max_concurrency_per_model: Runs executed at once for the same model
+        """
+
+        self.max_concurrency_per_model = max_concurrency_per_model
+        self.loop = asyncio.new_event_loop()
+        self._slots: Dict[str, asyncio.Semaphore] = {}
+        self._active: Dict[str, int] = {}
+        self._thread = threading.Thread(target=self.loop.run_forever, name="agent-worker", daemon=True)
+        self._thread.start()
+
+    def submit(self, coro: Awaitable[Any]) -> Future:
+        """Schedule a coroutine on the worker loop."""
+
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the worker loop and wait for its result."""
+
+        return self.submit(coro).result(timeout)
+
+    def start(self,
+              coro_fn: Callable[[Callable[[Any], None]], Awaitable[Any]],
+              model: str,
+              timeout: Optional[float] = None) -> AgentRun:
+        """
+        Start a streaming run.
+
+        Args:
+            coro_fn: Called on the worker loop with an emit function; returns
+                the coroutine to run
+            model: Model name the concurrency limit applies to
+            timeout: Seconds the run may take, waiting for a slot included
+
+        Returns:
+            Handle to iterate the emitted events and collect the result
+        """
+
+        run = AgentRun()
+        run.future = self.submit(self._run(coro_fn, run, model, timeout))
+        return run
+
+    async def _run(self, coro_fn, run: AgentRun, model: str, timeout: Optional[float]) -> Any:
+        try:
+            async with asyncio.timeout(timeout):
+                slot = self._slots.get(model)
+                if slot is None:
+                    slot = self._slots[model] = asyncio.Semaphore(self.max_concurrency_per_model)
+                async with slot:
+                    self._active[model] = self._active.get(model, 0) + 1
+                    try:
+                        return await coro_fn(run.emit)
+                    finally:
+                        self._active[model] -= 1
+        finally:
+            run._finish()
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of running agent runs per model."""
+
+        return {model: count for model, count in list(self._active.items()) if count}
+
+
+_worker: Optional[AsyncWorker] = None
+_worker_lock = threading.Lock()
+
+
+def get_async_worker() -> AsyncWorker:
+    """Return the process-wide worker, starting it on first use."""
+
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = AsyncWorker()
+        return _worker
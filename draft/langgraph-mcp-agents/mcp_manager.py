@@ -0,0 +1,300 @@
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import atexit
+import json
+import threading
+import time
+
+import anyio
+from langchain_core.tools import BaseTool, StructuredTool, ToolException
+from langchain_mcp_adapters.client import MultiServerMCPClient
+
+from async_worker import get_async_worker
+
+# Seconds allowed for one server to start and list its tools
+DEFAULT_START_TIMEOUT = 60.0
+
+# Raised by a tool call once the server process has exited or its connection broke
+TRANSPORT_ERRORS = (anyio.ClosedResourceError, anyio.BrokenResourceError, anyio.EndOfStream)
+
+
+def config_key(server_config: Dict[str, Any]) -> str:
+    """Canonical form of a server configuration, used to detect changes."""
+
+    return json.dumps(server_config, sort_keys=True, ensure_ascii=False)
+
+
+class ServerConnection:
+    """
+    One running MCP server and its cached tools.
+
+    The client is entered and exited by a single long-lived task, since the
+    stdio/SSE transports must be closed from the task that opened them.
+    """
+
+    def __init__(self, name: str, server_config: Dict[str, Any]) -> None:
+        self.name = name
+        self.config = server_config
+        self.key = config_key(server_config)
+        self.tools: Dict[str, BaseTool] = {}
+        self.started_at: Optional[float] = None
+        self.start_seconds: Optional[float] = None
+        self.failure: Optional[str] = None
+        self._ready: Optional[asyncio.Future] = None
+        self._stop: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, timeout: float) -> None:
+        loop = asyncio.get_running_loop()
+        self._ready = loop.create_future()
+        self._stop = asyncio.Event()
+        self._task = loop.create_task(self._run())
+        try:
+            await asyncio.wait_for(asyncio.shield(self._ready), timeout)
+        except BaseException:
+            await self.stop()
+            raise
+
+    async def _run(self) -> None:
+        started = time.monotonic()
+        try:
+            async with MultiServerMCPClient({self.name: self.config}) as client:
+                self.tools = {tool.name: tool for tool in client.get_tools()}
+                self.started_at = time.time()
+                self.start_seconds = time.monotonic() - started
+                self._ready.set_result(None)
+                await self._stop.wait()
+        except BaseException as e:
+            if not self._ready.done():
+                self._ready.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+        finally:
+            self.tools = {}
+
+    @property
+    def alive(self) -> bool:
+        """Whether the client is still open and no call has found its transport broken."""
+
+        return self._task is not None and not self._task.done() and self.failure is None
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._stop.set()
+        try:
+            await asyncio.wait_for(self._task, 10.0)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            self._task.cancel()
+        except Exception:
+            # The server already failed; there is nothing left to close
+            pass
+        self._task = None
+
+
+class MCPConnectionManager:
+    """
+    Process-wide pool of warm MCP server connections.
+
+    Servers run on one long-lived event loop thread and are shared by every
+    browser session. apply() diffs a new configuration against the running
+    servers: unchanged servers keep their process and cached tool schemas,
+    and only added, changed or dead servers are (re)started, concurrently. Returned
+    tools are thin proxies that look their server up at call time and run
+    the call on the manager loop, so they work from any session's event loop
+    and survive restarts of their server. A server found dead by a tool call
+    is restarted on the next call.
+    """
+
+    def __init__(self,
+                 loop: Optional[asyncio.AbstractEventLoop] = None,
+                 start_timeout: float = DEFAULT_START_TIMEOUT) -> None:
+        """
+        Create the manager.
+
+        Args:
+            loop: Event loop to run the servers on; by default a new loop is
+                started on a daemon thread
+            start_timeout: Seconds allowed for one server to start
+        """
+
+        if loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="mcp-connections", daemon=True).start()
+
+        self.loop = loop
+        self.start_timeout = start_timeout
+        self.servers: Dict[str, ServerConnection] = {}
+        self.errors: Dict[str, str] = {}
+        self._proxies: Dict[Tuple[str, str, str], BaseTool] = {}
+        self._apply_lock: Optional[asyncio.Lock] = None
+
+    def _submit(self, coro) -> "asyncio.Future":
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def apply(self, mcp_config: Dict[str, Dict[str, Any]]) -> List[BaseTool]:
+        """
+        Bring the running servers in line with mcp_config (blocking).
+
+        Args:
+            mcp_config: Server name -> connection settings
+
+        Returns:
+            Tools of every server that is running
+        """
+
+        return self._submit(self._apply(mcp_config)).result()
+
+    async def aapply(self, mcp_config: Dict[str, Dict[str, Any]]) -> List[BaseTool]:
+        """Awaitable apply(), usable from any event loop."""
+
+        if self._on_manager_loop():
+            return await self._apply(mcp_config)
+        return await asyncio.wrap_future(self._submit(self._apply(mcp_config)))
+
+    def _lock(self) -> asyncio.Lock:
+        # Created lazily, so it belongs to the manager loop
+        if self._apply_lock is None:
+            self._apply_lock = asyncio.Lock()
+        return self._apply_lock
+
+    async def _apply(self, mcp_config: Dict[str, Dict[str, Any]]) -> List[BaseTool]:
+        async with self._lock():
+            removed = [name for name in self.servers if name not in mcp_config]
+            changed = [
+                name for name, server_config in mcp_config.items()
+                if name not in self.servers
+                or self.servers[name].key != config_key(server_config)
+                or not self.servers[name].alive
+            ]
+
+            for name in removed + [name for name in changed if name in self.servers]:
+                await self.servers.pop(name).stop()
+            for name in list(self.errors):
+                if name not in mcp_config or name in changed:
+                    del self.errors[name]
+
+            # Start added and changed servers concurrently
+            starting = {name: ServerConnection(name, mcp_config[name]) for name in changed}
+            results = await asyncio.gather(
+                *(server.start(self.start_timeout) for server in starting.values()),
+                return_exceptions=True
+            )
+            for (name, server), result in zip(starting.items(), results):
+                if isinstance(result, BaseException):
+                    self.errors[name] = f"{type(result).__name__}: {result}"
+                else:
+                    self.servers[name] = server
+
+            return self.get_tools()
+
+    def get_tools(self) -> List[BaseTool]:
+        """Return proxies for the cached tools of every running server."""
+
+        tools = []
+        for name, server in list(self.servers.items()):
+            for tool in server.tools.values():
+                key = (name, tool.name, server.key)
+                proxy = self._proxies.get(key)
+                if proxy is None:
+                    proxy = self._proxies.setdefault(key, self._make_proxy(name, tool))
+                tools.append(proxy)
+        return tools
+
+    def _make_proxy(self, server_name: str, tool: BaseTool) -> BaseTool:
+        tool_name = tool.name
+
+        async def call_tool(**arguments: Any):
+            coro = self._call(server_name, tool_name, arguments)
+            if self._on_manager_loop():
+                return await coro
+            return await asyncio.wrap_future(self._submit(coro))
+
+        return StructuredTool(
+            name=tool.name,
+            description=tool.description,
+            args_schema=tool.args_schema,
+            coroutine=call_tool,
+            response_format=tool.response_format,
+        )
+
+    async def _restart(self, server_name: str) -> Optional[ServerConnection]:
+        async with self._lock():
+            server = self.servers.get(server_name)
+            if server is None or server.alive:
+                return server
+
+            await self.servers.pop(server_name).stop()
+            replacement = ServerConnection(server_name, server.config)
+            try:
+                await replacement.start(self.start_timeout)
+            except Exception as e:
+                self.errors[server_name] = f"{type(e).__name__}: {e}"
+                return None
+            self.servers[server_name] = replacement
+            return replacement
+
+    async def _call(self, server_name: str, tool_name: str, arguments: Dict[str, Any]):
+        server = self.servers.get(server_name)
+        if server is not None and not server.alive:
+            server = await self._restart(server_name)
+        tool = server.tools.get(tool_name) if server is not None else None
+        if tool is None:
+            raise ToolException(f"MCP server '{server_name}' no longer provides the tool '{tool_name}'.")
+        try:
+            return await tool.coroutine(**arguments)
+        except TRANSPORT_ERRORS as e:
+            server.failure = f"{type(e).__name__}: {e}"
+            raise ToolException(
+                f"MCP server '{server_name}' stopped responding; it is restarted on the next call."
+            ) from e
+
+    def _on_manager_loop(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            return False
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """Return the tools, start time and start-up latency of every server, and start errors."""
+
+        status = {
+            name: {
+                "tools": sorted(server.tools),
+                "started_at": server.started_at,
+                "start_seconds": server.start_seconds
+            }
+            for name, server in list(self.servers.items())
+        }
+        for name, error in list(self.errors.items()):
+            status[name] = {"error": error}
+        return status
+
+    def close(self) -> None:
+        """Stop every server."""
+
+        async def stop_all():
+            for name in list(self.servers):
+                await self.servers.pop(name).stop()
+
+        if self.loop.is_running() and not self._on_manager_loop():
+            try:
+                self._submit(stop_all()).result(timeout=30.0)
+            except Exception:
+                pass
+
+
+_manager: Optional[MCPConnectionManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_mcp_manager() -> MCPConnectionManager:
+    """Return the process-wide connection manager, running on the agent worker loop."""
+
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            # Sharing the agent loop lets tool calls skip the cross-thread hop
+            _manager = MCPConnectionManager(loop=get_async_worker().loop)
+            atexit.register(_manager.close)
+        return _manager
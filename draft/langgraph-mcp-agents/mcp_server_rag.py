@@ -4,29 +4,92 @@ from langchain_community.vectorstores import FAISS
 from langchain_openai import OpenAIEmbeddings
 from mcp.server.fastmcp import FastMCP
 from dotenv import load_dotenv
-from typing import Any
+from typing import Any, Optional
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import threading
+
+from embedding_cache import CachedEmbeddings
 
 # Load environment variables from .env file (contains API keys)
 load_dotenv(override=True)
 
+# Source document and the directory where its FAISS index is persisted
+PDF_PATH = os.getenv("RAG_PDF_PATH", "data/sample.pdf")
+INDEX_DIR = os.getenv("RAG_INDEX_DIR", "data/faiss_index")
+INDEX_META_FILE = "source.json"
 
-def create_retriever() -> Any:
+# How often (in seconds) the source PDF is checked for changes
+WATCH_INTERVAL = float(os.getenv("RAG_WATCH_INTERVAL", "30"))
+
+
+def log(message: str) -> None:
     """
-    Creates and returns a document retriever based on FAISS vector store.
+    Prints a status message to stderr.
+
+    stdout carries the JSON-RPC stream of the stdio transport, so anything
+    else written there would break the client session.
+
+    Args:
+        message (str): Message to print
+    """
+    print(message, file=sys.stderr, flush=True)
+
+
+def file_hash(path: str) -> str:
+    """
+    Computes the SHA-256 digest of a file.
+
+    Args:
+        path (str): Path of the file to hash
+
+    Returns:
+        str: Hex digest of the file contents
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def create_embeddings() -> Any:
+    """
+    Creates the embedding model used for both indexing and querying.
+
+    Returns:
+        Any: An embeddings object
+    """
+    # OpenAI's text-embedding-3-small model is used to convert text chunks into vector embeddings
+    # Embeddings are cached on disk, so unchanged chunks and repeated queries are not re-embedded
+    return CachedEmbeddings(
+        OpenAIEmbeddings(model="text-embedding-3-small"),
+        model_name="text-embedding-3-small",
+    )
+
+
+def build_vectorstore(pdf_path: str = PDF_PATH) -> Any:
+    """
+    Builds a FAISS vector store from a PDF document.
 
     This function performs the following steps:
     1. Loads a PDF document(place your PDF file in the data folder)
     2. Splits the document into manageable chunks
     3. Creates embeddings for each chunk
     4. Builds a FAISS vector store from the embeddings
-    5. Returns a retriever interface to the vector store
+
+    Args:
+        pdf_path (str): Path of the PDF document to index
 
     Returns:
-        Any: A retriever object that can be used to query the document database
+        Any: A FAISS vector store
     """
     # Step 1: Load Documents
     # PyMuPDFLoader is used to extract text from PDF files
-    loader = PyMuPDFLoader("data/sample.pdf")
+    loader = PyMuPDFLoader(pdf_path)
     docs = loader.load()
 
     # Step 2: Split Documents
@@ -35,19 +98,154 @@ def create_retriever() -> Any:
     split_documents = text_splitter.split_documents(docs)
 
     # Step 3: Create Embeddings
-    # OpenAI's text-embedding-3-small model is used to convert text chunks into vector embeddings
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
+    embeddings = create_embeddings()
 
     # Step 4: Create Vector Database
     # FAISS is an efficient similarity search library that stores vector embeddings
     # and allows for fast retrieval of similar vectors
-    vectorstore = FAISS.from_documents(documents=split_documents, embedding=embeddings)
+    return FAISS.from_documents(documents=split_documents, embedding=embeddings)
+
+
+def load_or_build_vectorstore(pdf_path: str = PDF_PATH, index_dir: str = INDEX_DIR) -> tuple:
+    """
+    Loads the persisted FAISS index if it was built from the current PDF,
+    otherwise builds a new index and saves it with save_local.
+
+    Args:
+        pdf_path (str): Path of the PDF document to index
+        index_dir (str): Directory where the FAISS index is persisted
+
+    Returns:
+        tuple: (FAISS vector store, hash of the PDF it was built from)
+    """
+    source_hash = file_hash(pdf_path)
+    meta_path = os.path.join(index_dir, INDEX_META_FILE)
+
+    # Reuse the saved index when the source PDF has not changed
+    if os.path.exists(meta_path):
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("source_hash") == source_hash:
+                vectorstore = FAISS.load_local(
+                    index_dir,
+                    create_embeddings(),
+                    allow_dangerous_deserialization=True,
+                )
+                return vectorstore, source_hash
+        except Exception as e:
+            log(f"Failed to load FAISS index from {index_dir}: {e}")
+
+    vectorstore = build_vectorstore(pdf_path)
+
+    # Save the index first and the source hash last, so a partial save is never reused
+    os.makedirs(index_dir, exist_ok=True)
+    vectorstore.save_local(index_dir)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump({"source": pdf_path, "source_hash": source_hash}, f)
+
+    return vectorstore, source_hash
+
+
+def create_retriever() -> Any:
+    """
+    Creates and returns a document retriever based on FAISS vector store.
+
+    The index is loaded from INDEX_DIR when it matches the source PDF and is
+    rebuilt otherwise.
+
+    Returns:
+        Any: A retriever object that can be used to query the document database
+    """
+    vectorstore, _ = load_or_build_vectorstore()
 
-    # Step 5: Create Retriever
     # The retriever provides an interface to search the vector database
     # and retrieve documents relevant to a query
-    retriever = vectorstore.as_retriever()
-    return retriever
+    return vectorstore.as_retriever()
+
+
+class RetrieverManager:
+    """
+    Holds the process-wide retriever and rebuilds it in the background
+    when the source PDF changes.
+    """
+
+    def __init__(self, pdf_path: str = PDF_PATH, index_dir: str = INDEX_DIR):
+        self.pdf_path = pdf_path
+        self.index_dir = index_dir
+        self._retriever: Optional[Any] = None
+        self._source_hash: Optional[str] = None
+        self._source_mtime: Optional[float] = None
+        self._lock = threading.Lock()
+        self._rebuilding = threading.Lock()
+        self._stop = threading.Event()
+
+    def _load(self) -> None:
+        mtime = os.path.getmtime(self.pdf_path)
+        vectorstore, source_hash = load_or_build_vectorstore(self.pdf_path, self.index_dir)
+        with self._lock:
+            self._retriever = vectorstore.as_retriever()
+            self._source_hash = source_hash
+            self._source_mtime = mtime
+
+    def get(self) -> Any:
+        """
+        Returns the current retriever, building it if the server has not done so yet.
+
+        Returns:
+            Any: A retriever object
+        """
+        if self._retriever is None:
+            with self._rebuilding:
+                if self._retriever is None:
+                    self._load()
+        return self._retriever
+
+    def refresh(self) -> bool:
+        """
+        Rebuilds the retriever if the source PDF changed since the last build.
+        The previous retriever keeps serving queries until the new one is ready.
+
+        Returns:
+            bool: True if the retriever was rebuilt
+        """
+        if not os.path.exists(self.pdf_path):
+            return False
+
+        # Cheap mtime check first; hash only when the file was touched
+        if os.path.getmtime(self.pdf_path) == self._source_mtime:
+            return False
+
+        if not self._rebuilding.acquire(blocking=False):
+            return False
+        try:
+            if file_hash(self.pdf_path) == self._source_hash:
+                self._source_mtime = os.path.getmtime(self.pdf_path)
+                return False
+            log(f"Source document changed, rebuilding index: {self.pdf_path}")
+            self._load()
+            return True
+        finally:
+            self._rebuilding.release()
+
+    def _watch(self) -> None:
+        while not self._stop.wait(WATCH_INTERVAL):
+            try:
+                self.refresh()
+            except Exception as e:
+                log(f"Failed to rebuild retriever: {e}")
+
+    def start_watcher(self) -> None:
+        """Starts a daemon thread that rebuilds the retriever when the PDF changes."""
+        threading.Thread(target=self._watch, name="rag-index-watcher", daemon=True).start()
+
+    def stop_watcher(self) -> None:
+        """Stops the background watcher thread."""
+        self._stop.set()
+
+
+# Module-level retriever shared by every tool call
+retriever_manager = RetrieverManager()
 
 
 # Initialize FastMCP server with configuration
@@ -64,7 +262,7 @@ async def retrieve(query: str) -> str:
     """
     Retrieves information from the document database based on the query.
 
-    This function creates a retriever, queries it with the provided input,
+    This function queries the shared retriever with the provided input,
     and returns the concatenated content of all retrieved documents.
 
     Args:
@@ -73,17 +271,21 @@ async def retrieve(query: str) -> str:
     Returns:
         str: Concatenated text content from all retrieved documents
     """
-    # Create a new retriever instance for each query
-    # Note: In production, consider caching the retriever for better performance
-    retriever = create_retriever()
+    # Reuse the retriever built at server start (rebuilt in the background when the PDF changes);
+    # building it blocks, so it runs in a worker thread instead of on the event loop
+    retriever = await asyncio.to_thread(retriever_manager.get)
 
-    # Use the invoke() method to get relevant documents based on the query
-    retrieved_docs = retriever.invoke(query)
+    # Use the ainvoke() method to get relevant documents without blocking other requests
+    retrieved_docs = await retriever.ainvoke(query)
 
     # Join all document contents with newlines and return as a single string
     return "\n".join([doc.page_content for doc in retrieved_docs])
 
 
 if __name__ == "__main__":
+    # Build (or load) the index once before serving, then watch the PDF for changes
+    retriever_manager.get()
+    retriever_manager.start_watcher()
+
     # Run the MCP server with stdio transport for integration with MCP clients
     mcp.run(transport="stdio")
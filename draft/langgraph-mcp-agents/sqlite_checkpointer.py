@@ -0,0 +1,436 @@
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+import atexit
+import os
+import sqlite3
+import threading
+import time
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+)
+
+DEFAULT_DB_PATH = os.getenv(
+    "CHECKPOINT_DB_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "langgraph-checkpoints", "checkpoints.sqlite3")
+)
+DEFAULT_KEEP_LAST = int(os.getenv("CHECKPOINT_KEEP_LAST", "20"))
+DEFAULT_MAX_BYTES = int(float(os.getenv("CHECKPOINT_MAX_MB", "1024")) * 1024 * 1024)
+DEFAULT_FLUSH_INTERVAL = float(os.getenv("CHECKPOINT_FLUSH_INTERVAL", "0.5"))
+
+# Pending checkpoints that force a flush before the interval ends
+_FLUSH_BATCH_SIZE = 64
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS checkpoints ("
+    "thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL, checkpoint_id TEXT NOT NULL, "
+    "parent_checkpoint_id TEXT, type TEXT NOT NULL, checkpoint BLOB NOT NULL, "
+    "metadata_type TEXT NOT NULL, metadata BLOB NOT NULL, "
+    "PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id))",
+    "CREATE TABLE IF NOT EXISTS writes ("
+    "thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL, checkpoint_id TEXT NOT NULL, "
+    "task_id TEXT NOT NULL, idx INTEGER NOT NULL, channel TEXT NOT NULL, type TEXT NOT NULL, "
+    "value BLOB NOT NULL, task_path TEXT NOT NULL DEFAULT '', "
+    "PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx))",
+    "CREATE TABLE IF NOT EXISTS threads ("
+    "thread_id TEXT PRIMARY KEY, last_access REAL NOT NULL, size INTEGER NOT NULL DEFAULT 0)",
+    "CREATE INDEX IF NOT EXISTS threads_last_access ON threads (last_access)",
+)
+
+
+class SQLiteCheckpointSaver(BaseCheckpointSaver):
+    """
+    Disk-backed LangGraph checkpointer with batched writes and compaction.
+
+    Each checkpoint is stored as one serialized snapshot, so old checkpoints
+    can be dropped without reference counting:
+
+    - Write-ahead batching: put/put_writes only buffer in memory; a background
+      thread commits the buffer in one transaction every flush_interval
+      seconds (or once it holds _FLUSH_BATCH_SIZE checkpoints). Reads flush
+      first, so they always see every write.
+    - Compaction: after each flush, every touched thread keeps only its
+      keep_last most recent checkpoints (and their pending writes).
+    - Size cap: once the stored checkpoints exceed max_bytes, the threads
+      idle the longest are deleted.
+    - Resume: the latest checkpoint of a thread is one primary-key range
+      lookup, so a thread_id can be resumed after a restart.
+    """
+
+    def __init__(self,
+                 path: str = DEFAULT_DB_PATH,
+                 keep_last: int = DEFAULT_KEEP_LAST,
+                 max_bytes: int = DEFAULT_MAX_BYTES,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 **kwargs: Any) -> None:
+        """
+        Open (or create) a checkpoint database.
+
+        Args:
+            path: SQLite database file
+            keep_last: Checkpoints kept per thread and namespace
+            max_bytes: Size of stored checkpoints above which idle threads are evicted
+            flush_interval: Maximum seconds a write stays in memory
+            **kwargs: Passed to BaseCheckpointSaver (e.g. serde)
+        """
+
+        super().__init__(**kwargs)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self.path = path
+        self.keep_last = keep_last
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self.evicted = 0
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30.0)
+        # Must be set before the first table exists to take effect
+        self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in _SCHEMA:
+            self._conn.execute(statement)
+        self._conn.commit()
+
+        self._pending_checkpoints: List[Tuple] = []
+        self._pending_writes: List[Tuple] = []
+        self._pending_access: Dict[str, float] = {}
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._flusher = threading.Thread(target=self._flush_loop, name="checkpoint-flusher", daemon=True)
+        self._flusher.start()
+
+    # ---- Write buffer ----
+
+    def _flush_loop(self) -> None:
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except sqlite3.Error:
+                # Keep the buffer; the next flush retries
+                pass
+
+    def flush(self) -> None:
+        """Commit buffered checkpoints and writes, then compact and enforce the size cap."""
+
+        with self._lock:
+            if not (self._pending_checkpoints or self._pending_writes or self._pending_access):
+                return
+
+            checkpoints, writes, access = self._pending_checkpoints, self._pending_writes, self._pending_access
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)", checkpoints
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [w for w in writes if w[4] < 0]
+                )
+                # Regular writes never replace a stored one (same as the in-memory saver)
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [w for w in writes if w[4] >= 0]
+                )
+
+                touched = {row[:2] for row in checkpoints}
+                for thread_id, checkpoint_ns in touched:
+                    self._compact(thread_id, checkpoint_ns)
+
+                threads = {thread_id for thread_id, _ in touched} | {w[0] for w in writes} | set(access)
+                now = time.time()
+                for thread_id in threads:
+                    self._conn.execute(
+                        "INSERT INTO threads (thread_id, last_access, size) VALUES (?, ?, ?) "
+                        "ON CONFLICT(thread_id) DO UPDATE SET last_access = excluded.last_access, size = excluded.size",
+                        (thread_id, access.get(thread_id, now), self._thread_size(thread_id))
+                    )
+
+                evicted = self._evict(protected=threads)
+
+            self._pending_checkpoints, self._pending_writes, self._pending_access = [], [], {}
+            if evicted:
+                self._conn.execute("PRAGMA incremental_vacuum")
+
+    def _compact(self, thread_id: str, checkpoint_ns: str) -> None:
+        self._conn.execute(
+            "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ("
+            "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+            "ORDER BY checkpoint_id DESC LIMIT 1 OFFSET ?)",
+            (thread_id, checkpoint_ns, thread_id, checkpoint_ns, self.keep_last - 1)
+        )
+        self._conn.execute(
+            "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN ("
+            "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?)",
+            (thread_id, checkpoint_ns, thread_id, checkpoint_ns)
+        )
+
+    def _thread_size(self, thread_id: str) -> int:
+        checkpoints = self._conn.execute(
+            "SELECT COALESCE(SUM(LENGTH(checkpoint) + LENGTH(metadata)), 0) FROM checkpoints WHERE thread_id = ?",
+            (thread_id,)
+        ).fetchone()[0]
+        writes = self._conn.execute(
+            "SELECT COALESCE(SUM(LENGTH(value)), 0) FROM writes WHERE thread_id = ?", (thread_id,)
+        ).fetchone()[0]
+        return checkpoints + writes
+
+    def _evict(self, protected: set) -> int:
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM threads").fetchone()[0]
+        if total <= self.max_bytes:
+            return 0
+
+        evicted = 0
+        for thread_id, size in self._conn.execute(
+            "SELECT thread_id, size FROM threads ORDER BY last_access"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            if thread_id in protected:
+                continue
+            self._delete_thread(thread_id)
+            total -= size
+            evicted += 1
+        self.evicted += evicted
+        return evicted
+
+    def _delete_thread(self, thread_id: str) -> None:
+        for table in ("checkpoints", "writes", "threads"):
+            self._conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+
+    # ---- BaseCheckpointSaver ----
+
+    def _load_tuple(self, row: Tuple) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type_, checkpoint, metadata_type, metadata = row
+        writes = self._conn.execute(
+            "SELECT task_id, channel, type, value FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id)
+        ).fetchall()
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint=self.serde.loads_typed((type_, checkpoint)),
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_checkpoint_id,
+                    }
+                }
+                if parent_checkpoint_id
+                else None
+            ),
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((value_type, value)))
+                for task_id, channel, value_type, value in writes
+            ],
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """Return the checkpoint with the configured checkpoint_id, or the latest one of the thread."""
+
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        self.flush()
+        with self._lock:
+            if checkpoint_id := get_checkpoint_id(config):
+                row = self._conn.execute(
+                    "SELECT * FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id)
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    "SELECT * FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns)
+                ).fetchone()
+            if row is None:
+                return None
+            self._pending_access[thread_id] = time.time()
+            return self._load_tuple(row)
+
+    def list(self,
+             config: Optional[RunnableConfig],
+             *,
+             filter: Optional[Dict[str, Any]] = None,
+             before: Optional[RunnableConfig] = None,
+             limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        """List checkpoints, newest first."""
+
+        self.flush()
+        query, params = "SELECT * FROM checkpoints WHERE 1 = 1", []
+        if config:
+            query += " AND thread_id = ?"
+            params.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                query += " AND checkpoint_ns = ?"
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                query += " AND checkpoint_id = ?"
+                params.append(checkpoint_id)
+        if before and (before_checkpoint_id := get_checkpoint_id(before)):
+            query += " AND checkpoint_id < ?"
+            params.append(before_checkpoint_id)
+        query += " ORDER BY checkpoint_id DESC"
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+            results = []
+            for row in rows:
+                if limit is not None and len(results) >= limit:
+                    break
+                checkpoint_tuple = self._load_tuple(row)
+                if filter and not all(
+                    checkpoint_tuple.metadata.get(key) == value for key, value in filter.items()
+                ):
+                    continue
+                results.append(checkpoint_tuple)
+        yield from results
+
+    def put(self,
+            config: RunnableConfig,
+            checkpoint: Checkpoint,
+            metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        """Buffer a checkpoint; it is committed by the next flush."""
+
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        type_, serialized = self.serde.dumps_typed(checkpoint)
+        metadata_type, serialized_metadata = self.serde.dumps_typed(
+            {**config.get("metadata", {}), **metadata}
+        )
+        with self._lock:
+            self._pending_checkpoints.append((
+                thread_id,
+                checkpoint_ns,
+                checkpoint["id"],
+                config["configurable"].get("checkpoint_id"),
+                type_,
+                serialized,
+                metadata_type,
+                serialized_metadata,
+            ))
+            if len(self._pending_checkpoints) >= _FLUSH_BATCH_SIZE:
+                self._wakeup.set()
+
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(self,
+                   config: RunnableConfig,
+                   writes: Sequence[Tuple[str, Any]],
+                   task_id: str,
+                   task_path: str = "") -> None:
+        """Buffer the pending writes of a task."""
+
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, serialized = self.serde.dumps_typed(value)
+            rows.append((
+                thread_id,
+                checkpoint_ns,
+                checkpoint_id,
+                task_id,
+                WRITES_IDX_MAP.get(channel, idx),
+                channel,
+                type_,
+                serialized,
+                task_path,
+            ))
+        with self._lock:
+            self._pending_writes.extend(rows)
+
+    def delete_thread(self, thread_id: str) -> None:
+        """Delete all checkpoints and writes of a thread."""
+
+        self.flush()
+        with self._lock, self._conn:
+            self._delete_thread(thread_id)
+
+    # MemorySaver-style async API: local SQLite calls are short, and writes only touch memory
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self.get_tuple(config)
+
+    async def alist(self,
+                    config: Optional[RunnableConfig],
+                    *,
+                    filter: Optional[Dict[str, Any]] = None,
+                    before: Optional[RunnableConfig] = None,
+                    limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        for checkpoint_tuple in self.list(config, filter=filter, before=before, limit=limit):
+            yield checkpoint_tuple
+
+    async def aput(self,
+                   config: RunnableConfig,
+                   checkpoint: Checkpoint,
+                   metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        return self.put(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self,
+                          config: RunnableConfig,
+                          writes: Sequence[Tuple[str, Any]],
+                          task_id: str,
+                          task_path: str = "") -> None:
+        self.put_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        self.delete_thread(thread_id)
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of threads and checkpoints, the stored size and evicted threads."""
+
+        self.flush()
+        with self._lock:
+            threads, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM threads").fetchone()
+            checkpoints = self._conn.execute("SELECT COUNT(*) FROM checkpoints").fetchone()[0]
+        return {"threads": threads, "checkpoints": checkpoints, "bytes": size, "evicted": self.evicted}
+
+    def close(self) -> None:
+        """Flush the buffer and close the database."""
+
+        self._closed = True
+        self._wakeup.set()
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+
+_checkpointer: Optional[SQLiteCheckpointSaver] = None
+_checkpointer_lock = threading.Lock()
+
+
+def get_checkpointer() -> SQLiteCheckpointSaver:
+    """Return the process-wide checkpointer, opening it on first use."""
+
+    global _checkpointer
+    with _checkpointer_lock:
+        if _checkpointer is None:
+            _checkpointer = SQLiteCheckpointSaver()
+            atexit.register(_checkpointer.close)
+        return _checkpointer
@@ -0,0 +1,135 @@
+import argparse
+import os
+import random
+import time
+from pathlib import Path
+from typing import List, Dict, Any, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+from langchain_core.documents import Document
+
+from rag import PDFRetrievalChain
+from rag.flat_index import FlatVectorStore
+from rag.matryoshka import truncate_and_normalize
+import config
+
+
+def load_chunks(data_dir: Path) -> Tuple[PDFRetrievalChain, List[Document]]:
+    """
+    Load and split the PDF corpus with the server's chunking settings.
+
+    Args:
+        data_dir: Directory containing PDF files
+
+    Returns:
+        Tuple of (retrieval chain, split document chunks)
+    """
+
+    pdf_paths = [str(path) for path in sorted(data_dir.glob("*.pdf"))]
+    chain = PDFRetrievalChain(
+        source_uri=pdf_paths,
+        embedding_model=config.DEFAULT_EMBEDDING_MODEL,
+        chunk_size=config.DEFAULT_CHUNK_SIZE,
+        chunk_overlap=config.DEFAULT_CHUNK_OVERLAP,
+        ingest_workers=config.INGEST_WORKERS,
+        pages_per_task=config.PAGES_PER_TASK
+    )
+
+    return chain, chain.load_and_split(pdf_paths)
+
+
+def benchmark(chunks: List[Document],
+              chain: PDFRetrievalChain,
+              dimensions: List[int],
+              queries: List[str],
+              k: int) -> List[Dict[str, Any]]:
+    """
+    Compare search latency, memory and recall@k of truncated embeddings.
+
+    Chunks and queries are embedded once at full width (through the embedding
+    cache); shorter sizes are derived by truncation and re-normalization, which
+    matches what the API returns for the same dimensions.
+
+    Args:
+        chunks: Document chunks
+        chain: Retrieval chain used to create the embedding model
+        dimensions: Embedding sizes to compare
+        queries: Benchmark queries
+        k: Number of results per query
+
+    Returns:
+        One result row per embedding size
+    """
+
+    embeddings = chain.create_embedding()
+    full_docs = np.asarray(embeddings.embed_documents([chunk.page_content for chunk in chunks]), dtype=np.float32)
+    full_queries = np.asarray([embeddings.embed_query(query) for query in queries], dtype=np.float32)
+    ids = [str(i) for i in range(len(chunks))]
+
+    reference = None
+    results = []
+    for size in sorted(dimensions, reverse=True):
+        store = FlatVectorStore(embeddings, truncate_and_normalize(full_docs, size), chunks, ids)
+        query_vectors = truncate_and_normalize(full_queries, size)
+
+        started = time.perf_counter()
+        top_rows = [set(store.search_by_vector(vector, k)[0].tolist()) for vector in query_vectors]
+        latency_ms = (time.perf_counter() - started) / len(queries) * 1000
+
+        # The widest size is the reference for recall
+        if reference is None:
+            reference = top_rows
+
+        recall = np.mean([len(rows & ref) / len(ref) for rows, ref in zip(top_rows, reference)])
+        results.append({
+            "dimensions": size,
+            "bytes_per_chunk": size * 4,
+            "index_mb": size * 4 * len(chunks) / 1e6,
+            "latency_ms": latency_ms,
+            "recall": recall
+        })
+
+    return results
+
+
+def main():
+    """
+    Run the embedding dimension benchmark on the PDF corpus.
+    """
+
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Latency / memory / recall trade-off of shortened embeddings")
+    parser.add_argument("--data-dir", default=os.getenv("DATA_DIR", str(config.DATA_DIR)))
+    parser.add_argument("--dimensions", type=int, nargs="+", default=[1536, 1024, 512, 256])
+    parser.add_argument("--queries-file", help="Text file with one query per line (default: sampled chunk openings)")
+    parser.add_argument("--num-queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=config.DEFAULT_TOP_K)
+    args = parser.parse_args()
+
+    chain, chunks = load_chunks(Path(args.data_dir))
+    if not chunks:
+        print(f"No PDF chunks found in {args.data_dir}")
+        return
+
+    if args.queries_file:
+        with open(args.queries_file, "r", encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+    else:
+        sample = random.Random(0).sample(chunks, min(args.num_queries, len(chunks)))
+        queries = [chunk.page_content[:100] for chunk in sample]
+
+    results = benchmark(chunks, chain, args.dimensions, queries, args.k)
+
+    print(f"\n{len(chunks)} chunks, {len(queries)} queries, recall@{args.k} vs {results[0]['dimensions']} dimensions")
+    print(f"{'dims':>6} {'B/chunk':>8} {'index MB':>9} {'ms/query':>9} {'recall':>7}")
+    for row in results:
+        print(
+            f"{row['dimensions']:>6} {row['bytes_per_chunk']:>8} {row['index_mb']:>9.1f} "
+            f"{row['latency_ms']:>9.2f} {row['recall']:>7.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -9,4 +9,65 @@ DEFAULT_CHUNK_SIZE = 600
 DEFAULT_CHUNK_OVERLAP = 50
 DEFAULT_TOP_K = 5
 DEFAULT_EMBEDDING_MODEL = "text-embedding-3-small"
-DEFAULT_LLM_MODEL = "gpt-4o-mini"
\ No newline at end of file
+EMBEDDING_DIMENSIONS = None  # e.g. 512 for shortened (Matryoshka) vectors; None keeps full width
+DEFAULT_LLM_MODEL = "gpt-4o-mini"
+
+# Embedding backend: "openai", or "onnx" to run a local model without API calls.
+# For "onnx", DEFAULT_EMBEDDING_MODEL is the directory written by
+# `optimum-cli export onnx` (model.onnx / model_quantized.onnx + tokenizer.json), and
+# EMBEDDING_PARAMS are OnnxEmbeddings options, e.g.
+# {"intra_op_threads": 4, "query_prefix": "query: ", "document_prefix": "passage: "}
+EMBEDDING_BACKEND = "openai"
+EMBEDDING_PARAMS = {}
+
+# Concurrent search queries wait up to QUERY_BATCH_WAIT_MS to share one embedding
+# request of at most QUERY_BATCH_SIZE queries (0 disables batching)
+QUERY_BATCH_WAIT_MS = 5.0
+QUERY_BATCH_SIZE = 64
+
+# Ingestion settings
+INCREMENTAL_INGEST = True
+DEFAULT_EMBED_BATCH_SIZE = 256
+INGEST_WORKERS = None  # None uses all CPU cores
+PAGES_PER_TASK = 8  # PDF pages parsed per worker task
+
+# Vector store settings ("chroma", or "flat" for a memory-mapped .npy index
+# shared by all server processes; VECTOR_DTYPE "float16" halves its size)
+VECTOR_BACKEND = "chroma"
+VECTOR_DTYPE = "float32"
+
+# Approximate search over the flat index: "exact", "ivf" or "hnsw".
+# Build parameters: {"nlist": ...} for IVF, {"M": ..., "ef_construction": ...} for HNSW.
+# Query parameters: {"nprobe": ...} for IVF, {"ef": ...} for HNSW.
+# Parameters of the other index type are ignored, so both can be set at once.
+ANN_INDEX = "exact"
+ANN_PARAMS = {}
+ANN_SEARCH_PARAMS = {}
+
+# Quantized flat index: "none", "int8" (4x smaller) or "pq" (m bytes per chunk).
+# Candidates are reranked with the exact vectors, which stay on disk.
+# Parameters: {"m": 96} for PQ (must divide the embedding dimension),
+# {"rerank_factor": 4} candidates reranked per result for both.
+QUANTIZATION = "none"
+QUANTIZATION_PARAMS = {}
+
+# Rerank stage for hybrid search: "none", "cross-encoder" (sentence-transformers)
+# or "flashrank". When enabled, RERANK_CANDIDATES hybrid results are scored in one
+# batched CPU pass and the best top_k are returned.
+# Parameters: {"batch_size": 32, "max_length": 512} for "cross-encoder",
+# {"max_length": 512, "cache_dir": "..."} for "flashrank"; options of the other
+# reranker are ignored. Both accept {"cache_size": 10000} cached scores.
+RERANKER = "none"
+RERANKER_MODEL = None  # None uses BAAI/bge-reranker-v2-m3 / ms-marco-MultiBERT-L-12
+RERANK_CANDIDATES = 20
+RERANKER_PARAMS = {}
+
+# Near-duplicate chunk removal before embedding (MinHash LSH over character shingles).
+# None disables it; e.g. 0.85 drops chunks whose estimated Jaccard similarity to an
+# earlier chunk is at least 0.85, recording their source/page on the kept chunk.
+# Parameters: {"num_perm": 128, "bands": 16, "shingle_size": 5}
+DEDUP_THRESHOLD = None
+DEDUP_PARAMS = {}
+
+# Keyword search settings ("whitespace" or "kiwi" for Korean morpheme analysis)
+KEYWORD_TOKENIZER = "kiwi"
@@ -1,4 +1,5 @@
 import os
+import threading
 from pathlib import Path
 from typing import List
 
@@ -17,13 +18,65 @@ pdf_paths = [str(path) for path in pdf_files]
 
 VECTOR_DIR = Path(os.getenv("VECTOR_DIR", config.VECTOR_DIR))
 
-rag_chain = PDFRetrievalChain(
-    source_uri = pdf_paths,
-    persist_directory = str(VECTOR_DIR),
-    k = config.DEFAULT_TOP_K,
-    embedding_model = config.DEFAULT_EMBEDDING_MODEL,
-    llm_model = config.DEFAULT_LLM_MODEL
-).initialize()
+
+def build_rag_chain() -> PDFRetrievalChain:
+    """
+    Build and ingest the RAG chain.
+
+    Not run at import time: with the spawn start method (macOS/Windows) every
+    ingest or tokenizer worker process re-imports this module, and would run
+    the whole ingest again.
+
+    Returns:
+        Initialized PDFRetrievalChain
+    """
+
+    return PDFRetrievalChain(
+        source_uri = pdf_paths,
+        persist_directory = str(VECTOR_DIR),
+        k = config.DEFAULT_TOP_K,
+        embedding_model = config.DEFAULT_EMBEDDING_MODEL,
+        embedding_dimensions = config.EMBEDDING_DIMENSIONS,
+        embedding_backend = config.EMBEDDING_BACKEND,
+        embedding_params = config.EMBEDDING_PARAMS,
+        query_batch_wait_ms = config.QUERY_BATCH_WAIT_MS,
+        query_batch_size = config.QUERY_BATCH_SIZE,
+        llm_model = config.DEFAULT_LLM_MODEL,
+        incremental = config.INCREMENTAL_INGEST,
+        chunk_size = config.DEFAULT_CHUNK_SIZE,
+        chunk_overlap = config.DEFAULT_CHUNK_OVERLAP,
+        embed_batch_size = config.DEFAULT_EMBED_BATCH_SIZE,
+        keyword_tokenizer = config.KEYWORD_TOKENIZER,
+        ingest_workers = config.INGEST_WORKERS,
+        pages_per_task = config.PAGES_PER_TASK,
+        vector_backend = config.VECTOR_BACKEND,
+        vector_dtype = config.VECTOR_DTYPE,
+        ann_index = config.ANN_INDEX,
+        ann_params = config.ANN_PARAMS,
+        ann_search_params = config.ANN_SEARCH_PARAMS,
+        quantization = config.QUANTIZATION,
+        quantization_params = config.QUANTIZATION_PARAMS,
+        reranker = config.RERANKER,
+        reranker_model = config.RERANKER_MODEL,
+        rerank_candidates = config.RERANK_CANDIDATES,
+        reranker_params = config.RERANKER_PARAMS,
+        dedup_threshold = config.DEDUP_THRESHOLD,
+        dedup_params = config.DEDUP_PARAMS
+    ).initialize()
+
+
+rag_chain = None
+_rag_chain_lock = threading.Lock()
+
+
+def get_rag_chain() -> PDFRetrievalChain:
+    """Return the RAG chain, building it on first use (e.g. under `mcp dev`)."""
+
+    global rag_chain
+    with _rag_chain_lock:
+        if rag_chain is None:
+            rag_chain = build_rag_chain()
+        return rag_chain
 
 mcp = FastMCP(
     name="RAG",
@@ -74,7 +127,7 @@ async def keyword_search(query: str, top_k: int = 5) -> str:
     """
 
     try:
-        results = rag_chain.search_keyword(query, top_k)
+        results = await get_rag_chain().asearch_keyword(query, top_k)
         return format_search_results(results)
     except Exception as e:
         return f"An error occurred during search: {str(e)}"
@@ -93,7 +146,7 @@ async def semantic_search(query: str, top_k: int = 5) -> str:
     """
 
     try:
-        results = rag_chain.search_semantic(query, top_k)
+        results = await get_rag_chain().asearch_semantic(query, top_k)
         return format_search_results(results)
     except Exception as e:
         return f"An error occurred during search: {str(e)}"
@@ -112,10 +165,37 @@ async def hybrid_search(query: str, top_k: int = 5) -> str:
     """
 
     try:
-        results = rag_chain.search_hybrid(query, top_k)
+        results = await get_rag_chain().asearch_hybrid(query, top_k)
         return format_search_results(results)
     except Exception as e:
         return f"An error occurred during search: {str(e)}"
 
+@mcp.tool()
+async def batch_search(queries: List[str], search_type: str = "hybrid", top_k: int = 5) -> str:
+    """
+    Runs several related searches on PDF documents in a single call.
+    Faster than calling the individual search tools once per query, since all queries share one embedding request.
+    Use when you need to look up multiple terms, sub-questions, or phrasings at once.
+    
+    Parameters:
+        queries: List of search queries
+        search_type: Search type for every query ("keyword", "semantic" or "hybrid")
+        top_k: Number of results to return per query
+
+    """
+
+    try:
+        results = await get_rag_chain().asearch_many(queries, mode=search_type, k=top_k)
+        
+        sections = []
+        for i, (query, docs) in enumerate(zip(queries, results), 1):
+            sections.append(f"# Query {i}: {query}\n\n{format_search_results(docs)}")
+        
+        return "\n".join(sections) if sections else "No queries were provided."
+    except Exception as e:
+        return f"An error occurred during search: {str(e)}"
+
 if __name__ == "__main__":
+    # Ingest before serving, so the first tool call does not wait for it
+    get_rag_chain()
     mcp.run()
\ No newline at end of file
@@ -0,0 +1,330 @@
+from typing import List, Dict, Any, Optional, Tuple
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from rag.keyword_index import top_k_indices
+from rag.quantization import cluster_sums
+
+ANN_INDEX_TYPES = ("exact", "ivf", "hnsw")
+ANN_META_FILE = "ann.json"
+IVF_FILE = "ivf.npz"
+HNSW_FILE = "hnsw.bin"
+
+# Parameters accepted per index type; keys of the other type are ignored, so
+# one configuration can hold the parameters of both
+ANN_BUILD_PARAM_KEYS = {
+    "ivf": ("nlist", "iterations", "sample_size", "seed"),
+    "hnsw": ("M", "ef_construction", "seed")
+}
+ANN_SEARCH_PARAM_KEYS = {
+    "ivf": ("nprobe",),
+    "hnsw": ("ef",)
+}
+
+# Rows scored per block while training and assigning IVF lists
+_BLOCK_SIZE = 16384
+
+
+def _as_query(vector: List[float]) -> np.ndarray:
+    query = np.asarray(vector, dtype=np.float32)
+    return query / max(float(np.linalg.norm(query)), 1e-12)
+
+
+class IVFIndex:
+    """
+    Inverted-file index over the rows of a (memory-mapped) vector matrix.
+
+    Rows are clustered into nlist lists with spherical k-means. A query scores
+    the centroids, then scores exactly only the rows of the nprobe closest
+    lists. The index stores just the centroids and the row order, so the
+    vectors themselves stay in the shared memory map.
+    """
+
+    def __init__(self, centroids: np.ndarray, order: np.ndarray, offsets: np.ndarray, nprobe: int = 8) -> None:
+        """
+        Initialize an IVF index.
+
+        Args:
+            centroids: Normalized list centroids, one row per list
+            order: Row ids sorted by list
+            offsets: Start of each list in order, plus the end of the last one
+            nprobe: Default number of lists scored per query
+        """
+
+        self.centroids = centroids
+        self.order = order
+        self.offsets = offsets
+        self.nprobe = nprobe
+
+    @classmethod
+    def build(cls,
+              vectors: np.ndarray,
+              nlist: Optional[int] = None,
+              iterations: int = 10,
+              sample_size: int = 100000,
+              nprobe: int = 8,
+              seed: int = 0) -> "IVFIndex":
+        """
+        Train centroids on a sample of rows and assign every row to a list.
+
+        Args:
+            vectors: Normalized vectors (float32 or float16, may be a memmap)
+            nlist: Number of lists (default: 4 * sqrt(number of rows))
+            iterations: k-means iterations
+            sample_size: Maximum number of rows used for training
+            nprobe: Default number of lists scored per query
+            seed: Random seed
+
+        Returns:
+            The built index
+        """
+
+        n_rows = len(vectors)
+        nlist = max(1, min(nlist or int(4 * np.sqrt(n_rows)), n_rows))
+        rng = np.random.default_rng(seed)
+
+        sample_rows = np.sort(rng.choice(n_rows, size=min(sample_size, n_rows), replace=False))
+        sample = np.asarray(vectors[sample_rows], dtype=np.float32)
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+
+        for _ in range(iterations):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            sums, counts = cluster_sums(sample, assign, nlist)
+
+            # Re-seed empty lists with random sample rows
+            empty = counts == 0
+            sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+            centroids = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+
+        assign = np.empty(n_rows, dtype=np.int64)
+        for start in range(0, n_rows, _BLOCK_SIZE):
+            block = np.asarray(vectors[start:start + _BLOCK_SIZE], dtype=np.float32)
+            assign[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+
+        order = np.argsort(assign, kind="stable")
+        offsets = np.searchsorted(assign[order], np.arange(nlist + 1))
+
+        return cls(centroids.astype(np.float32), order, offsets, nprobe=nprobe)
+
+    def search(self,
+               vectors: np.ndarray,
+               vector: List[float],
+               k: int,
+               nprobe: Optional[int] = None,
+               **kwargs: Any) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find approximate nearest rows.
+
+        Args:
+            vectors: The indexed vectors
+            vector: Query embedding
+            k: Number of results to return
+            nprobe: Number of lists to score (default: self.nprobe); more lists
+                are scored when these hold fewer than k rows
+
+        Returns:
+            Tuple of (row indices, cosine similarities), best first
+        """
+
+        query = _as_query(vector)
+        ranked = np.argsort(-(self.centroids @ query), kind="stable")
+
+        # Probe nprobe lists, and more if they hold fewer than k rows
+        covered = np.cumsum(np.diff(self.offsets)[ranked])
+        lists = ranked[:max(nprobe or self.nprobe, int(np.searchsorted(covered, k)) + 1)]
+
+        rows = np.concatenate([self.order[self.offsets[i]:self.offsets[i + 1]] for i in lists])
+        # Sorted rows turn the gather into mostly sequential reads of the memory map
+        rows = np.sort(rows)
+        scores = np.asarray(vectors[rows], dtype=np.float32) @ query
+
+        top = top_k_indices(scores, k)
+        return rows[top], scores[top]
+
+    def save(self, path: str) -> None:
+        np.savez(os.path.join(path, IVF_FILE), centroids=self.centroids, order=self.order, offsets=self.offsets)
+
+    @classmethod
+    def load(cls, path: str, nprobe: int = 8) -> "IVFIndex":
+        with np.load(os.path.join(path, IVF_FILE)) as data:
+            return cls(data["centroids"], data["order"], data["offsets"], nprobe=nprobe)
+
+
+class HNSWIndex:
+    """
+    HNSW graph index built with hnswlib (installed with chromadb).
+
+    Unlike IVFIndex, hnswlib keeps its own in-memory copy of the vectors, so
+    each process pays for the graph and the vectors once.
+    """
+
+    def __init__(self, index: Any, ef: int = 64) -> None:
+        """
+        Initialize an HNSW index.
+
+        Args:
+            index: hnswlib.Index instance
+            ef: Default size of the dynamic candidate list at query time
+        """
+
+        self.index = index
+        self.ef = ef
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _hnswlib() -> Any:
+        try:
+            import hnswlib
+        except ImportError:
+            raise ImportError("hnswlib is required for the HNSW index. Install it with: pip install chroma-hnswlib")
+        return hnswlib
+
+    @classmethod
+    def build(cls,
+              vectors: np.ndarray,
+              M: int = 16,
+              ef_construction: int = 200,
+              ef: int = 64,
+              seed: int = 0,
+              **kwargs: Any) -> "HNSWIndex":
+        """
+        Build an HNSW graph over all rows.
+
+        Args:
+            vectors: Normalized vectors (float32 or float16, may be a memmap)
+            M: Number of graph neighbours per node
+            ef_construction: Size of the candidate list while building
+            ef: Default size of the candidate list at query time
+            seed: Random seed
+
+        Returns:
+            The built index
+        """
+
+        hnswlib = cls._hnswlib()
+        index = hnswlib.Index(space="ip", dim=vectors.shape[1])
+        index.init_index(max_elements=len(vectors), M=M, ef_construction=ef_construction, random_seed=seed)
+
+        for start in range(0, len(vectors), _BLOCK_SIZE):
+            block = np.asarray(vectors[start:start + _BLOCK_SIZE], dtype=np.float32)
+            index.add_items(block, np.arange(start, start + len(block)))
+
+        return cls(index, ef=ef)
+
+    def search(self,
+               vectors: np.ndarray,
+               vector: List[float],
+               k: int,
+               ef: Optional[int] = None,
+               **kwargs: Any) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find approximate nearest rows.
+
+        Args:
+            vectors: The indexed vectors (unused; hnswlib keeps its own copy)
+            vector: Query embedding
+            k: Number of results to return
+            ef: Size of the candidate list (default: self.ef, at least k)
+
+        Returns:
+            Tuple of (row indices, cosine similarities), best first
+        """
+
+        k = min(k, self.index.get_current_count())
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        # ef is index-wide state in hnswlib, so set it and query under one lock
+        with self._lock:
+            self.index.set_ef(max(ef or self.ef, k))
+            labels, distances = self.index.knn_query(_as_query(vector)[None, :], k=k)
+
+        return labels[0].astype(np.int64), (1.0 - distances[0]).astype(np.float32)
+
+    def save(self, path: str) -> None:
+        self.index.save_index(os.path.join(path, HNSW_FILE))
+
+    @classmethod
+    def load(cls, path: str, dim: int, ef: int = 64) -> "HNSWIndex":
+        hnswlib = cls._hnswlib()
+        index = hnswlib.Index(space="ip", dim=dim)
+        index.load_index(os.path.join(path, HNSW_FILE))
+        return cls(index, ef=ef)
+
+
+def _params_for(index_type: str,
+                params: Optional[Dict[str, Any]],
+                keys: Dict[str, Tuple[str, ...]],
+                kind: str) -> Dict[str, Any]:
+    # Keep the parameters of index_type, drop those of other index types and reject the rest
+    params = dict(params or {})
+    known = {key for type_keys in keys.values() for key in type_keys}
+    unknown = sorted(key for key in params if key not in known)
+    if unknown:
+        raise ValueError(
+            f"Unknown {kind} parameters for the {index_type} index: {unknown}. "
+            f"Expected any of {keys[index_type]}."
+        )
+    return {key: value for key, value in params.items() if key in keys[index_type]}
+
+
+def load_or_build_ann_index(index_type: str,
+                            vectors: np.ndarray,
+                            path: Optional[str] = None,
+                            params: Optional[Dict[str, Any]] = None,
+                            search_params: Optional[Dict[str, Any]] = None) -> Optional[Any]:
+    """
+    Load the ANN index persisted next to a vector matrix, or build (and persist) it.
+
+    Args:
+        index_type: "exact", "ivf" or "hnsw"
+        vectors: Normalized vectors
+        path: Directory of the vector matrix; the index is kept in memory only if omitted
+        params: Build parameters (nlist for IVF; M and ef_construction for HNSW)
+        search_params: Default query parameters (nprobe for IVF, ef for HNSW)
+
+    Returns:
+        The index, or None for exact search
+
+    Raises:
+        ValueError: If index_type is unknown, or params or search_params hold
+            keys that belong to no index type
+    """
+
+    if index_type not in ANN_INDEX_TYPES:
+        raise ValueError(f"Unknown ANN index type: {index_type}. Expected one of {ANN_INDEX_TYPES}.")
+
+    if index_type == "exact" or len(vectors) == 0:
+        return None
+
+    params = _params_for(index_type, params, ANN_BUILD_PARAM_KEYS, "build")
+    search_params = _params_for(index_type, search_params, ANN_SEARCH_PARAM_KEYS, "search")
+    meta = {"type": index_type, "params": params, "count": len(vectors)}
+
+    if path and os.path.exists(os.path.join(path, ANN_META_FILE)):
+        try:
+            with open(os.path.join(path, ANN_META_FILE), "r", encoding="utf-8") as f:
+                if json.load(f) == meta:
+                    if index_type == "ivf":
+                        return IVFIndex.load(path, **search_params)
+                    return HNSWIndex.load(path, dim=vectors.shape[1], **search_params)
+        except (OSError, ValueError, RuntimeError) as e:
+            print(f"Could not load {index_type} index from {path}: {e}")
+
+    started = time.perf_counter()
+    if index_type == "ivf":
+        index = IVFIndex.build(vectors, **params, **search_params)
+    else:
+        index = HNSWIndex.build(vectors, **params, **search_params)
+    print(f"Built {index_type} index over {len(vectors)} vectors in {time.perf_counter() - started:.1f}s")
+
+    if path:
+        index.save(path)
+        with open(os.path.join(path, ANN_META_FILE), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+    return index
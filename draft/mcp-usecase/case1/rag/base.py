@@ -1,13 +1,29 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
+import asyncio
+import functools
+import os
 
-from langchain.retrievers.ensemble import EnsembleRetriever
-from langchain_community.retrievers import BM25Retriever
 from langchain_core.documents import Document
 from langchain_core.retrievers import BaseRetriever
 from langchain_openai import OpenAIEmbeddings
 
+from rag.embedding_batcher import CoalescingEmbeddings
+from rag.dedup import deduplicate_chunks
+from rag.embedding_cache import CachedEmbeddings, aembed_queries, embed_queries, get_embedding_cache
+from rag.hybrid import HybridRetriever, HybridSearcher, dense_search_by_vector, get_executor
+from rag.keyword_index import KeywordRetriever, load_or_build_index
+from rag.matryoshka import TruncatedEmbeddings
+from rag.onnx_embeddings import OnnxEmbeddings, VECTOR_PARAM_KEYS
+from rag.rerank import Reranker, create_reranker
+from rag.tokenization import TokenCache, get_tokenizer, tokenize_texts
+
+EMBEDDING_BACKENDS = ("openai", "onnx")
+
+SEARCH_MODES = ("semantic", "keyword", "hybrid")
+
+
 class RetrievalChain(ABC):
     """
     Abstract base class for RAG search implementations.
@@ -25,14 +41,58 @@ class RetrievalChain(ABC):
             **kwargs: Keyword arguments including:
                 source_uri: Paths to source documents
                 k: Number of results to return (default: 5)
-                embedding_model: Model name for embeddings (default: OpenAI "text-embedding-3-small")
+                embedding_model: Model name for embeddings (default: OpenAI "text-embedding-3-small"),
+                    or the model directory for the onnx backend
+                embedding_backend: "openai", or "onnx" for a local ONNX-exported model (default: "openai")
+                embedding_params: Options of the onnx backend, e.g. intra_op_threads,
+                    batch_size, query_prefix (see OnnxEmbeddings)
+                query_batch_wait_ms: Time concurrent queries wait to share one embedding
+                    request; 0 disables query batching (default: 5.0, openai backend only)
+                query_batch_size: Maximum number of queries per embedding request (default: 64)
+                embedding_dimensions: Shortened (Matryoshka) embedding size, e.g. 512;
+                    None keeps the model's full width (default: None)
                 persist_directory: Directory to persist vector store
+                embedding_cache: Cache embeddings on disk (default: True)
+                embedding_cache_path: SQLite file of the embedding cache
+                    (default: EMBEDDING_CACHE_PATH, shared by all chains)
+                keyword_tokenizer: Tokenizer of the keyword index, "whitespace" or
+                    "kiwi" for Korean morpheme analysis (default: "whitespace")
+                ingest_workers: Number of worker processes used at ingest (default: CPU count)
+                hybrid_fusion: Hybrid score fusion, "rrf" or "blend" (default: "rrf")
+                hybrid_weights: Weights of keyword and semantic results (default: (0.5, 0.5))
+                dedup_threshold: Drop near-duplicate chunks whose estimated Jaccard
+                    similarity is at least this value; None disables deduplication (default: None)
+                dedup_params: MinHash options num_perm, bands and shingle_size
+                reranker: Rerank stage for hybrid results, "none", "cross-encoder" or
+                    "flashrank" (default: "none")
+                reranker_model: Reranker model (default: per reranker type)
+                rerank_candidates: Hybrid candidates fetched per query for reranking (default: 20)
+                reranker_params: Scorer options, e.g. batch_size, max_length, cache_size
         """
 
         self.source_uri = kwargs.get("source_uri", [])
         self.k = kwargs.get("k", 5)
         self.embedding_model = kwargs.get("embedding_model", "text-embedding-3-small")
+        self.embedding_dimensions = kwargs.get("embedding_dimensions", None)
+        self.embedding_backend = kwargs.get("embedding_backend", "openai")
+        self.embedding_params = dict(kwargs.get("embedding_params", {}) or {})
+        self.query_batch_wait_ms = kwargs.get("query_batch_wait_ms", 5.0)
+        self.query_batch_size = kwargs.get("query_batch_size", 64)
         self.persist_directory = kwargs.get("persist_directory", None)
+        self.embedding_cache = kwargs.get("embedding_cache", True)
+        self.embedding_cache_path = kwargs.get("embedding_cache_path", None)
+        self.keyword_tokenizer = kwargs.get("keyword_tokenizer", "whitespace")
+        self.ingest_workers = kwargs.get("ingest_workers", None)
+        self.hybrid_fusion = kwargs.get("hybrid_fusion", "rrf")
+        self.hybrid_weights = tuple(kwargs.get("hybrid_weights", (0.5, 0.5)))
+        self.dedup_threshold = kwargs.get("dedup_threshold", None)
+        self.dedup_params = dict(kwargs.get("dedup_params", {}) or {})
+        self.dedup_report = None
+        self.reranker_type = kwargs.get("reranker", "none")
+        self.reranker_model = kwargs.get("reranker_model", None)
+        self.rerank_candidates = kwargs.get("rerank_candidates", 20)
+        self.reranker_params = dict(kwargs.get("reranker_params", {}) or {})
+        self.reranker = None
         self.embeddings = None
         self.vectorstore = None
         self.retrievers = None
@@ -77,15 +137,116 @@ class RetrievalChain(ABC):
 
         return text_splitter.split_documents(docs)
     
+    def load_and_split(self, source_uris: List[str]) -> List[Document]:
+        """
+        Load documents and split them into chunks.
+        
+        Subclasses can override this to overlap loading and splitting.
+        
+        Args:
+            source_uris: List of file paths or URIs to load documents from
+            
+        Returns:
+            Split document chunks
+        """
+
+        docs = self.load_documents(source_uris)
+        if not docs:
+            return []
+        
+        return self.split_documents(docs, self.create_text_splitter())
+    
+    def deduplicate(self, split_docs: List[Document]) -> List[Document]:
+        """
+        Drop near-duplicate chunks before they are embedded.
+        
+        Uses MinHash LSH over character shingles; the surviving chunk records the
+        source and page of the chunks merged into it.
+        
+        Args:
+            split_docs: Split document chunks, in source order
+            
+        Returns:
+            Surviving chunks, in source order (split_docs if deduplication is disabled)
+        """
+
+        if self.dedup_threshold is None:
+            return split_docs
+        
+        survivors, self.dedup_report = deduplicate_chunks(split_docs, self.dedup_threshold, **self.dedup_params)
+        return survivors
+    
+    def bytes_per_vector(self) -> Optional[int]:
+        """
+        Size of one stored vector, used to report the index size saved by deduplication.
+        
+        Returns:
+            Number of bytes, or None if unknown
+        """
+
+        return None
+    
     def create_embedding(self) -> Any:
         """
         Create an embedding model instance.
         
+        Unless embedding_cache is disabled, the model is wrapped with a disk-backed
+        cache so that identical chunks and repeated queries are embedded only once.
+        With embedding_dimensions set, shortened vectors are requested and
+        re-normalized to unit length. The onnx backend runs a local model
+        instead of calling the OpenAI API; with the openai backend, concurrent
+        queries that miss the cache are merged into one embedding request.
+        
         Returns:
             An embeddings model instance
+        
+        Raises:
+            ValueError: If embedding_backend is unknown
         """
 
-        return OpenAIEmbeddings(model=self.embedding_model)
+        if self.embedding_backend not in EMBEDDING_BACKENDS:
+            raise ValueError(
+                f"Unknown embedding backend: {self.embedding_backend}. Expected one of {EMBEDDING_BACKENDS}."
+            )
+        
+        model_name = self.embedding_model
+        if self.embedding_backend == "onnx":
+            embeddings = OnnxEmbeddings(self.embedding_model, **self.embedding_params)
+            model_name = f"onnx:{os.path.basename(os.path.normpath(self.embedding_model))}/{embeddings.model_file}"
+            # Prefixes and truncation change the vectors, so they are part of the cache key
+            vector_params = {key: self.embedding_params[key] for key in VECTOR_PARAM_KEYS if key in self.embedding_params}
+            vector_params.pop("model_file", None)
+            if vector_params:
+                model_name += "|" + "|".join(f"{key}={value!r}" for key, value in sorted(vector_params.items()))
+            if self.embedding_dimensions:
+                embeddings = TruncatedEmbeddings(embeddings, self.embedding_dimensions)
+        elif self.embedding_dimensions:
+            embeddings = TruncatedEmbeddings(
+                OpenAIEmbeddings(model=self.embedding_model, dimensions=self.embedding_dimensions),
+                self.embedding_dimensions
+            )
+        else:
+            embeddings = OpenAIEmbeddings(model=self.embedding_model)
+        
+        # The onnx backend batches concurrent queries itself
+        if self.embedding_backend == "openai" and self.query_batch_wait_ms:
+            embeddings = CoalescingEmbeddings(
+                embeddings,
+                max_batch_size=self.query_batch_size,
+                max_wait_ms=self.query_batch_wait_ms
+            )
+        
+        if self.embedding_dimensions:
+            model_name = f"{model_name}@{self.embedding_dimensions}"
+        
+        if not self.embedding_cache:
+            return embeddings
+        
+        return CachedEmbeddings(
+            embeddings,
+            model_name=model_name,
+            cache=get_embedding_cache(self.embedding_cache_path)
+        )
     
     @abstractmethod
     def create_vectorstore(self, split_docs: List[Document]) -> Any:
@@ -116,10 +277,27 @@ class RetrievalChain(ABC):
             search_kwargs={"k": self.k}
         )
     
+    def keyword_index_path(self) -> Optional[str]:
+        """
+        Directory where the keyword index is persisted.
+        
+        Returns:
+            A directory next to the vector store, or None if nothing is persisted
+        """
+
+        if not self.persist_directory:
+            return None
+        
+        return os.path.join(self.persist_directory, "keyword_index")
+    
     def create_keyword_retriever(self, split_docs: List[Document]) -> BaseRetriever:
         """
         Create a keyword-based search retriever.
         
+        The BM25 index is loaded from keyword_index_path() when it was built from
+        the same chunks, and rebuilt (and saved) otherwise. Chunk token streams
+        are cached on disk, so a rebuild only tokenizes new chunks.
+        
         Args:
             split_docs: Split document chunks
             
@@ -127,27 +305,61 @@ class RetrievalChain(ABC):
             A keyword search retriever
         """
 
-        return BM25Retriever.from_documents(split_docs, k=self.k)
+        tokenizer_name = self.keyword_tokenizer
+        try:
+            tokenizer = get_tokenizer(tokenizer_name)
+            tokenizer("")
+        except ImportError as e:
+            print(f"{e} Falling back to whitespace tokenization.")
+            tokenizer_name = "whitespace"
+            tokenizer = get_tokenizer(tokenizer_name)
+        
+        token_cache = None
+        if self.persist_directory:
+            token_cache = TokenCache(os.path.join(self.persist_directory, "token_cache.sqlite3"))
+        
+        index = load_or_build_index(
+            split_docs,
+            path=self.keyword_index_path(),
+            tokenizer=tokenizer,
+            tokenizer_name=tokenizer_name,
+            tokenize_texts=lambda texts: tokenize_texts(
+                texts, tokenizer_name, cache=token_cache, workers=self.ingest_workers
+            )
+        )
+        
+        return KeywordRetriever(index=index, k=self.k)
     
-    def create_hybrid_retriever(self, split_docs: List[Document], vectorstore: Any) -> BaseRetriever:
+    def create_hybrid_retriever(self,
+                                split_docs: List[Document],
+                                vectorstore: Any,
+                                keyword_retriever: Optional[BaseRetriever] = None) -> BaseRetriever:
         """
         Create a hybrid search retriever combining keyword and semantic search.
         
+        Keyword and semantic searches run concurrently and are fused into one
+        scored ranking (see rag.hybrid).
+        
         Args:
             split_docs: Split document chunks
             vectorstore: Vector store instance
+            keyword_retriever: Existing keyword retriever to share the BM25 index with
             
         Returns:
             A hybrid search retriever
         """
 
-        bm25_retriever = self.create_keyword_retriever(split_docs)
-        dense_retriever = self.create_semantic_retriever(vectorstore)
+        keyword_retriever = keyword_retriever or self.create_keyword_retriever(split_docs)
         
-        return EnsembleRetriever(
-            retrievers=[bm25_retriever, dense_retriever],
-            weights=[0.5, 0.5]
+        searcher = HybridSearcher(
+            vectorstore=vectorstore,
+            keyword_index=keyword_retriever.index,
+            embeddings=self.embeddings,
+            weights=self.hybrid_weights,
+            method=self.hybrid_fusion
         )
+        
+        return HybridRetriever(searcher=searcher, k=self.k)
     
     def create_retrievers(self, split_docs: List[Document]) -> Dict[str, BaseRetriever]:
         """
@@ -163,12 +375,44 @@ class RetrievalChain(ABC):
         self.embeddings = self.create_embedding()
         self.vectorstore = self.create_vectorstore(split_docs)
         
+        return self.build_retrievers(split_docs, self.vectorstore)
+    
+    def build_retrievers(self, split_docs: List[Document], vectorstore: Any) -> Dict[str, BaseRetriever]:
+        """
+        Create all retriever types on top of an existing vector store.
+        
+        Args:
+            split_docs: Split document chunks
+            vectorstore: Vector store instance
+            
+        Returns:
+            Dictionary of retrievers by search type
+        """
+
+        keyword_retriever = self.create_keyword_retriever(split_docs)
+        self.reranker = self.create_reranker()
+        
         return {
-            "semantic": self.create_semantic_retriever(self.vectorstore),
-            "keyword": self.create_keyword_retriever(split_docs),
-            "hybrid": self.create_hybrid_retriever(split_docs, self.vectorstore)
+            "semantic": self.create_semantic_retriever(vectorstore),
+            "keyword": keyword_retriever,
+            "hybrid": self.create_hybrid_retriever(split_docs, vectorstore, keyword_retriever)
         }
     
+    def create_reranker(self) -> Optional[Reranker]:
+        """
+        Create the rerank stage applied to hybrid search results.
+        
+        Returns:
+            The reranker, or None if reranking is disabled
+        """
+
+        return create_reranker(
+            self.reranker_type,
+            model_name=self.reranker_model,
+            candidates=self.rerank_candidates,
+            **self.reranker_params
+        )
+    
     def initialize(self) -> "RetrievalChain":
         """
         Initialize the retrieval chain by loading documents, splitting them,
@@ -178,15 +422,14 @@ class RetrievalChain(ABC):
             The initialized retrieval chain instance
         """
 
-        docs = self.load_documents(self.source_uri)
-        if not docs:
+        self.split_docs = self.deduplicate(self.load_and_split(self.source_uri))
+        if not self.split_docs:
             print("No documents were loaded.")
             return self
         
-        text_splitter = self.create_text_splitter()
-        self.split_docs = self.split_documents(docs, text_splitter)
-        
         self.retrievers = self.create_retrievers(self.split_docs)
+        if self.dedup_report:
+            self.dedup_report.print_report(self.bytes_per_vector())
         
         print(f"Initialization complete: {len(self.split_docs)} chunks created")
         return self
@@ -221,7 +464,7 @@ class RetrievalChain(ABC):
         
         Args:
             query: Search query
-            k: Number of results to return (Note: BM25Retriever may not support dynamic k)
+            k: Number of results to return, overrides self.k
             
         Returns:
             Relevant documents
@@ -233,15 +476,19 @@ class RetrievalChain(ABC):
         if not hasattr(self, 'retrievers') or self.retrievers is None:
             raise ValueError("Initialization required. Call initialize() method first.")
         
-        return self.retrievers["keyword"].get_relevant_documents(query)
+        return self.retrievers["keyword"].search(query, k or self.k)
     
-    def search_hybrid(self, query: str, k: Optional[int] = None) -> List[Document]:
+    def search_hybrid(self,
+                      query: str,
+                      k: Optional[int] = None,
+                      score_threshold: Optional[float] = None) -> List[Document]:
         """
         Perform hybrid search (keyword + semantic) on the loaded documents.
         
         Args:
             query: Search query
-            k: Number of results to return (Note: EnsembleRetriever may not support dynamic k)
+            k: Number of results to return, overrides self.k
+            score_threshold: Minimum fused (or rerank) score (0.0-1.0) for a result to be kept
             
         Returns:
             Relevant documents
@@ -250,10 +497,321 @@ class RetrievalChain(ABC):
             ValueError: If the retrieval chain is not initialized
         """
 
+        return [doc for doc, _ in self.search_hybrid_with_scores(query, k, score_threshold)]
+    
+    def search_hybrid_with_scores(self,
+                                  query: str,
+                                  k: Optional[int] = None,
+                                  score_threshold: Optional[float] = None) -> List[Tuple[Document, float]]:
+        """
+        Perform hybrid search and return the fused score of each result.
+        
+        With a reranker, a deeper candidate set is fused and the rerank scores
+        of the best k candidates are returned instead.
+        
+        Args:
+            query: Search query
+            k: Number of results to return, overrides self.k
+            score_threshold: Minimum fused (or rerank) score (0.0-1.0) for a result to be kept
+            
+        Returns:
+            List of (document, score) pairs, best first
+            
+        Raises:
+            ValueError: If the retrieval chain is not initialized
+        """
+
         if not hasattr(self, 'retrievers') or self.retrievers is None:
             raise ValueError("Initialization required. Call initialize() method first.")
         
-        return self.retrievers["hybrid"].get_relevant_documents(query)
+        k = k or self.k
+        if self.reranker is None:
+            return self.retrievers["hybrid"].search_with_scores(query, k, score_threshold)
+        
+        candidates = self.retrievers["hybrid"].search_with_scores(query, self.reranker.fetch_k(k))
+        return self.reranker.rerank(query, [doc for doc, _ in candidates], k, score_threshold)
+    
+    def search_many(self,
+                    queries: List[str],
+                    mode: str = "hybrid",
+                    k: Optional[int] = None) -> List[List[Document]]:
+        """
+        Run several queries in one pass.
+        
+        All queries are embedded together (as queries), and keyword
+        scores are computed from the postings of each query's terms only.
+        
+        Args:
+            queries: Search queries
+            mode: Search type ("semantic", "keyword" or "hybrid")
+            k: Number of results to return per query, overrides self.k
+            
+        Returns:
+            One list of relevant documents per query, in query order
+            
+        Raises:
+            ValueError: If the retrieval chain is not initialized or mode is unknown
+        """
+
+        if not hasattr(self, 'retrievers') or self.retrievers is None:
+            raise ValueError("Initialization required. Call initialize() method first.")
+        
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode: {mode}. Expected one of {SEARCH_MODES}.")
+        
+        k = k or self.k
+        queries = list(queries)
+        if not queries:
+            return []
+        
+        if mode == "semantic":
+            return [[doc for doc, _ in results] for results in self._semantic_search_many(queries, k)]
+        
+        if mode == "keyword":
+            return [[doc for doc, _ in results] for results in self._keyword_search_many(queries, k)]
+        
+        searcher = self.retrievers["hybrid"].searcher
+        fuse_k = self.reranker.fetch_k(k) if self.reranker else k
+        fetch_k = searcher.fetch_k(fuse_k)
+        semantic_results = self._semantic_search_many(queries, fetch_k)
+        keyword_results = self._keyword_search_many(queries, fetch_k)
+        
+        results = [
+            searcher.fuse(sparse, dense, fuse_k)
+            for sparse, dense in zip(keyword_results, semantic_results)
+        ]
+        if self.reranker:
+            results = [
+                self.reranker.rerank(query, [doc for doc, _ in scored], k)
+                for query, scored in zip(queries, results)
+            ]
+        
+        return [[doc for doc, _ in scored] for scored in results]
+    
+    def _semantic_search_many(self, queries: List[str], k: int) -> List[List[Tuple[Document, float]]]:
+        vectors = embed_queries(self.embeddings, queries)
+        
+        return [
+            dense_search_by_vector(self.vectorstore, vector, k)
+            for vector in vectors
+        ]
+    
+    def _keyword_search_many(self, queries: List[str], k: int) -> List[List[Tuple[Document, float]]]:
+        return self.retrievers["keyword"].index.search_many(queries, k)
+    
+    async def _run_blocking(self, func: Any, *args: Any) -> Any:
+        """
+        Run CPU-bound or blocking retrieval work on the bounded retrieval thread pool.
+        
+        Args:
+            func: Function to run
+            *args: Positional arguments for func
+            
+        Returns:
+            The function's return value
+        """
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_executor(), functools.partial(func, *args))
+    
+    async def _adense_search(self, query: str, k: int) -> List[Tuple[Document, float]]:
+        vector = await self.embeddings.aembed_query(query)
+        return await self._run_blocking(dense_search_by_vector, self.vectorstore, vector, k)
+    
+    async def asearch_semantic(self, query: str, k: Optional[int] = None) -> List[Document]:
+        """
+        Async version of search_semantic.
+        
+        The query is embedded with the async embedding API and the vector search
+        runs on the retrieval thread pool, so the event loop is never blocked.
+        
+        Args:
+            query: Search query
+            k: Number of results to return, overrides self.k
+            
+        Returns:
+            Relevant documents
+            
+        Raises:
+            ValueError: If the retrieval chain is not initialized
+        """
+
+        if not hasattr(self, 'retrievers') or self.retrievers is None:
+            raise ValueError("Initialization required. Call initialize() method first.")
+        
+        results = await self._adense_search(query, k or self.k)
+        return [doc for doc, _ in results]
+    
+    async def asearch_keyword(self, query: str, k: Optional[int] = None) -> List[Document]:
+        """
+        Async version of search_keyword; BM25 scoring runs on the retrieval thread pool.
+        
+        Args:
+            query: Search query
+            k: Number of results to return, overrides self.k
+            
+        Returns:
+            Relevant documents
+            
+        Raises:
+            ValueError: If the retrieval chain is not initialized
+        """
+
+        if not hasattr(self, 'retrievers') or self.retrievers is None:
+            raise ValueError("Initialization required. Call initialize() method first.")
+        
+        return await self._run_blocking(self.retrievers["keyword"].search, query, k or self.k)
+    
+    async def asearch_hybrid_with_scores(self,
+                                         query: str,
+                                         k: Optional[int] = None,
+                                         score_threshold: Optional[float] = None) -> List[Tuple[Document, float]]:
+        """
+        Async version of search_hybrid_with_scores.
+        
+        The keyword search and the (async-embedded) dense search run concurrently;
+        reranking runs on the retrieval thread pool.
+        
+        Args:
+            query: Search query
+            k: Number of results to return, overrides self.k
+            score_threshold: Minimum fused (or rerank) score (0.0-1.0) for a result to be kept
+            
+        Returns:
+            List of (document, score) pairs, best first
+            
+        Raises:
+            ValueError: If the retrieval chain is not initialized
+        """
+
+        if not hasattr(self, 'retrievers') or self.retrievers is None:
+            raise ValueError("Initialization required. Call initialize() method first.")
+        
+        k = k or self.k
+        searcher = self.retrievers["hybrid"].searcher
+        fuse_k = self.reranker.fetch_k(k) if self.reranker else k
+        fetch_k = searcher.fetch_k(fuse_k)
+        
+        sparse, dense = await asyncio.gather(
+            self._run_blocking(searcher.keyword_index.search, query, fetch_k),
+            self._adense_search(query, fetch_k)
+        )
+        
+        if self.reranker is None:
+            return searcher.fuse(sparse, dense, k, score_threshold)
+        
+        candidates = [doc for doc, _ in searcher.fuse(sparse, dense, fuse_k)]
+        return await self._run_blocking(self.reranker.rerank, query, candidates, k, score_threshold)
+    
+    async def asearch_hybrid(self,
+                             query: str,
+                             k: Optional[int] = None,
+                             score_threshold: Optional[float] = None) -> List[Document]:
+        """
+        Async version of search_hybrid.
+        
+        Args:
+            query: Search query
+            k: Number of results to return, overrides self.k
+            score_threshold: Minimum fused (or rerank) score (0.0-1.0) for a result to be kept
+            
+        Returns:
+            Relevant documents
+        """
+
+        results = await self.asearch_hybrid_with_scores(query, k, score_threshold)
+        return [doc for doc, _ in results]
+    
+    async def asearch_many(self,
+                           queries: List[str],
+                           mode: str = "hybrid",
+                           k: Optional[int] = None) -> List[List[Document]]:
+        """
+        Async version of search_many.
+        
+        Args:
+            queries: Search queries
+            mode: Search type ("semantic", "keyword" or "hybrid")
+            k: Number of results to return per query, overrides self.k
+            
+        Returns:
+            One list of relevant documents per query, in query order
+            
+        Raises:
+            ValueError: If the retrieval chain is not initialized or mode is unknown
+        """
+
+        if not hasattr(self, 'retrievers') or self.retrievers is None:
+            raise ValueError("Initialization required. Call initialize() method first.")
+        
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode: {mode}. Expected one of {SEARCH_MODES}.")
+        
+        k = k or self.k
+        queries = list(queries)
+        if not queries:
+            return []
+        
+        if mode == "keyword":
+            results = await self._run_blocking(self._keyword_search_many, queries, k)
+            return [[doc for doc, _ in scored] for scored in results]
+        
+        fuse_k = self.reranker.fetch_k(k) if self.reranker and mode == "hybrid" else k
+        fetch_k = fuse_k if mode == "semantic" else self.retrievers["hybrid"].searcher.fetch_k(fuse_k)
+        
+        async def dense_many() -> List[List[Tuple[Document, float]]]:
+            vectors = await aembed_queries(self.embeddings, queries)
+            return await asyncio.gather(*[
+                self._run_blocking(dense_search_by_vector, self.vectorstore, vector, fetch_k)
+                for vector in vectors
+            ])
+        
+        if mode == "semantic":
+            return [[doc for doc, _ in scored] for scored in await dense_many()]
+        
+        keyword_results, semantic_results = await asyncio.gather(
+            self._run_blocking(self._keyword_search_many, queries, fetch_k),
+            dense_many()
+        )
+        
+        searcher = self.retrievers["hybrid"].searcher
+        results = [
+            searcher.fuse(sparse, dense, fuse_k)
+            for sparse, dense in zip(keyword_results, semantic_results)
+        ]
+        if self.reranker:
+            results = await asyncio.gather(*[
+                self._run_blocking(self.reranker.rerank, query, [doc for doc, _ in scored], k)
+                for query, scored in zip(queries, results)
+            ])
+        
+        return [[doc for doc, _ in scored] for scored in results]
+    
+    def measure_recall(self, queries: List[str], k: Optional[int] = None, **search_params: Any) -> Dict[str, float]:
+        """
+        Measure recall@k and latency of the approximate (ANN or quantized) search against exact search.
+        
+        Args:
+            queries: Sample queries, ideally drawn from real traffic
+            k: Number of results per query, overrides self.k
+            **search_params: Parameters to evaluate (ef for HNSW, nprobe for IVF, rerank for quantized codes)
+            
+        Returns:
+            Dictionary with recall, ann_ms and exact_ms
+            
+        Raises:
+            ValueError: If the chain is not initialized or its vector store
+                does not support recall measurement
+        """
+
+        if not hasattr(self, 'retrievers') or self.retrievers is None:
+            raise ValueError("Initialization required. Call initialize() method first.")
+        
+        if not hasattr(self.vectorstore, "recall_at_k"):
+            raise ValueError("Recall measurement requires the flat vector backend.")
+        
+        vectors = embed_queries(self.embeddings, queries)
+        return self.vectorstore.recall_at_k(vectors, k or self.k, **search_params)
     
     def search(self, query: str, k: Optional[int] = None) -> List[Document]:
         """
@@ -0,0 +1,287 @@
+from typing import List, Dict, Any, Optional, Tuple
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+from langchain_core.documents import Document
+
+DUPLICATES_KEY = "duplicates"
+DUPLICATE_COUNT_KEY = "duplicate_count"
+
+# Shingle hashes per (num_perm x shingles) block of the signature computation
+_BLOCK_ELEMENTS = 1 << 22
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def shingle_hashes(text: str, shingle_size: int = 5) -> np.ndarray:
+    """
+    Hash the character shingles of a text.
+
+    Whitespace is collapsed first, so layout differences between PDF revisions
+    do not change the shingles. Character shingles work for Korean, where
+    word boundaries are unreliable.
+
+    Args:
+        text: Chunk text
+        shingle_size: Number of characters per shingle
+
+    Returns:
+        Unique 64-bit shingle hashes
+    """
+
+    text = _WHITESPACE.sub(" ", text).strip()
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    if len(codes) < shingle_size:
+        codes = np.concatenate([codes, np.zeros(shingle_size - len(codes), dtype=np.uint64)])
+
+    # Polynomial rolling hash of every window; uint64 arithmetic wraps around
+    windows = np.lib.stride_tricks.sliding_window_view(codes, shingle_size)
+    powers = np.uint64(1000003) ** np.arange(shingle_size - 1, -1, -1, dtype=np.uint64)
+    return np.unique(windows @ powers)
+
+
+def minhash_signatures(texts: List[str],
+                       num_perm: int = 128,
+                       shingle_size: int = 5,
+                       seed: int = 0) -> np.ndarray:
+    """
+    Compute MinHash signatures of many texts at once.
+
+    The shingles of all texts are concatenated and each hash function
+    (a * x + b) >> 32 (multiply-shift with 64-bit wraparound) is applied to
+    blocks of them; np.minimum.reduceat then takes the per-text minimum
+    without a Python loop over texts.
+
+    Args:
+        texts: Chunk texts
+        num_perm: Number of hash permutations
+        shingle_size: Number of characters per shingle
+        seed: Random seed of the permutations
+
+    Returns:
+        Signatures of shape (len(texts), num_perm)
+    """
+
+    rng = np.random.default_rng(seed)
+    a = rng.integers(0, 1 << 63, size=(num_perm, 1), dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    b = rng.integers(0, 1 << 63, size=(num_perm, 1), dtype=np.uint64)
+
+    hashes = [shingle_hashes(text, shingle_size) for text in texts]
+    signatures = np.empty((len(texts), num_perm), dtype=np.uint64)
+
+    start = 0
+    while start < len(texts):
+        # Take as many texts as fit in one block
+        end, size = start, 0
+        while end < len(texts) and (end == start or (size + len(hashes[end])) * num_perm <= _BLOCK_ELEMENTS):
+            size += len(hashes[end])
+            end += 1
+
+        block = np.concatenate(hashes[start:end])
+        offsets = np.cumsum([0] + [len(h) for h in hashes[start:end - 1]])
+        permuted = (a * block + b) >> np.uint64(32)
+        signatures[start:end] = np.minimum.reduceat(permuted, offsets, axis=1).T
+        start = end
+
+    return signatures
+
+
+def find_duplicate_groups(signatures: np.ndarray, threshold: float = 0.85, bands: int = 16) -> np.ndarray:
+    """
+    Cluster near-duplicate texts with MinHash LSH.
+
+    Signatures are cut into bands; texts sharing a band bucket are candidates,
+    and a candidate is merged with the first text of its bucket when the
+    fraction of equal signature values (the estimated Jaccard similarity of
+    their shingles) reaches threshold.
+
+    Args:
+        signatures: MinHash signatures, one row per text
+        threshold: Minimum estimated Jaccard similarity
+        bands: Number of LSH bands (must divide the number of permutations)
+
+    Returns:
+        For every text, the index of the first text of its cluster
+    """
+
+    n_texts, num_perm = signatures.shape
+    if num_perm % bands:
+        raise ValueError(f"bands ({bands}) must divide the number of permutations ({num_perm}).")
+
+    parent = np.arange(n_texts)
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    rows = num_perm // bands
+    for band in range(bands):
+        band_values = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+        _, buckets = np.unique(band_values.view(f"V{rows * 8}").ravel(), return_inverse=True)
+
+        # Pair each bucket member with the first (lowest index) member of its bucket
+        order = np.argsort(buckets, kind="stable")
+        sorted_buckets = buckets[order]
+        starts = np.r_[0, np.flatnonzero(np.diff(sorted_buckets)) + 1]
+        anchors = np.repeat(order[starts], np.diff(np.r_[starts, len(order)]))
+        pairs = order != anchors
+        if not pairs.any():
+            continue
+
+        members, anchors = order[pairs], anchors[pairs]
+        similarity = (signatures[members] == signatures[anchors]).mean(axis=1)
+        for member, anchor in zip(members[similarity >= threshold], anchors[similarity >= threshold]):
+            root_member, root_anchor = find(int(member)), find(int(anchor))
+            if root_member != root_anchor:
+                parent[max(root_member, root_anchor)] = min(root_member, root_anchor)
+
+    return np.array([find(i) for i in range(n_texts)])
+
+
+class DedupReport:
+    """
+    Chunks and text removed by a deduplication run.
+    """
+
+    def __init__(self, chunks: int, kept: int, chars: int, kept_chars: int) -> None:
+        self.chunks = chunks
+        self.kept = kept
+        self.chars = chars
+        self.kept_chars = kept_chars
+
+    @property
+    def removed(self) -> int:
+        return self.chunks - self.kept
+
+    def print_report(self, bytes_per_vector: Optional[int] = None) -> None:
+        """
+        Print the chunks and text removed, and the vector index size saved.
+
+        Args:
+            bytes_per_vector: Size of one stored vector, if known
+        """
+
+        share = self.removed / self.chunks if self.chunks else 0.0
+        print(
+            f"Dedup: {self.chunks} -> {self.kept} chunks ({self.removed} near-duplicates, {share:.1%}), "
+            f"{self.chars - self.kept_chars:,} characters not embedded"
+        )
+        if bytes_per_vector:
+            print(f"  vector index saved: {self.removed * bytes_per_vector / 1e6:.1f} MB")
+
+
+def deduplicate_chunks(chunks: List[Document],
+                       threshold: float = 0.85,
+                       num_perm: int = 128,
+                       bands: int = 16,
+                       shingle_size: int = 5) -> Tuple[List[Document], DedupReport]:
+    """
+    Drop near-duplicate chunks, keeping the first chunk of every cluster.
+
+    Every surviving chunk records the source and page of the chunks merged into
+    it as a JSON list under metadata["duplicates"] (plus a count), since Chroma
+    only stores scalar metadata values. Input chunks are not modified.
+
+    Args:
+        chunks: Split document chunks, in source order
+        threshold: Minimum estimated Jaccard similarity of two near-duplicates
+        num_perm: Number of MinHash permutations
+        bands: Number of LSH bands
+        shingle_size: Number of characters per shingle
+
+    Returns:
+        Tuple of (surviving chunks in source order, report)
+    """
+
+    chars = sum(len(chunk.page_content) for chunk in chunks)
+    if chunks:
+        signatures = minhash_signatures([chunk.page_content for chunk in chunks], num_perm, shingle_size)
+        groups = find_duplicate_groups(signatures, threshold, bands)
+    else:
+        groups = np.empty(0, dtype=np.int64)
+
+    merged: Dict[int, List[Dict[str, Any]]] = {}
+    for i, group in enumerate(groups.tolist()):
+        if i != group:
+            metadata = chunks[i].metadata
+            merged.setdefault(group, []).append({"source": metadata.get("source"), "page": metadata.get("page")})
+
+    survivors = []
+    for i, chunk in enumerate(chunks):
+        if groups[i] != i:
+            continue
+        # Every survivor gets both keys, so a metadata update can also clear them
+        metadata = dict(chunk.metadata)
+        metadata[DUPLICATES_KEY] = json.dumps(merged.get(i, []), ensure_ascii=False)
+        metadata[DUPLICATE_COUNT_KEY] = len(merged.get(i, []))
+        survivors.append(Document(page_content=chunk.page_content, metadata=metadata))
+
+    report = DedupReport(len(chunks), len(survivors), chars, sum(len(chunk.page_content) for chunk in survivors))
+    return survivors, report
+
+
+class SplitCache:
+    """
+    Split chunks of each source file, stored before deduplication.
+
+    Deduplication spans files, so the store holds only surviving chunks.
+    Incremental runs read the chunks of unchanged files from this cache and
+    deduplicate the whole corpus again without re-parsing any PDF.
+    """
+
+    def __init__(self, path: str, settings: Dict[str, Any]) -> None:
+        """
+        Initialize the cache.
+
+        Args:
+            path: Cache directory
+            settings: Ingest settings; entries written with other settings are ignored
+        """
+
+        self.path = path
+        self.settings = settings
+
+    def _name(self, source_uri: str, digest: str) -> str:
+        # Byte-identical copies of a file still get their own entry, since chunk metadata holds the path
+        return hashlib.sha256(f"{source_uri}\x00{digest}".encode("utf-8")).hexdigest() + ".jsonl"
+
+    def get(self, source_uri: str, digest: str) -> Optional[List[Document]]:
+        """Return the cached chunks of a source file with the given content hash, or None."""
+
+        try:
+            with open(os.path.join(self.path, self._name(source_uri, digest)), "r", encoding="utf-8") as f:
+                if json.loads(f.readline()) != self.settings:
+                    return None
+                return [
+                    Document(page_content=record["page_content"], metadata=record["metadata"])
+                    for record in map(json.loads, f)
+                ]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def put(self, source_uri: str, digest: str, chunks: List[Document]) -> None:
+        """Store the chunks of a source file with the given content hash."""
+
+        os.makedirs(self.path, exist_ok=True)
+        path = os.path.join(self.path, self._name(source_uri, digest))
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(self.settings) + "\n")
+            for chunk in chunks:
+                f.write(json.dumps({"page_content": chunk.page_content, "metadata": chunk.metadata}, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, path)
+
+    def prune(self, files: Dict[str, str]) -> None:
+        """Delete entries other than the given source files and content hashes."""
+
+        keep = {self._name(source_uri, digest) for source_uri, digest in files.items()}
+        if not os.path.isdir(self.path):
+            return
+        for name in os.listdir(self.path):
+            if name not in keep:
+                os.remove(os.path.join(self.path, name))
@@ -0,0 +1,152 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Dict
+import asyncio
+import threading
+import time
+
+from langchain_core.embeddings import Embeddings
+
+
+class CoalescingEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that merges concurrent query embeddings into batched requests.
+
+    Queries are collected for up to max_wait_ms (or until max_batch_size
+    distinct texts are waiting) and embedded with one embed_documents call,
+    whose vectors are fanned back out to the callers. A query that is already
+    waiting or being embedded is not sent again: later callers share the
+    in-flight result (single-flight).
+
+    Both entry points are supported: aembed_query awaits the shared result
+    without holding a thread, and embed_query may be called from any number
+    of threads (e.g. retrievers running in a thread pool). Document
+    embeddings are already batched and pass straight through.
+    """
+
+    def __init__(self,
+                 embeddings: Embeddings,
+                 max_batch_size: int = 64,
+                 max_wait_ms: float = 5.0,
+                 max_concurrent_batches: int = 4) -> None:
+        """
+        Wrap an embedding model and start the batching thread.
+
+        Args:
+            embeddings: Underlying embedding model; its embed_documents must
+                return the same vectors as embed_query (true for OpenAI models)
+            max_batch_size: Maximum number of queries per request
+            max_wait_ms: Time to wait for more queries after the first one
+            max_concurrent_batches: Maximum number of requests in flight
+        """
+
+        self.embeddings = embeddings
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.requests = 0
+        self.coalesced = 0
+        self.batches = 0
+        self.embedded = 0
+
+        self._pending: List[str] = []
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent_batches, thread_name_prefix="embedding-batch")
+        self._thread = threading.Thread(target=self._run, name="embedding-coalescer", daemon=True)
+        self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        """
+        Queue a query for embedding, or join the identical query already in flight.
+
+        Args:
+            text: Query text
+
+        Returns:
+            Future resolving to the query vector (shared by identical queries)
+        """
+
+        with self._lock:
+            self.requests += 1
+            future = self._inflight.get(text)
+            if future is not None:
+                self.coalesced += 1
+                return future
+
+            future = Future()
+            self._inflight[text] = future
+            self._pending.append(text)
+            self._wakeup.notify()
+
+        return future
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                while not self._pending:
+                    self._wakeup.wait()
+
+                # Wait a little for more queries unless the batch is already full
+                deadline = time.monotonic() + self.max_wait
+                while len(self._pending) < self.max_batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._wakeup.wait(remaining)
+
+                texts = self._pending[:self.max_batch_size]
+                del self._pending[:self.max_batch_size]
+
+            self._executor.submit(self._embed, texts)
+
+    def _embed(self, texts: List[str]) -> None:
+        try:
+            vectors = self.embeddings.embed_documents(texts)
+        except Exception as e:
+            vectors, error = None, e
+        else:
+            error = None
+
+        with self._lock:
+            futures = [self._inflight.pop(text) for text in texts]
+            self.batches += 1
+            self.embedded += len(texts)
+
+        for i, future in enumerate(futures):
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(vectors[i])
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.submit(text).result()
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.embeddings.aembed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        # Shielded, so a cancelled caller does not cancel the result shared with others
+        return await asyncio.shield(asyncio.wrap_future(self.submit(text)))
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        # Submitted together, so they share batches with each other and with concurrent queries
+        futures = [self.submit(text) for text in texts]
+        return [future.result() for future in futures]
+
+    async def aembed_queries(self, texts: List[str]) -> List[List[float]]:
+        futures = [self.submit(text) for text in texts]
+        return list(await asyncio.gather(*(asyncio.shield(asyncio.wrap_future(future)) for future in futures)))
+
+    def stats(self) -> Dict[str, float]:
+        """Return query, single-flight and batch counters."""
+
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "coalesced": self.coalesced,
+                "batches": self.batches,
+                "mean_batch_size": self.embedded / self.batches if self.batches else 0.0
+            }
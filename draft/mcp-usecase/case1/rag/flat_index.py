@@ -0,0 +1,558 @@
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from rag.ann_index import load_or_build_ann_index
+from rag.keyword_index import index_lock, make_temp_dir, replace_directory, top_k_indices
+from rag.matryoshka import truncate_and_normalize
+from rag.quantization import load_or_build_quantized_codes
+
+FLAT_INDEX_VERSION = 1
+VECTORS_FILE = "embeddings.npy"
+META_FILE = "meta.json"
+DOCUMENTS_FILE = "documents.jsonl"
+VECTOR_DTYPES = ("float32", "float16")
+DEFAULT_BLOCK_SIZE = 16384
+SEARCH_PARAM_KEYS = ("exact", "ef", "nprobe", "rerank")
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """
+    Scale vectors to unit length so that dot products are cosine similarities.
+
+    Args:
+        vectors: 2-D array of vectors
+
+    Returns:
+        Normalized float32 vectors
+    """
+
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class FlatVectorStore(VectorStore):
+    """
+    Read-mostly vector store backed by a memory-mapped .npy file.
+
+    Normalized embeddings are stored as one float32 or float16 matrix and opened
+    with np.memmap, so every process serving the same index shares a single
+    page-cached copy and opening the index costs no deserialization. Search is
+    an exact, blocked matrix-vector product with argpartition top-k selection,
+    unless an IVF or HNSW index is attached with attach_ann_index(), or
+    int8/PQ codes are attached with attach_quantization() to shortlist
+    candidates that are then reranked with the exact vectors.
+
+    The store is rebuilt rather than updated in place: use build() with the
+    previous store as reuse to carry over the vectors of unchanged chunks.
+    """
+
+    def __init__(self,
+                 embedding: Embeddings,
+                 vectors: np.ndarray,
+                 docs: List[Document],
+                 ids: List[str],
+                 path: Optional[str] = None,
+                 settings: Optional[Dict[str, Any]] = None,
+                 block_size: int = DEFAULT_BLOCK_SIZE) -> None:
+        """
+        Initialize a store over normalized vectors.
+
+        Args:
+            embedding: Embedding model used for queries
+            vectors: Normalized vectors, one row per document (may be a memmap)
+            docs: Documents in row order
+            ids: Chunk ids in row order
+            path: Index directory, if the store is persisted
+            settings: Settings the vectors were built with
+            block_size: Number of rows scored per block during search
+        """
+
+        self.embedding = embedding
+        self.vectors = vectors
+        self.docs = docs
+        self.ids = ids
+        self.path = path
+        self.settings = settings or {}
+        self.block_size = block_size
+        self._rows = {chunk_id: row for row, chunk_id in enumerate(ids)}
+        self.ann_index = None
+        self.quantized = None
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    def _select_relevance_score_fn(self):
+        return self._cosine_relevance_score_fn
+
+    def attach_ann_index(self,
+                         index_type: str,
+                         params: Optional[Dict[str, Any]] = None,
+                         search_params: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Load or build an approximate index over the stored vectors.
+
+        Args:
+            index_type: "exact", "ivf" or "hnsw"
+            params: Build parameters (nlist for IVF; M and ef_construction for HNSW)
+            search_params: Default query parameters (nprobe for IVF, ef for HNSW)
+        """
+
+        with index_lock(self.path):
+            self.ann_index = load_or_build_ann_index(index_type, self.vectors, self.path, params, search_params)
+
+    def attach_quantization(self, quantization: str, params: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Load or build quantized codes of the stored vectors.
+
+        Newly built codes are evaluated right away and their memory use and
+        recall loss are printed.
+
+        Args:
+            quantization: "none", "int8" or "pq"
+            params: Quantizer parameters (m for PQ; rerank_factor for both)
+        """
+
+        with index_lock(self.path):
+            self.quantized, built = load_or_build_quantized_codes(quantization, self.vectors, self.path, params)
+        if built:
+            report = self.quantization_report()
+            print(
+                f"{quantization} codes: {report['code_bytes_per_chunk']} B/chunk "
+                f"(float: {report['float_bytes_per_chunk']} B/chunk), "
+                f"recall@{report['k']} {report['recall']:.3f} vs exact"
+            )
+
+    def memory_report(self) -> Dict[str, Any]:
+        """
+        Report the size of the stored vectors and of the structures scanned per query.
+
+        Returns:
+            Dictionary with chunks, float_bytes_per_chunk and code_bytes_per_chunk
+            (equal to float_bytes_per_chunk when no quantization is attached)
+        """
+
+        float_bytes = int(self.vectors.shape[1] * self.vectors.itemsize) if self.vectors.ndim == 2 else 0
+        return {
+            "chunks": len(self.docs),
+            "float_bytes_per_chunk": float_bytes,
+            "code_bytes_per_chunk": self.quantized.bytes_per_chunk() if self.quantized is not None else float_bytes
+        }
+
+    def quantization_report(self, sample_size: int = 32, k: int = 10, seed: int = 0) -> Dict[str, Any]:
+        """
+        Measure memory per chunk and the recall loss of the approximate search path.
+
+        Stored vectors of randomly sampled chunks are used as queries.
+
+        Args:
+            sample_size: Number of sample queries
+            k: Number of results per query
+            seed: Random seed
+
+        Returns:
+            memory_report() merged with recall_at_k() and k
+        """
+
+        rng = np.random.default_rng(seed)
+        rows = rng.choice(len(self.docs), size=min(sample_size, len(self.docs)), replace=False)
+        queries = [np.asarray(self.vectors[row], dtype=np.float32) for row in rows]
+
+        report = self.memory_report()
+        report.update(self.recall_at_k(queries, k))
+        report["k"] = k
+        return report
+
+    def search_by_vector(self,
+                         vector: List[float],
+                         k: int,
+                         exact: bool = False,
+                         **search_params: Any) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the rows most similar to a query vector.
+
+        Exact search scores the matrix block by block, so float16 storage is
+        only widened to float32 one block at a time.
+
+        Args:
+            vector: Query embedding
+            k: Number of results to return
+            exact: Ignore the ANN index and quantized codes and search exhaustively
+            **search_params: Per-query parameters (ef for HNSW, nprobe for IVF,
+                rerank for quantized codes)
+
+        Returns:
+            Tuple of (row indices, cosine similarities), best first
+        """
+
+        if self.ann_index is not None and not exact:
+            return self.ann_index.search(self.vectors, vector, k, **search_params)
+
+        if self.quantized is not None and not exact:
+            return self.quantized.search(self.vectors, vector, k, **search_params)
+
+        query = normalize_rows(np.asarray(vector, dtype=np.float32)[None, :])[0]
+        best_rows = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float32)
+
+        for start in range(0, len(self.docs), self.block_size):
+            block = np.asarray(self.vectors[start:start + self.block_size], dtype=np.float32)
+            scores = block @ query
+            top = top_k_indices(scores, k)
+
+            best_rows = np.concatenate([best_rows, top + start])
+            best_scores = np.concatenate([best_scores, scores[top]])
+            if len(best_scores) > k:
+                keep = top_k_indices(best_scores, k)
+                best_rows, best_scores = best_rows[keep], best_scores[keep]
+
+        order = top_k_indices(best_scores, k)
+        return best_rows[order], best_scores[order]
+
+    def recall_at_k(self, query_vectors: List[List[float]], k: int, **search_params: Any) -> Dict[str, float]:
+        """
+        Measure the recall and latency of the approximate search path against exact search.
+
+        Args:
+            query_vectors: Query embeddings
+            k: Number of results per query
+            **search_params: Parameters to evaluate (ef, nprobe or rerank)
+
+        Returns:
+            Dictionary with recall (fraction of exact top-k found), and mean
+            ann_ms and exact_ms per query
+        """
+
+        found = 0
+        ann_seconds = 0.0
+        exact_seconds = 0.0
+
+        for vector in query_vectors:
+            started = time.perf_counter()
+            exact_rows, _ = self.search_by_vector(vector, k, exact=True)
+            exact_seconds += time.perf_counter() - started
+
+            started = time.perf_counter()
+            ann_rows, _ = self.search_by_vector(vector, k, **search_params)
+            ann_seconds += time.perf_counter() - started
+
+            found += len(np.intersect1d(exact_rows, ann_rows))
+
+        n_queries = max(len(query_vectors), 1)
+        expected = sum(min(k, len(self.docs)) for _ in query_vectors)
+        return {
+            "recall": found / expected if expected else 1.0,
+            "ann_ms": ann_seconds / n_queries * 1000,
+            "exact_ms": exact_seconds / n_queries * 1000
+        }
+
+    def similarity_search_with_score_by_vector(self,
+                                               embedding: List[float],
+                                               k: int = 4,
+                                               **kwargs: Any) -> List[Tuple[Document, float]]:
+        """
+        Return documents most similar to a query vector with their cosine distances.
+
+        Args:
+            embedding: Query embedding
+            k: Number of results to return
+            **kwargs: Per-query search parameters (exact, ef, nprobe, rerank)
+
+        Returns:
+            List of (document, cosine distance) pairs, best first
+        """
+
+        params = {key: kwargs[key] for key in SEARCH_PARAM_KEYS if key in kwargs}
+        rows, scores = self.search_by_vector(embedding, k, **params)
+        return [(self.docs[row], 1.0 - float(score)) for row, score in zip(rows, scores)]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k, **kwargs)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self.embedding.embed_query(query), k, **kwargs)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, **kwargs)]
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None, **kwargs: Any) -> List[str]:
+        raise NotImplementedError("FlatVectorStore is read-only; rebuild it with FlatVectorStore.build().")
+
+    def close(self) -> None:
+        """Release the memory map so the index files can be replaced."""
+
+        self.vectors = np.empty((0, 0), dtype=np.float32)
+        self.ann_index = None
+        self.quantized = None
+
+    @classmethod
+    def build(cls,
+              docs: List[Document],
+              ids: List[str],
+              embedding: Embeddings,
+              path: Optional[str] = None,
+              dtype: str = "float32",
+              settings: Optional[Dict[str, Any]] = None,
+              batch_size: int = 256,
+              reuse: Optional["FlatVectorStore"] = None,
+              block_size: int = DEFAULT_BLOCK_SIZE) -> "FlatVectorStore":
+        """
+        Embed documents and write a new index.
+
+        Vectors are written straight into the memory-mapped output file batch by
+        batch, so building never holds more than one batch of embeddings in memory.
+        A persisted index is built in a temporary directory under index_lock(),
+        so processes sharing the directory never replace each other's files.
+
+        Args:
+            docs: Document chunks
+            ids: Chunk ids in the same order as docs
+            embedding: Embedding model
+            path: Index directory; the store is kept in memory only if omitted
+            dtype: Storage type of the vectors, "float32" or "float16"
+            settings: Settings stored with the index (e.g. the embedding model)
+            batch_size: Number of chunks embedded per request
+            reuse: Previous store whose vectors are copied for unchanged chunk ids
+                instead of being re-embedded; ignored if its settings differ
+            block_size: Number of rows scored per block during search
+
+        Returns:
+            The new store
+
+        Raises:
+            ValueError: If dtype is not supported or docs is empty
+        """
+
+        if dtype not in VECTOR_DTYPES:
+            raise ValueError(f"Unknown vector dtype: {dtype}. Expected one of {VECTOR_DTYPES}.")
+
+        if not docs:
+            raise ValueError("No documents to index.")
+
+        settings = settings or {}
+        if reuse is not None and reuse.settings != settings:
+            reuse = None
+
+        reused = {}
+        if reuse is not None:
+            reused = {row: reuse._rows[chunk_id] for row, chunk_id in enumerate(ids) if chunk_id in reuse._rows}
+        missing = [row for row in range(len(ids)) if row not in reused]
+
+        with index_lock(path):
+            tmp_path = make_temp_dir(path)
+            try:
+                vectors = None
+                allocate = lambda dim: cls._allocate(tmp_path, (len(docs), dim), dtype)
+
+                for start in range(0, len(missing), batch_size):
+                    rows = missing[start:start + batch_size]
+                    batch = normalize_rows(embedding.embed_documents([docs[row].page_content for row in rows]))
+                    if vectors is None:
+                        vectors = allocate(batch.shape[1])
+                    vectors[rows] = batch
+
+                if reused:
+                    if vectors is None:
+                        vectors = allocate(reuse.vectors.shape[1])
+                    for row, old_row in reused.items():
+                        vectors[row] = reuse.vectors[old_row]
+
+                if reuse is not None:
+                    reuse.close()
+
+                print(f"Flat index: embedded {len(missing)} chunks, reused {len(reused)}")
+
+                return cls._finalize(path, tmp_path, vectors, docs, ids, embedding, dtype, settings, block_size)
+            except BaseException:
+                if tmp_path is not None:
+                    shutil.rmtree(tmp_path, ignore_errors=True)
+                raise
+
+    @staticmethod
+    def _allocate(tmp_path: Optional[str], shape: Tuple[int, int], dtype: str) -> np.ndarray:
+        # Persisted indexes are written into a memmap in their temporary directory
+        if tmp_path is None:
+            return np.empty(shape, dtype=dtype)
+
+        return np.lib.format.open_memmap(os.path.join(tmp_path, VECTORS_FILE), mode="w+", dtype=dtype, shape=shape)
+
+    @classmethod
+    def _finalize(cls,
+                  path: Optional[str],
+                  tmp_path: Optional[str],
+                  vectors: np.ndarray,
+                  docs: List[Document],
+                  ids: List[str],
+                  embedding: Embeddings,
+                  dtype: str,
+                  settings: Dict[str, Any],
+                  block_size: int) -> "FlatVectorStore":
+        # Write documents and metadata next to the vectors and move the index into place
+        if path is None:
+            return cls(embedding, vectors, list(docs), list(ids), settings=settings, block_size=block_size)
+
+        vectors.flush()
+        del vectors
+
+        with open(os.path.join(tmp_path, DOCUMENTS_FILE), "w", encoding="utf-8") as f:
+            for chunk_id, doc in zip(ids, docs):
+                f.write(json.dumps(
+                    {"id": chunk_id, "page_content": doc.page_content, "metadata": doc.metadata},
+                    ensure_ascii=False,
+                    default=str
+                ))
+                f.write("\n")
+
+        with open(os.path.join(tmp_path, META_FILE), "w", encoding="utf-8") as f:
+            json.dump({
+                "version": FLAT_INDEX_VERSION,
+                "dtype": dtype,
+                "count": len(docs),
+                "settings": settings
+            }, f, ensure_ascii=False)
+
+        replace_directory(tmp_path, path)
+
+        return cls._load(path, embedding, settings=settings, block_size=block_size)
+
+    def truncate_dimensions(self,
+                            dimensions: int,
+                            embedding: Optional[Embeddings] = None,
+                            settings: Optional[Dict[str, Any]] = None) -> "FlatVectorStore":
+        """
+        Rewrite the index with every vector truncated to its first dimensions values.
+
+        Used to migrate an index to a shorter Matryoshka embedding size without
+        re-embedding any chunk. This store is closed afterwards.
+
+        Args:
+            dimensions: Target number of dimensions
+            embedding: Query embedding model of the new index (default: this store's)
+            settings: Settings stored with the new index (default: this store's)
+
+        Returns:
+            The migrated store
+        """
+
+        dtype = self.vectors.dtype.name
+        docs, ids, path = self.docs, self.ids, self.path
+        embedding = embedding or self.embedding
+        settings = self.settings if settings is None else settings
+
+        with index_lock(path):
+            tmp_path = make_temp_dir(path)
+            try:
+                vectors = self._allocate(tmp_path, (len(docs), dimensions), dtype)
+                for start in range(0, len(docs), self.block_size):
+                    block = self.vectors[start:start + self.block_size]
+                    vectors[start:start + len(block)] = truncate_and_normalize(block, dimensions)
+                self.close()
+
+                print(f"Flat index: truncated {len(docs)} vectors to {dimensions} dimensions")
+                return self._finalize(path, tmp_path, vectors, docs, ids, embedding, dtype, settings, self.block_size)
+            except BaseException:
+                if tmp_path is not None:
+                    shutil.rmtree(tmp_path, ignore_errors=True)
+                raise
+
+    @classmethod
+    def load(cls,
+             path: str,
+             embedding: Embeddings,
+             settings: Optional[Dict[str, Any]] = None,
+             block_size: int = DEFAULT_BLOCK_SIZE) -> Optional["FlatVectorStore"]:
+        """
+        Open a persisted index with its vectors memory-mapped read-only.
+
+        Args:
+            path: Index directory
+            embedding: Embedding model used for queries
+            settings: Expected settings; the index is ignored if they differ
+            block_size: Number of rows scored per block during search
+
+        Returns:
+            The loaded store, or None if it is missing, unreadable or was built
+            with different settings
+        """
+
+        with index_lock(path):
+            return cls._load(path, embedding, settings=settings, block_size=block_size)
+
+    @classmethod
+    def _load(cls,
+              path: str,
+              embedding: Embeddings,
+              settings: Optional[Dict[str, Any]] = None,
+              block_size: int = DEFAULT_BLOCK_SIZE) -> Optional["FlatVectorStore"]:
+        if not os.path.exists(os.path.join(path, META_FILE)):
+            return None
+
+        try:
+            with open(os.path.join(path, META_FILE), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+
+            if meta.get("version") != FLAT_INDEX_VERSION:
+                return None
+
+            if settings is not None and meta.get("settings") != settings:
+                return None
+
+            vectors = np.load(os.path.join(path, VECTORS_FILE), mmap_mode="r")
+
+            docs = []
+            ids = []
+            with open(os.path.join(path, DOCUMENTS_FILE), "r", encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    ids.append(record.pop("id"))
+                    docs.append(Document(**record))
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Could not load flat index from {path}: {e}")
+            return None
+
+        if len(docs) != len(vectors):
+            print(f"Flat index at {path} is inconsistent; it will be rebuilt.")
+            return None
+
+        return cls(embedding, vectors, docs, ids, path=path, settings=meta.get("settings"), block_size=block_size)
+
+    @classmethod
+    def from_texts(cls,
+                   texts: List[str],
+                   embedding: Embeddings,
+                   metadatas: Optional[List[dict]] = None,
+                   ids: Optional[List[str]] = None,
+                   **kwargs: Any) -> "FlatVectorStore":
+        """
+        Build a store from raw texts.
+
+        Args:
+            texts: Texts to index
+            embedding: Embedding model
+            metadatas: Optional metadata per text
+            ids: Optional ids per text (default: row numbers)
+            **kwargs: Additional keyword arguments for build()
+
+        Returns:
+            The new store
+        """
+
+        metadatas = metadatas or [{} for _ in texts]
+        docs = [Document(page_content=text, metadata=metadata) for text, metadata in zip(texts, metadatas)]
+        ids = ids or [str(i) for i in range(len(docs))]
+
+        return cls.build(docs, ids, embedding, **kwargs)
@@ -0,0 +1,316 @@
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import os
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+FUSION_METHODS = ("rrf", "blend")
+
+# BM25 score mapped to 0.5 by normalize_saturating (roughly one strong term match)
+DEFAULT_SATURATION_K = 3.0
+
+# Shared pool for the dense half of hybrid searches (and other blocking retrieval work)
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("RETRIEVAL_THREADS", "8")),
+    thread_name_prefix="retrieval"
+)
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Return the bounded thread pool used for blocking retrieval work.
+
+    Returns:
+        The shared ThreadPoolExecutor
+    """
+
+    return _executor
+
+
+def document_key(doc: Document) -> Tuple[str, str, str]:
+    """
+    Identify a chunk independently of the retriever that returned it.
+
+    Args:
+        doc: Document chunk
+
+    Returns:
+        Tuple of (source, page, content)
+    """
+
+    return (str(doc.metadata.get("source", "")), str(doc.metadata.get("page", "")), doc.page_content)
+
+
+def dense_search_by_vector(vectorstore: Any, vector: List[float], k: int) -> List[Tuple[Document, float]]:
+    """
+    Run a dense search with a precomputed query vector and return relevance scores.
+
+    Relevance scores are in [0, 1], higher is better, as returned by
+    VectorStore.similarity_search_with_relevance_scores.
+
+    Args:
+        vectorstore: Vector store instance
+        vector: Query embedding
+        k: Number of results to return
+
+    Returns:
+        List of (document, relevance score) pairs, best first
+    """
+
+    if hasattr(vectorstore, "similarity_search_by_vector_with_relevance_scores"):
+        results = vectorstore.similarity_search_by_vector_with_relevance_scores(vector, k=k)
+    else:
+        results = vectorstore.similarity_search_with_score_by_vector(vector, k=k)
+
+    # Chroma and FAISS return distances here; convert them like the query-based API does
+    relevance_fn = vectorstore._select_relevance_score_fn()
+    return [(doc, relevance_fn(distance)) for doc, distance in results]
+
+
+def normalize_max(results: List[Tuple[Document, float]]) -> List[Tuple[Document, float]]:
+    """
+    Scale scores into [0, 1] by dividing by the best score of the list.
+
+    Args:
+        results: List of (document, score) pairs
+
+    Returns:
+        List of (document, normalized score) pairs
+    """
+
+    if not results:
+        return []
+
+    top = max(score for _, score in results)
+    if top <= 0:
+        return [(doc, 0.0) for doc, _ in results]
+
+    return [(doc, score / top) for doc, score in results]
+
+
+def normalize_saturating(results: List[Tuple[Document, float]],
+                         k: float = DEFAULT_SATURATION_K) -> List[Tuple[Document, float]]:
+    """
+    Map scores into [0, 1) with s / (s + k).
+
+    Unlike normalize_max, the mapping does not depend on the other results of
+    the query, so a weak best match keeps a low score and an absolute score
+    threshold stays meaningful.
+
+    Args:
+        results: List of (document, score) pairs
+        k: Score that maps to 0.5
+
+    Returns:
+        List of (document, normalized score) pairs
+    """
+
+    return [(doc, score / (score + k) if score > 0 else 0.0) for doc, score in results]
+
+
+def fuse_results(sparse: List[Tuple[Document, float]],
+                 dense: List[Tuple[Document, float]],
+                 k: int,
+                 weights: Sequence[float] = (0.5, 0.5),
+                 method: str = "rrf",
+                 rrf_c: int = 60,
+                 score_threshold: Optional[float] = None,
+                 saturation_k: float = DEFAULT_SATURATION_K) -> List[Tuple[Document, float]]:
+    """
+    Fuse keyword and dense results into one scored ranking.
+
+    With "rrf", a document scores sum(weight / (rank + c)) over the lists it
+    appears in, divided by the best achievable score so that a document ranked
+    first by both retrievers scores 1.0; scores depend on ranks only. With
+    "blend", BM25 scores are mapped with normalize_saturating, dense relevance
+    scores are used as-is, and the two are combined as a weighted sum, so a
+    score reflects how well the document matches and an absolute threshold
+    prunes weak results.
+
+    Args:
+        sparse: Keyword results as (document, BM25 score) pairs, best first
+        dense: Dense results as (document, relevance score) pairs, best first
+        k: Number of results to return
+        weights: Weights of the keyword and dense results
+        method: "rrf" or "blend"
+        rrf_c: RRF constant
+        score_threshold: Minimum fused score (in [0, 1]) for a result to be kept
+        saturation_k: BM25 score mapped to 0.5 with "blend"
+
+    Returns:
+        List of (document, fused score) pairs, best first
+
+    Raises:
+        ValueError: If method is unknown
+    """
+
+    if method not in FUSION_METHODS:
+        raise ValueError(f"Unknown fusion method: {method}. Expected one of {FUSION_METHODS}.")
+
+    scores: Dict[Tuple[str, str, str], float] = {}
+    docs: Dict[Tuple[str, str, str], Document] = {}
+
+    if method == "rrf":
+        scale = sum(weights) / (1 + rrf_c)
+        for results, weight in zip((sparse, dense), weights):
+            for rank, (doc, _) in enumerate(results, start=1):
+                key = document_key(doc)
+                scores[key] = scores.get(key, 0.0) + weight / (rank + rrf_c) / scale
+                docs.setdefault(key, doc)
+    else:
+        for results, weight in zip((normalize_saturating(sparse, saturation_k), dense), weights):
+            for doc, score in results:
+                key = document_key(doc)
+                scores[key] = scores.get(key, 0.0) + weight * min(max(score, 0.0), 1.0)
+                docs.setdefault(key, doc)
+        total = sum(weights)
+        scores = {key: score / total for key, score in scores.items()}
+
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    if score_threshold is not None:
+        ranked = [(key, score) for key, score in ranked if score >= score_threshold]
+
+    return [(docs[key], score) for key, score in ranked[:k]]
+
+
+class HybridSearcher:
+    """
+    Score-aware hybrid search over a BM25 index and a vector store.
+
+    The dense and keyword searches run concurrently, their results are fused
+    with RRF or normalized score blending, and every result carries its fused
+    score so callers can threshold before formatting.
+    """
+
+    def __init__(self,
+                 vectorstore: Any,
+                 keyword_index: Any,
+                 embeddings: Any = None,
+                 weights: Sequence[float] = (0.5, 0.5),
+                 method: str = "rrf",
+                 rrf_c: int = 60,
+                 fetch_k_multiplier: int = 2,
+                 saturation_k: float = DEFAULT_SATURATION_K) -> None:
+        """
+        Initialize a hybrid searcher.
+
+        Args:
+            vectorstore: Vector store instance
+            keyword_index: BM25Index over the same chunks
+            embeddings: Query embedding model (default: the vector store's)
+            weights: Weights of the keyword and dense results
+            method: Fusion method, "rrf" or "blend"
+            rrf_c: RRF constant
+            fetch_k_multiplier: Candidates fetched from each retriever per result
+            saturation_k: BM25 score mapped to 0.5 by "blend" fusion
+        """
+
+        if method not in FUSION_METHODS:
+            raise ValueError(f"Unknown fusion method: {method}. Expected one of {FUSION_METHODS}.")
+
+        self.vectorstore = vectorstore
+        self.keyword_index = keyword_index
+        self.embeddings = embeddings or vectorstore.embeddings
+        self.weights = tuple(weights)
+        self.method = method
+        self.rrf_c = rrf_c
+        self.fetch_k_multiplier = fetch_k_multiplier
+        self.saturation_k = saturation_k
+
+    def fetch_k(self, k: int) -> int:
+        return max(k, k * self.fetch_k_multiplier)
+
+    def fuse(self,
+             sparse: List[Tuple[Document, float]],
+             dense: List[Tuple[Document, float]],
+             k: int,
+             score_threshold: Optional[float] = None) -> List[Tuple[Document, float]]:
+        """Fuse keyword and dense results with this searcher's settings."""
+
+        return fuse_results(
+            sparse,
+            dense,
+            k,
+            weights=self.weights,
+            method=self.method,
+            rrf_c=self.rrf_c,
+            score_threshold=score_threshold,
+            saturation_k=self.saturation_k
+        )
+
+    def dense_search(self, query: str, k: int) -> List[Tuple[Document, float]]:
+        """
+        Run the dense half of a hybrid search.
+
+        Args:
+            query: Search query
+            k: Number of results to return
+
+        Returns:
+            List of (document, relevance score) pairs
+        """
+
+        return dense_search_by_vector(self.vectorstore, self.embeddings.embed_query(query), k)
+
+    def search(self,
+               query: str,
+               k: int,
+               score_threshold: Optional[float] = None) -> List[Tuple[Document, float]]:
+        """
+        Run a hybrid search.
+
+        Args:
+            query: Search query
+            k: Number of results to return
+            score_threshold: Minimum fused score (in [0, 1]) for a result to be kept
+
+        Returns:
+            List of (document, fused score) pairs, best first
+        """
+
+        fetch_k = self.fetch_k(k)
+
+        dense_future = _executor.submit(self.dense_search, query, fetch_k)
+        sparse = self.keyword_index.search(query, fetch_k)
+        dense = dense_future.result()
+
+        return self.fuse(sparse, dense, k, score_threshold)
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    LangChain retriever backed by a HybridSearcher.
+    """
+
+    searcher: Any
+    k: int = 4
+    score_threshold: Optional[float] = None
+
+    def _get_relevant_documents(self,
+                                query: str,
+                                *,
+                                run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return [doc for doc, _ in self.searcher.search(query, self.k, self.score_threshold)]
+
+    def search_with_scores(self,
+                           query: str,
+                           k: Optional[int] = None,
+                           score_threshold: Optional[float] = None) -> List[Tuple[Document, float]]:
+        """
+        Return the best matching documents with their fused scores.
+
+        Args:
+            query: Search query
+            k: Number of results to return, overrides self.k
+            score_threshold: Minimum fused score, overrides self.score_threshold
+
+        Returns:
+            List of (document, score) pairs, best first
+        """
+
+        if score_threshold is None:
+            score_threshold = self.score_threshold
+
+        return self.searcher.search(query, k or self.k, score_threshold)
@@ -0,0 +1,198 @@
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import os
+import time
+
+from langchain_core.documents import Document
+
+DEFAULT_PAGES_PER_TASK = 8
+
+
+def count_pages(path: str) -> int:
+    """
+    Return the number of pages of a PDF file.
+
+    Args:
+        path: PDF file path
+
+    Returns:
+        Number of pages
+    """
+
+    import pdfplumber
+
+    with pdfplumber.open(path) as pdf:
+        return len(pdf.pages)
+
+
+def parse_page_range(path: str, start: int, end: int) -> Tuple[List[Document], float]:
+    """
+    Extract the text of a range of PDF pages.
+
+    Runs in a worker process. The documents are identical to the ones
+    PDFPlumberLoader produces for the same pages.
+
+    Args:
+        path: PDF file path
+        start: Index of the first page
+        end: Index after the last page
+
+    Returns:
+        Tuple of (one document per page, seconds spent parsing)
+    """
+
+    import pdfplumber
+
+    started = time.perf_counter()
+    docs = []
+
+    with pdfplumber.open(path) as pdf:
+        file_metadata = {
+            key: value for key, value in pdf.metadata.items()
+            if type(value) in [str, int]
+        }
+        total_pages = len(pdf.pages)
+
+        for page in pdf.pages[start:end]:
+            metadata = {
+                "source": path,
+                "file_path": path,
+                "page": page.page_number - 1,
+                "total_pages": total_pages
+            }
+            metadata.update(file_metadata)
+            docs.append(Document(page_content=page.extract_text() + "\n", metadata=metadata))
+            # Free the parsed layout of the page before moving on
+            page.close()
+
+    return docs, time.perf_counter() - started
+
+
+class IngestReport:
+    """
+    Per-file timing of a parallel ingestion run.
+    """
+
+    def __init__(self, workers: int) -> None:
+        self.workers = workers
+        self.started = time.perf_counter()
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.failures: Dict[str, List[str]] = {}
+
+    def add_file(self, path: str, pages: int) -> None:
+        self.files[path] = {"pages": pages, "chunks": 0, "parse_seconds": 0.0, "done_seconds": 0.0}
+
+    def add_task(self, path: str, parse_seconds: float, chunks: int) -> None:
+        entry = self.files[path]
+        entry["parse_seconds"] += parse_seconds
+        entry["chunks"] += chunks
+        entry["done_seconds"] = time.perf_counter() - self.started
+
+    def add_failure(self, path: str, message: str) -> None:
+        """Record a file or page range that could not be parsed."""
+
+        print(message)
+        self.failures.setdefault(path, []).append(message)
+
+    def print_report(self) -> None:
+        """Print the pages, chunks and timings of every file."""
+
+        total = time.perf_counter() - self.started
+        print(f"Ingest report ({self.workers} workers, {total:.1f}s wall):")
+        for path, entry in self.files.items():
+            print(
+                f"  {path}: {entry['pages']} pages, {entry['chunks']} chunks, "
+                f"parse {entry['parse_seconds']:.1f}s, done at {entry['done_seconds']:.1f}s"
+            )
+
+        pages = sum(entry["pages"] for entry in self.files.values())
+        chunks = sum(entry["chunks"] for entry in self.files.values())
+        parse = sum(entry["parse_seconds"] for entry in self.files.values())
+        print(f"  total: {pages} pages, {chunks} chunks, parse {parse:.1f}s")
+        for path, messages in self.failures.items():
+            print(f"  FAILED {path}: {len(messages)} error(s), first: {messages[0]}")
+
+
+def plan_page_tasks(source_uris: List[str],
+                    pages_per_task: int = DEFAULT_PAGES_PER_TASK,
+                    report: Optional[IngestReport] = None) -> List[Tuple[str, int, int]]:
+    """
+    Split PDF files into page-range work units.
+
+    Args:
+        source_uris: PDF file paths
+        pages_per_task: Maximum number of pages per work unit
+        report: Report to register the files and unreadable files with
+
+    Returns:
+        List of (path, first page, end page) tuples, in file and page order
+    """
+
+    tasks = []
+    for source_uri in source_uris:
+        if not os.path.exists(source_uri):
+            _fail(report, source_uri, f"File not found: {source_uri}")
+            continue
+
+        try:
+            pages = count_pages(source_uri)
+        except Exception as e:
+            _fail(report, source_uri, f"Could not open PDF {source_uri}: {e}")
+            continue
+
+        if report is not None:
+            report.add_file(source_uri, pages)
+
+        for start in range(0, pages, pages_per_task):
+            tasks.append((source_uri, start, min(start + pages_per_task, pages)))
+
+    return tasks
+
+
+def _fail(report: Optional[IngestReport], path: str, message: str) -> None:
+    if report is None:
+        print(message)
+    else:
+        report.add_failure(path, message)
+
+
+def iter_parsed_pages(tasks: List[Tuple[str, int, int]],
+                      workers: Optional[int] = None,
+                      report: Optional[IngestReport] = None) -> Iterator[Tuple[Tuple[str, int, int], List[Document], float]]:
+    """
+    Parse page-range work units in a process pool, yielding them as they finish.
+
+    Args:
+        tasks: Work units from plan_page_tasks
+        workers: Number of worker processes (default: CPU count); with 1 worker
+            or a single work unit, pages are parsed in the current process
+        report: Report to record page ranges that failed to parse with; their
+            pages are missing from the output
+
+    Yields:
+        Tuples of (work unit, page documents, seconds spent parsing), in
+        completion order
+    """
+
+    workers = workers or os.cpu_count() or 1
+
+    if workers <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            try:
+                docs, seconds = parse_page_range(*task)
+            except Exception as e:
+                _fail(report, task[0], f"Could not parse {task[0]} pages {task[1]}-{task[2]}: {e}")
+                continue
+            yield task, docs, seconds
+        return
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+        futures = {executor.submit(parse_page_range, *task): task for task in tasks}
+        for future in as_completed(futures):
+            task = futures[future]
+            try:
+                docs, seconds = future.result()
+            except Exception as e:
+                _fail(report, task[0], f"Could not parse {task[0]} pages {task[1]}-{task[2]}: {e}")
+                continue
+            yield task, docs, seconds
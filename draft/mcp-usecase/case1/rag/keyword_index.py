@@ -0,0 +1,553 @@
+from typing import List, Dict, Any, Optional, Callable, Iterator, Tuple
+from contextlib import contextmanager
+import glob
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import uuid
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+INDEX_VERSION = 1
+POSTINGS_FILE = "postings.npz"
+META_FILE = "meta.json"
+DOCUMENTS_FILE = "documents.jsonl"
+
+
+@contextmanager
+def index_lock(path: Optional[str]) -> Iterator[None]:
+    """
+    Hold an exclusive lock on an index directory across processes.
+
+    The lock is taken on a "{path}.lock" file next to the directory, so it stays
+    valid while the directory itself is replaced. Locks are not reentrant.
+
+    Args:
+        path: Index directory; nothing is locked if omitted
+    """
+
+    if path is None:
+        yield
+        return
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(f"{path}.lock", "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                # LK_LOCK gives up after about 10 seconds; keep waiting for the other process
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def make_temp_dir(path: str) -> str:
+    """
+    Create a uniquely named directory next to an index directory to build into.
+
+    Must be called under index_lock(path): leftovers of crashed builds are
+    removed first.
+
+    Args:
+        path: Index directory
+
+    Returns:
+        Path of the new, empty directory
+    """
+
+    for stale in glob.glob(f"{glob.escape(path)}.tmp-*") + glob.glob(f"{glob.escape(path)}.old-*"):
+        shutil.rmtree(stale, ignore_errors=True)
+
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    return tempfile.mkdtemp(prefix=f"{os.path.basename(path)}.tmp-", dir=parent)
+
+
+def replace_directory(tmp_path: str, path: str) -> None:
+    """
+    Move a fully written directory into place of an index directory.
+
+    The old directory is moved aside rather than deleted in place: other
+    processes may still have its files open or mapped, which also makes the
+    move fail on Windows.
+
+    Args:
+        tmp_path: Directory created by make_temp_dir()
+        path: Index directory
+
+    Raises:
+        OSError: If the old directory cannot be moved
+    """
+
+    if os.path.exists(path):
+        old_path = f"{path}.old-{uuid.uuid4().hex}"
+        try:
+            os.replace(path, old_path)
+        except OSError as e:
+            raise OSError(f"Could not replace the index at {path}; "
+                          f"close other processes using it and retry: {e}") from e
+        shutil.rmtree(old_path, ignore_errors=True)
+    os.replace(tmp_path, path)
+
+
+def whitespace_tokenizer(text: str) -> List[str]:
+    """
+    Split text on whitespace (the BM25Retriever default).
+
+    Args:
+        text: Input text
+
+    Returns:
+        List of tokens
+    """
+
+    return text.split()
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Return the indices of the k highest scores in descending order.
+
+    Args:
+        scores: 1-D array of scores
+        k: Number of indices to return
+
+    Returns:
+        Indices of the top-k scores
+    """
+
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+def documents_fingerprint(docs: List[Document]) -> str:
+    """
+    Hash the contents and provenance of a document list.
+
+    Used to check that a persisted index was built from the same chunks.
+
+    Args:
+        docs: Document chunks
+
+    Returns:
+        Hex digest of the document list
+    """
+
+    digest = hashlib.sha256()
+    for doc in docs:
+        digest.update(str(doc.metadata.get("source", "")).encode("utf-8"))
+        digest.update(b"\x00")
+        digest.update(str(doc.metadata.get("page", "")).encode("utf-8"))
+        digest.update(b"\x00")
+        digest.update(doc.page_content.encode("utf-8"))
+        digest.update(b"\x01")
+
+    return digest.hexdigest()
+
+
+class BM25Index:
+    """
+    Inverted BM25 index with postings stored in CSR arrays.
+
+    For every term, the ids of the documents that contain it and the fully
+    precomputed BM25 contribution of the term to each of those documents are
+    stored contiguously. Scoring a query therefore only touches the postings of
+    its terms, and the top-k documents are selected with argpartition.
+    """
+
+    def __init__(self,
+                 tokenizer: Callable[[str], List[str]] = whitespace_tokenizer,
+                 tokenizer_name: str = "whitespace",
+                 k1: float = 1.5,
+                 b: float = 0.75) -> None:
+        """
+        Initialize an empty index.
+
+        Args:
+            tokenizer: Function that splits text into tokens
+            tokenizer_name: Name of the tokenizer, stored with the index
+            k1: BM25 term frequency saturation
+            b: BM25 length normalization
+        """
+
+        self.tokenizer = tokenizer
+        self.tokenizer_name = tokenizer_name
+        self.k1 = k1
+        self.b = b
+        self.docs: List[Document] = []
+        self.vocab: Dict[str, int] = {}
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.doc_ids = np.empty(0, dtype=np.int32)
+        self.weights = np.empty(0, dtype=np.float32)
+        self.doc_len = np.empty(0, dtype=np.int32)
+        self.fingerprint = ""
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def build(self,
+              docs: List[Document],
+              token_lists: Optional[List[List[str]]] = None) -> "BM25Index":
+        """
+        Build the index from document chunks.
+
+        Args:
+            docs: Document chunks
+            token_lists: Pre-tokenized documents; tokenized with self.tokenizer if omitted
+
+        Returns:
+            The built index
+        """
+
+        if token_lists is None:
+            token_lists = [self.tokenizer(doc.page_content) for doc in docs]
+
+        self.docs = list(docs)
+        self.fingerprint = documents_fingerprint(self.docs)
+        n_docs = len(self.docs)
+
+        vocab: Dict[str, int] = {}
+        term_ids = []
+        for tokens in token_lists:
+            term_ids.append([vocab.setdefault(token, len(vocab)) for token in tokens])
+        self.vocab = vocab
+
+        self.doc_len = np.fromiter((len(ids) for ids in term_ids), dtype=np.int32, count=n_docs)
+        all_terms = np.fromiter(
+            (term_id for ids in term_ids for term_id in ids), dtype=np.int64, count=int(self.doc_len.sum())
+        )
+        all_docs = np.repeat(np.arange(n_docs, dtype=np.int64), self.doc_len)
+
+        # Sorting by (term, doc) groups the postings of each term together
+        keys, tf = np.unique(all_terms * max(n_docs, 1) + all_docs, return_counts=True)
+        posting_terms = keys // max(n_docs, 1)
+        posting_docs = keys % max(n_docs, 1)
+
+        df = np.bincount(posting_terms, minlength=len(vocab))
+        self.indptr = np.concatenate([[0], np.cumsum(df)]).astype(np.int64)
+
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+        avgdl = float(self.doc_len.mean()) if n_docs else 0.0
+        norm = self.k1 * (1.0 - self.b + self.b * self.doc_len / max(avgdl, 1e-9))
+
+        self.doc_ids = posting_docs.astype(np.int32)
+        self.weights = (
+            idf[posting_terms] * tf * (self.k1 + 1.0) / (tf + norm[posting_docs])
+        ).astype(np.float32)
+
+        return self
+
+    def _term_counts(self, query: str) -> Dict[int, int]:
+        counts: Dict[int, int] = {}
+        for token in self.tokenizer(query):
+            term_id = self.vocab.get(token)
+            if term_id is not None:
+                counts[term_id] = counts.get(term_id, 0) + 1
+        return counts
+
+    def _postings(self, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        start, end = self.indptr[term_id], self.indptr[term_id + 1]
+        return self.doc_ids[start:end], self.weights[start:end]
+
+    @staticmethod
+    def _accumulate(counts: Dict[int, int],
+                    postings: Callable[[int], Tuple[np.ndarray, np.ndarray]]) -> Tuple[np.ndarray, np.ndarray]:
+        # Sum the weighted postings of the query terms per document
+        if not counts:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+
+        doc_ids = []
+        weights = []
+        for term_id, count in counts.items():
+            term_docs, term_weights = postings(term_id)
+            doc_ids.append(term_docs)
+            weights.append(term_weights * count)
+
+        candidates, inverse = np.unique(np.concatenate(doc_ids), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(weights))
+
+        return candidates, scores.astype(np.float32)
+
+    def score(self, query: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score the documents that share at least one term with the query.
+
+        Args:
+            query: Search query
+
+        Returns:
+            Tuple of (document indices, BM25 scores)
+        """
+
+        return self._accumulate(self._term_counts(query), self._postings)
+
+    def search(self, query: str, k: int) -> List[Tuple[Document, float]]:
+        """
+        Return the k best matching documents with their BM25 scores.
+
+        Args:
+            query: Search query
+            k: Number of results to return
+
+        Returns:
+            List of (document, score) pairs, best first
+        """
+
+        candidates, scores = self.score(query)
+        top = top_k_indices(scores, k)
+
+        return [(self.docs[candidates[i]], float(scores[i])) for i in top]
+
+    def search_many(self, queries: List[str], k: int) -> List[List[Tuple[Document, float]]]:
+        """
+        Search several queries.
+
+        The posting slices of the batch's distinct terms are looked up once and
+        shared by every query containing them; scores are then accumulated per
+        query, as in search().
+
+        Args:
+            queries: Search queries
+            k: Number of results to return per query
+
+        Returns:
+            One list of (document, score) pairs per query
+        """
+
+        term_counts = [self._term_counts(query) for query in queries]
+        postings = {
+            term_id: self._postings(term_id)
+            for term_id in {term_id for counts in term_counts for term_id in counts}
+        }
+
+        results = []
+        for counts in term_counts:
+            candidates, scores = self._accumulate(counts, postings.__getitem__)
+            top = top_k_indices(scores, k)
+            results.append([(self.docs[candidates[i]], float(scores[i])) for i in top])
+
+        return results
+
+    def save(self, path: str) -> None:
+        """
+        Persist the index to a directory.
+
+        The index is written to a uniquely named temporary directory under
+        index_lock() and moved into place, so readers never see a partially
+        written index and processes sharing the directory never remove each
+        other's files.
+
+        Args:
+            path: Target directory
+        """
+
+        with index_lock(path):
+            self._save(path)
+
+    def _save(self, path: str) -> None:
+        tmp_path = make_temp_dir(path)
+        try:
+            self._write(tmp_path)
+            replace_directory(tmp_path, path)
+        except BaseException:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+
+    def _write(self, tmp_path: str) -> None:
+        np.savez(
+            os.path.join(tmp_path, POSTINGS_FILE),
+            indptr=self.indptr,
+            doc_ids=self.doc_ids,
+            weights=self.weights,
+            doc_len=self.doc_len
+        )
+
+        vocab = [None] * len(self.vocab)
+        for term, term_id in self.vocab.items():
+            vocab[term_id] = term
+
+        with open(os.path.join(tmp_path, META_FILE), "w", encoding="utf-8") as f:
+            json.dump({
+                "version": INDEX_VERSION,
+                "tokenizer": self.tokenizer_name,
+                "k1": self.k1,
+                "b": self.b,
+                "fingerprint": self.fingerprint,
+                "vocab": vocab
+            }, f, ensure_ascii=False)
+
+        with open(os.path.join(tmp_path, DOCUMENTS_FILE), "w", encoding="utf-8") as f:
+            for doc in self.docs:
+                f.write(json.dumps(
+                    {"page_content": doc.page_content, "metadata": doc.metadata},
+                    ensure_ascii=False,
+                    default=str
+                ))
+                f.write("\n")
+
+    @classmethod
+    def load(cls,
+             path: str,
+             tokenizer: Callable[[str], List[str]] = whitespace_tokenizer,
+             tokenizer_name: str = "whitespace") -> Optional["BM25Index"]:
+        """
+        Load a persisted index.
+
+        Args:
+            path: Index directory
+            tokenizer: Tokenizer used for queries
+            tokenizer_name: Expected tokenizer name
+
+        Returns:
+            The loaded index, or None if it is missing, unreadable or was built
+            with a different tokenizer
+        """
+
+        with index_lock(path):
+            return cls._load(path, tokenizer, tokenizer_name)
+
+    @classmethod
+    def _load(cls,
+              path: str,
+              tokenizer: Callable[[str], List[str]] = whitespace_tokenizer,
+              tokenizer_name: str = "whitespace") -> Optional["BM25Index"]:
+        if not os.path.exists(os.path.join(path, META_FILE)):
+            return None
+
+        try:
+            with open(os.path.join(path, META_FILE), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+
+            if meta.get("version") != INDEX_VERSION or meta.get("tokenizer") != tokenizer_name:
+                return None
+
+            index = cls(tokenizer=tokenizer, tokenizer_name=tokenizer_name, k1=meta["k1"], b=meta["b"])
+            index.fingerprint = meta["fingerprint"]
+            index.vocab = {term: term_id for term_id, term in enumerate(meta["vocab"])}
+
+            with np.load(os.path.join(path, POSTINGS_FILE)) as postings:
+                index.indptr = postings["indptr"]
+                index.doc_ids = postings["doc_ids"]
+                index.weights = postings["weights"]
+                index.doc_len = postings["doc_len"]
+
+            with open(os.path.join(path, DOCUMENTS_FILE), "r", encoding="utf-8") as f:
+                index.docs = [Document(**json.loads(line)) for line in f if line.strip()]
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Could not load keyword index from {path}: {e}")
+            return None
+
+        return index
+
+
+def load_or_build_index(docs: List[Document],
+                        path: Optional[str] = None,
+                        tokenizer: Callable[[str], List[str]] = whitespace_tokenizer,
+                        tokenizer_name: str = "whitespace",
+                        tokenize_texts: Optional[Callable[[List[str]], List[List[str]]]] = None) -> BM25Index:
+    """
+    Load a persisted index built from docs, or build (and persist) a new one.
+
+    The fingerprint is checked and the index rebuilt under index_lock(), so
+    when several processes find a stale index, one rebuilds it and the others
+    load the result.
+
+    Args:
+        docs: Document chunks
+        path: Index directory; the index is kept in memory only if omitted
+        tokenizer: Function that splits text into tokens
+        tokenizer_name: Name of the tokenizer, stored with the index
+        tokenize_texts: Batch tokenizer used when building (e.g. cached or
+            parallel); defaults to calling tokenizer on each chunk
+
+    Returns:
+        A BM25 index over docs
+    """
+
+    with index_lock(path):
+        if path:
+            index = BM25Index._load(path, tokenizer=tokenizer, tokenizer_name=tokenizer_name)
+            if index is not None and index.fingerprint == documents_fingerprint(docs):
+                return index
+
+        token_lists = None
+        if tokenize_texts is not None:
+            token_lists = tokenize_texts([doc.page_content for doc in docs])
+
+        index = BM25Index(tokenizer=tokenizer, tokenizer_name=tokenizer_name).build(docs, token_lists)
+
+        if path:
+            index._save(path)
+
+        return index
+
+
+class KeywordRetriever(BaseRetriever):
+    """
+    LangChain retriever backed by a BM25Index.
+    """
+
+    index: Any
+    k: int = 4
+
+    def _get_relevant_documents(self,
+                                query: str,
+                                *,
+                                run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return [doc for doc, _ in self.index.search(query, self.k)]
+
+    def search(self, query: str, k: Optional[int] = None) -> List[Document]:
+        """
+        Return the best matching documents for a query.
+
+        Args:
+            query: Search query
+            k: Number of results to return, overrides self.k
+
+        Returns:
+            Relevant documents
+        """
+
+        return [doc for doc, _ in self.index.search(query, k or self.k)]
+
+    def search_with_scores(self, query: str, k: Optional[int] = None) -> List[Tuple[Document, float]]:
+        """
+        Return the best matching documents with their BM25 scores.
+
+        Args:
+            query: Search query
+            k: Number of results to return, overrides self.k
+
+        Returns:
+            List of (document, score) pairs, best first
+        """
+
+        return self.index.search(query, k or self.k)
@@ -0,0 +1,231 @@
+from typing import List, Dict, Any, Optional, Tuple
+from pathlib import Path
+import hashlib
+import json
+import os
+
+from langchain_core.documents import Document
+
+MANIFEST_FILENAME = "ingest_manifest.json"
+MANIFEST_VERSION = 1
+
+
+def file_hash(path: str, block_size: int = 1 << 20) -> str:
+    """
+    Compute the SHA-256 digest of a file's contents.
+
+    Args:
+        path: File path
+        block_size: Number of bytes read per iteration
+
+    Returns:
+        Hex digest of the file contents
+    """
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def chunk_hash(doc: Document) -> str:
+    """
+    Compute a content hash for a document chunk.
+
+    The hash covers the source file, the page and the chunk text, so the same
+    text in two different files yields two different chunk ids.
+
+    Args:
+        doc: Document chunk
+
+    Returns:
+        Hex digest identifying the chunk
+    """
+
+    source = str(doc.metadata.get("source", ""))
+    page = str(doc.metadata.get("page", ""))
+    payload = "\x00".join([source, page, doc.page_content])
+
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def assign_chunk_ids(split_docs: List[Document]) -> List[str]:
+    """
+    Assign a stable, content-derived id to each chunk.
+
+    Identical chunks from the same source and page get an occurrence suffix
+    so that every id stays unique.
+
+    Args:
+        split_docs: Split document chunks
+
+    Returns:
+        Chunk ids in the same order as split_docs
+    """
+
+    seen: Dict[str, int] = {}
+    ids = []
+    for doc in split_docs:
+        base_id = chunk_hash(doc)
+        count = seen.get(base_id, 0)
+        seen[base_id] = count + 1
+        ids.append(base_id if count == 0 else f"{base_id}-{count}")
+
+    return ids
+
+
+class IngestManifest:
+    """
+    Record of the files and chunks already ingested into a persisted vector store.
+
+    The manifest is stored as JSON next to the vector store and maps each
+    source file to its content hash and the ids of the chunks it produced.
+    """
+
+    def __init__(self, path: str, settings: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Initialize an empty manifest.
+
+        Args:
+            path: Location of the manifest JSON file
+            settings: Ingestion settings (embedding model, splitter parameters);
+                a change in settings invalidates all recorded chunks
+        """
+
+        self.path = path
+        self.settings = settings or {}
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.stale_ids: List[str] = []
+        self.previous_settings: Optional[Dict[str, Any]] = None
+        self.previous_files: Dict[str, Dict[str, Any]] = {}
+
+    @classmethod
+    def load(cls, persist_directory: str, settings: Dict[str, Any]) -> "IngestManifest":
+        """
+        Load the manifest stored in a persist directory.
+
+        Returns an empty manifest if none exists, if it cannot be parsed, or if it
+        was written with different ingestion settings.
+
+        Args:
+            persist_directory: Directory of the persisted vector store
+            settings: Current ingestion settings
+
+        Returns:
+            The loaded manifest
+        """
+
+        path = os.path.join(persist_directory, MANIFEST_FILENAME)
+        manifest = cls(path, settings)
+
+        if not os.path.exists(path):
+            return manifest
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable ingest manifest {path}: {e}")
+            return manifest
+
+        if data.get("version") != MANIFEST_VERSION or data.get("settings") != settings:
+            print("Ingestion settings changed since the last run; stored chunks are stale.")
+            manifest.previous_settings = data.get("settings")
+            manifest.previous_files = data.get("files", {})
+            manifest.stale_ids = [
+                chunk_id
+                for entry in data.get("files", {}).values()
+                for chunk_id in entry.get("chunk_ids", [])
+            ]
+            return manifest
+
+        manifest.files = data.get("files", {})
+        return manifest
+
+    def adopt_previous(self) -> None:
+        """
+        Keep the file records written under the previous settings.
+
+        Used after the stored vectors were migrated to the current settings
+        (e.g. truncated to fewer dimensions) instead of being re-indexed.
+        """
+
+        self.files = self.previous_files
+        self.stale_ids = []
+    
+    @property
+    def exists(self) -> bool:
+        """Whether the manifest file is present on disk."""
+
+        return os.path.exists(self.path)
+
+    def diff(self, source_uris: List[str]) -> Tuple[Dict[str, str], List[str], List[str]]:
+        """
+        Compare source files against the manifest.
+
+        Args:
+            source_uris: Current source file paths
+
+        Returns:
+            Tuple of (changed files mapped to their new hash, unchanged files, removed files)
+        """
+
+        changed: Dict[str, str] = {}
+        unchanged: List[str] = []
+
+        current = set()
+        for source_uri in source_uris:
+            if not os.path.exists(source_uri):
+                print(f"File not found: {source_uri}")
+                continue
+
+            key = str(Path(source_uri))
+            current.add(key)
+            digest = file_hash(source_uri)
+            entry = self.files.get(key)
+
+            if entry is not None and entry.get("file_hash") == digest:
+                unchanged.append(key)
+            else:
+                changed[key] = digest
+
+        removed = [key for key in self.files if key not in current]
+        return changed, unchanged, removed
+
+    def chunk_ids(self, source_uri: str) -> List[str]:
+        """Return the chunk ids recorded for a source file."""
+
+        return list(self.files.get(str(Path(source_uri)), {}).get("chunk_ids", []))
+
+    def file_hash(self, source_uri: str) -> Optional[str]:
+        """Return the recorded content hash of a source file."""
+
+        return self.files.get(str(Path(source_uri)), {}).get("file_hash")
+
+    def update(self, source_uri: str, digest: str, chunk_ids: List[str]) -> None:
+        """Record the hash and chunk ids of an ingested source file."""
+
+        self.files[str(Path(source_uri))] = {"file_hash": digest, "chunk_ids": chunk_ids}
+
+    def remove(self, source_uri: str) -> None:
+        """Forget a source file."""
+
+        self.files.pop(str(Path(source_uri)), None)
+
+    def save(self) -> None:
+        """Atomically write the manifest to disk."""
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"version": MANIFEST_VERSION, "settings": self.settings, "files": self.files},
+                f,
+                ensure_ascii=False,
+                indent=2
+            )
+
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,174 @@
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from rag.embedding_cache import aembed_queries, embed_queries
+
+# Name suffix of the collection truncated vectors are written to before it replaces the original
+MIGRATION_SUFFIX = "__migrating"
+
+
+def truncate_and_normalize(vectors: Any, dimensions: Optional[int]) -> np.ndarray:
+    """
+    Keep the first dimensions values of each vector and scale it back to unit length.
+
+    For Matryoshka-trained models such as text-embedding-3-*, this gives the
+    same vectors as requesting the shortened size from the API.
+
+    Args:
+        vectors: 2-D array or list of vectors
+        dimensions: Number of leading values to keep (None keeps all)
+
+    Returns:
+        Truncated, normalized float32 vectors
+    """
+
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if dimensions is not None:
+        vectors = vectors[:, :dimensions]
+
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def can_truncate(previous: Optional[Dict[str, Any]], current: Dict[str, Any]) -> bool:
+    """
+    Check whether vectors built with previous ingest settings can be migrated
+    to current settings by truncation alone, without re-embedding.
+
+    Args:
+        previous: Ingest settings the stored vectors were built with
+        current: Current ingest settings
+
+    Returns:
+        True if only embedding_dimensions differs and it shrinks
+    """
+
+    if not previous:
+        return False
+
+    old_dimensions = previous.get("embedding_dimensions")
+    new_dimensions = current.get("embedding_dimensions")
+    if new_dimensions is None or (old_dimensions is not None and old_dimensions <= new_dimensions):
+        return False
+
+    strip = lambda settings: {key: value for key, value in settings.items() if key != "embedding_dimensions"}
+    return strip(previous) == strip(current)
+
+
+class TruncatedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that truncates vectors to a Matryoshka prefix and re-normalizes them.
+
+    OpenAI already returns unit-length vectors when dimensions is requested;
+    the wrapper guarantees it for every backend, so dot products stay cosine
+    similarities after truncation.
+    """
+
+    def __init__(self, embeddings: Embeddings, dimensions: int) -> None:
+        """
+        Wrap an embedding model.
+
+        Args:
+            embeddings: Underlying embedding model
+            dimensions: Number of leading dimensions to keep
+        """
+
+        self.embeddings = embeddings
+        self.dimensions = dimensions
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return truncate_and_normalize(self.embeddings.embed_documents(texts), self.dimensions).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return truncate_and_normalize([self.embeddings.embed_query(text)], self.dimensions)[0].tolist()
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return truncate_and_normalize(embed_queries(self.embeddings, texts), self.dimensions).tolist()
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        vectors = await self.embeddings.aembed_documents(texts)
+        return truncate_and_normalize(vectors, self.dimensions).tolist()
+
+    async def aembed_query(self, text: str) -> List[float]:
+        vector = await self.embeddings.aembed_query(text)
+        return truncate_and_normalize([vector], self.dimensions)[0].tolist()
+
+    async def aembed_queries(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        vectors = await aembed_queries(self.embeddings, texts)
+        return truncate_and_normalize(vectors, self.dimensions).tolist()
+
+
+def migrate_chroma_dimensions(vectorstore: Any, dimensions: int, batch_size: int = 256) -> int:
+    """
+    Truncate every vector of a Chroma collection in place of re-embedding it.
+
+    Chroma fixes the dimension of a collection, so the truncated records are
+    written to a staging collection, which replaces the original only once it
+    holds every record. If a previous migration was interrupted after the
+    original was dropped, the staging collection is swapped in instead.
+
+    Args:
+        vectorstore: langchain_chroma.Chroma instance
+        dimensions: Target number of dimensions
+        batch_size: Number of records written per request
+
+    Returns:
+        Number of migrated records
+
+    Raises:
+        RuntimeError: If the staging collection does not hold every record
+    """
+
+    client = vectorstore._client
+    collection = vectorstore._collection
+    staging_name = f"{collection.name}{MIGRATION_SUFFIX}"
+    try:
+        staging = client.get_collection(staging_name)
+    except Exception:
+        # Raised as ValueError or a chromadb-specific error depending on the version
+        staging = None
+
+    if staging is not None:
+        if collection.count() or not staging.count():
+            # Interrupted before the swap; the original is still complete
+            client.delete_collection(staging_name)
+            staging = None
+
+    if staging is None:
+        records = vectorstore.get(include=["embeddings", "documents", "metadatas"])
+        ids = records["ids"]
+        if not ids:
+            return 0
+
+        embeddings = truncate_and_normalize(records["embeddings"], dimensions)
+        staging = client.create_collection(staging_name, metadata=collection.metadata)
+        for start in range(0, len(ids), batch_size):
+            end = start + batch_size
+            staging.add(
+                ids=ids[start:end],
+                embeddings=embeddings[start:end].tolist(),
+                documents=records["documents"][start:end],
+                metadatas=records["metadatas"][start:end]
+            )
+
+        written = staging.count()
+        if written != len(ids):
+            client.delete_collection(staging_name)
+            raise RuntimeError(f"Migrated collection holds {written} of {len(ids)} records.")
+
+    client.delete_collection(collection.name)
+    staging.modify(name=collection.name)
+    vectorstore._chroma_collection = staging
+
+    return staging.count()
+
@@ -1,12 +1,22 @@
-from typing import List, Optional, Any
+from typing import Dict, List, Optional, Any
+from pathlib import Path
 import os
 
-from langchain_community.document_loaders import PDFPlumberLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
 from langchain_chroma import Chroma
 
+from rag.ann_index import ANN_INDEX_TYPES
 from rag.base import RetrievalChain
+from rag.dedup import SplitCache
+from rag.flat_index import FlatVectorStore
+from rag.ingest import DEFAULT_PAGES_PER_TASK, IngestReport, iter_parsed_pages, plan_page_tasks
+from rag.manifest import IngestManifest, assign_chunk_ids, file_hash
+from rag.matryoshka import can_truncate, migrate_chroma_dimensions
+from rag.onnx_embeddings import VECTOR_PARAM_KEYS
+from rag.quantization import QUANTIZATION_TYPES
+
+VECTOR_BACKENDS = ("chroma", "flat")
 
 class PDFRetrievalChain(RetrievalChain):
     """
@@ -19,6 +29,18 @@ class PDFRetrievalChain(RetrievalChain):
     def __init__(self, 
                  source_uri: List[str], 
                  persist_directory: Optional[str] = None,
+                 incremental: bool = False,
+                 chunk_size: int = 600,
+                 chunk_overlap: int = 50,
+                 embed_batch_size: int = 256,
+                 pages_per_task: int = DEFAULT_PAGES_PER_TASK,
+                 vector_backend: str = "chroma",
+                 vector_dtype: str = "float32",
+                 ann_index: str = "exact",
+                 ann_params: Optional[Dict[str, Any]] = None,
+                 ann_search_params: Optional[Dict[str, Any]] = None,
+                 quantization: str = "none",
+                 quantization_params: Optional[Dict[str, Any]] = None,
                  **kwargs) -> None:
         """
         Initialize a PDF retrieval chain.
@@ -26,33 +48,115 @@ class PDFRetrievalChain(RetrievalChain):
         Args:
             source_uri: List of PDF file paths
             persist_directory: Directory to persist vector store
+            incremental: Sync the persisted vector store with source_uri using an
+                ingest manifest, embedding only new or changed chunks
+            chunk_size: Maximum chunk size in characters
+            chunk_overlap: Overlap between consecutive chunks in characters
+            embed_batch_size: Number of chunks sent to the vector store per write
+            pages_per_task: Number of PDF pages parsed per worker task
+            vector_backend: "chroma", or "flat" for a memory-mapped .npy index
+                shared by all processes that open the same persist_directory
+            vector_dtype: Storage type of the flat index, "float32" or "float16"
+            ann_index: Search of the flat index, "exact", "ivf" or "hnsw"
+            ann_params: ANN build parameters (nlist for IVF; M and ef_construction for HNSW)
+            ann_search_params: Default ANN query parameters (nprobe for IVF, ef for HNSW)
+            quantization: Compressed copy of the flat index scanned at query time,
+                "none", "int8" or "pq"; candidates are reranked with exact vectors
+            quantization_params: Quantizer parameters (m for PQ; rerank_factor)
             **kwargs: Additional keyword arguments for the base RetrievalChain
+            
+        Raises:
+            ValueError: If vector_backend, ann_index or quantization is unknown, an
+                ANN index or quantization is requested without the flat backend, or
+                both are requested
         """
 
+        if vector_backend not in VECTOR_BACKENDS:
+            raise ValueError(f"Unknown vector backend: {vector_backend}. Expected one of {VECTOR_BACKENDS}.")
+        
+        if ann_index not in ANN_INDEX_TYPES:
+            raise ValueError(f"Unknown ANN index type: {ann_index}. Expected one of {ANN_INDEX_TYPES}.")
+        
+        if quantization not in QUANTIZATION_TYPES:
+            raise ValueError(f"Unknown quantization: {quantization}. Expected one of {QUANTIZATION_TYPES}.")
+        
+        if (ann_index != "exact" or quantization != "none") and vector_backend != "flat":
+            raise ValueError("ANN index types and quantization require vector_backend='flat'.")
+        
+        if ann_index != "exact" and quantization != "none":
+            raise ValueError("Choose either an ANN index or quantization, not both.")
+        
         super().__init__(source_uri=source_uri, persist_directory=persist_directory, **kwargs)
+        self.incremental = incremental
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.embed_batch_size = embed_batch_size
+        self.pages_per_task = pages_per_task
+        self.vector_backend = vector_backend
+        self.vector_dtype = vector_dtype
+        self.ann_index = ann_index
+        self.ann_params = ann_params or {}
+        self.ann_search_params = ann_search_params or {}
+        self.quantization = quantization
+        self.quantization_params = quantization_params or {}
+        # Files of the last load with an unreadable page range -> error messages
+        self.ingest_failures: Dict[str, List[str]] = {}
     
     def load_documents(self, source_uris: List[str]) -> List[Document]:
         """
         Load PDF documents from file paths.
         
+        Pages are parsed in a process pool (ingest_workers processes, each
+        handling pages_per_task pages at a time).
+        
         Args:
             source_uris: List of PDF file paths
             
         Returns:
-            List of loaded documents
+            List of loaded documents, one per page, in file and page order
         """
 
-        docs = []
-        for source_uri in source_uris:
-            if not os.path.exists(source_uri):
-                print(f"File not found: {source_uri}")
-                continue
-                
-            print(f"Loading PDF: {source_uri}")
-            loader = PDFPlumberLoader(source_uri)
-            docs.extend(loader.load())
+        report = IngestReport(self.ingest_workers or os.cpu_count() or 1)
+        tasks = plan_page_tasks(source_uris, self.pages_per_task, report)
+        
+        pages_by_task = {}
+        for task, pages, seconds in iter_parsed_pages(tasks, self.ingest_workers, report):
+            pages_by_task[task] = pages
+            report.add_task(task[0], seconds, 0)
         
-        return docs
+        report.print_report()
+        self.ingest_failures = report.failures
+        return [page for task in tasks for page in pages_by_task.get(task, [])]
+    
+    def load_and_split(self, source_uris: List[str]) -> List[Document]:
+        """
+        Load and split PDF documents as a streaming pipeline.
+        
+        Page ranges are parsed in a process pool, and each range is split into
+        chunks as soon as it arrives while the workers keep parsing. Files with
+        a page range that failed to parse are listed in ingest_failures.
+        
+        Args:
+            source_uris: List of PDF file paths
+            
+        Returns:
+            Split document chunks, in file and page order
+        """
+
+        report = IngestReport(self.ingest_workers or os.cpu_count() or 1)
+        tasks = plan_page_tasks(source_uris, self.pages_per_task, report)
+        print(f"Parsing {len(report.files)} PDFs in {len(tasks)} page ranges")
+        
+        text_splitter = self.create_text_splitter()
+        chunks_by_task = {}
+        for task, pages, seconds in iter_parsed_pages(tasks, self.ingest_workers, report):
+            chunks = self.split_documents(pages, text_splitter)
+            chunks_by_task[task] = chunks
+            report.add_task(task[0], seconds, len(chunks))
+        
+        report.print_report()
+        self.ingest_failures = report.failures
+        return [chunk for task in tasks for chunk in chunks_by_task.get(task, [])]
     
     def create_text_splitter(self) -> RecursiveCharacterTextSplitter:
         """
@@ -63,8 +167,8 @@ class PDFRetrievalChain(RetrievalChain):
         """
         
         return RecursiveCharacterTextSplitter(
-            chunk_size=600,
-            chunk_overlap=50
+            chunk_size=self.chunk_size,
+            chunk_overlap=self.chunk_overlap
         )
     
     def create_vectorstore(self, split_docs: List[Document]) -> Any:
@@ -83,7 +187,14 @@ class PDFRetrievalChain(RetrievalChain):
         
         if not split_docs:
             raise ValueError("No split documents available.")
+        
+        if self.vector_backend == "flat":
+            return self.create_flat_vectorstore(split_docs)
             
+        # create_retrievers already built the model; a second one would load the
+        # onnx session (or start the query batcher) twice
+        embeddings = self.embeddings or self.create_embedding()
+        
         if self.persist_directory:
             os.makedirs(self.persist_directory, exist_ok=True)
             
@@ -92,15 +203,489 @@ class PDFRetrievalChain(RetrievalChain):
 
                 return Chroma(
                     persist_directory=self.persist_directory,
-                    embedding_function=self.create_embedding()
+                    embedding_function=embeddings
                 )
         
         print("Creating new vector store...")
 
-        vectorstore = Chroma.from_documents(
-            documents=split_docs,
-            embedding=self.create_embedding(),
-            persist_directory=self.persist_directory
+        vectorstore = Chroma(
+            persist_directory=self.persist_directory,
+            embedding_function=embeddings
+        )
+        self._add_chunks(vectorstore, list(zip(assign_chunk_ids(split_docs), split_docs)))
+        
+        return vectorstore
+    
+    def flat_index_path(self) -> Optional[str]:
+        """
+        Directory where the flat vector index is persisted.
+        
+        Returns:
+            A directory inside persist_directory, or None if nothing is persisted
+        """
+
+        if not self.persist_directory:
+            return None
+        
+        return os.path.join(self.persist_directory, "flat_index")
+    
+    def create_flat_vectorstore(self, split_docs: List[Document]) -> FlatVectorStore:
+        """
+        Open the persisted flat index if it holds exactly split_docs, or rebuild it.
+        
+        Vectors of chunks that are already in the old index are copied instead
+        of being re-embedded.
+        
+        Args:
+            split_docs: Split document chunks
+            
+        Returns:
+            A flat vector store
+        """
+
+        embeddings = self.embeddings or self.create_embedding()
+        chunk_ids = assign_chunk_ids(split_docs)
+        path = self.flat_index_path()
+        
+        store = None
+        if path:
+            store = self._migrate_flat_dimensions() or FlatVectorStore.load(
+                path, embeddings, settings=self.ingest_settings()
+            )
+            if store is not None and store.ids == chunk_ids:
+                print(f"Loading existing flat index: {path}")
+                self.attach_search_structures(store)
+                return store
+        
+        print("Creating new flat index...")
+        store = FlatVectorStore.build(
+            split_docs,
+            chunk_ids,
+            embeddings,
+            path=path,
+            dtype=self.vector_dtype,
+            settings=self.ingest_settings(),
+            batch_size=self.embed_batch_size,
+            reuse=store
+        )
+        self.attach_search_structures(store)
+        
+        return store
+    
+    def _migrate_flat_dimensions(self) -> Optional[FlatVectorStore]:
+        # Truncate a flat index built with more embedding dimensions instead of re-embedding it
+        store = FlatVectorStore.load(self.flat_index_path(), self.embeddings or self.create_embedding())
+        if store is None or not can_truncate(store.settings, self.ingest_settings()):
+            return None
+        
+        return store.truncate_dimensions(self.embedding_dimensions, settings=self.ingest_settings())
+    
+    def attach_search_structures(self, store: FlatVectorStore) -> None:
+        """
+        Attach the configured ANN index or quantized codes to a flat store.
+        
+        Args:
+            store: Flat vector store
+        """
+
+        store.attach_ann_index(self.ann_index, self.ann_params, self.ann_search_params)
+        store.attach_quantization(self.quantization, self.quantization_params)
+    
+    def ingest_settings(self) -> Dict[str, Any]:
+        """
+        Settings that determine chunk contents and embeddings.
+        
+        Returns:
+            Dictionary stored in the ingest manifest; a change triggers a full re-index,
+            except for a smaller embedding_dimensions, which truncates stored vectors
+        """
+
+        settings = {
+            "embedding_model": self.embedding_model,
+            "chunk_size": self.chunk_size,
+            "chunk_overlap": self.chunk_overlap
+        }
+        
+        if self.embedding_dimensions:
+            settings["embedding_dimensions"] = self.embedding_dimensions
+        
+        if self.dedup_threshold is not None:
+            settings["dedup_threshold"] = self.dedup_threshold
+            settings.update({f"dedup_{key}": value for key, value in self.dedup_params.items()})
+        
+        if self.embedding_backend != "openai":
+            settings["embedding_backend"] = self.embedding_backend
+            settings.update({
+                key: self.embedding_params[key] for key in VECTOR_PARAM_KEYS if key in self.embedding_params
+            })
+        
+        # Existing Chroma manifests stay valid; switching backends re-indexes
+        if self.vector_backend != "chroma":
+            settings["vector_backend"] = self.vector_backend
+            settings["vector_dtype"] = self.vector_dtype
+        
+        return settings
+    
+    def sync_vectorstore(self) -> List[Document]:
+        """
+        Bring the persisted vector store in line with the current source files.
+        
+        Only files whose content hash differs from the ingest manifest are loaded
+        and split. Chunks that already exist in the store are not re-embedded,
+        and chunks of changed or removed files that no longer exist are deleted.
+        
+        Returns:
+            All chunks currently in the store, in source order
+        """
+
+        os.makedirs(self.persist_directory, exist_ok=True)
+        manifest = IngestManifest.load(self.persist_directory, self.ingest_settings())
+        
+        self.embeddings = self.create_embedding()
+        vectorstore = Chroma(
+            persist_directory=self.persist_directory,
+            embedding_function=self.embeddings
+        )
+        
+        if not manifest.exists and vectorstore.get(limit=1)["ids"]:
+            print("Vector store has no ingest manifest; rebuilding it.")
+            vectorstore.reset_collection()
+        elif can_truncate(manifest.previous_settings, self.ingest_settings()):
+            migrated = migrate_chroma_dimensions(vectorstore, self.embedding_dimensions, self.embed_batch_size)
+            if migrated == len(set(manifest.stale_ids)):
+                print(f"Truncated {migrated} stored vectors to {self.embedding_dimensions} dimensions")
+                manifest.adopt_previous()
+                manifest.save()
+            else:
+                # The store does not match the manifest; re-index instead of trusting it
+                print(f"Vector store holds {migrated} of {len(set(manifest.stale_ids))} recorded chunks; rebuilding it.")
+                vectorstore.reset_collection()
+        elif manifest.stale_ids:
+            self._delete_chunks(vectorstore, manifest.stale_ids)
+        
+        changed, unchanged, removed = manifest.diff(self.source_uri)
+        if self.dedup_threshold is not None:
+            chunks_by_source = self._split_with_cache(manifest, changed, unchanged)
+            unchanged = [source_uri for source_uri in unchanged if source_uri not in changed]
+        
+        print(
+            f"Ingest plan: {len(changed)} new/changed, "
+            f"{len(unchanged)} unchanged, {len(removed)} removed files"
         )
         
-        return vectorstore
\ No newline at end of file
+        for source_uri in removed:
+            self._delete_chunks(vectorstore, manifest.chunk_ids(source_uri))
+            manifest.remove(source_uri)
+        
+        if self.dedup_threshold is None:
+            chunks_by_source = {source_uri: [] for source_uri in changed}
+            if changed:
+                for doc in self.load_and_split(list(changed)):
+                    key = str(Path(doc.metadata.get("source", "")))
+                    chunks_by_source.setdefault(key, []).append(doc)
+            # Failed files keep the chunks of their previous version, if any
+            unchanged.extend(
+                source_uri for source_uri in self._drop_failed(changed)
+                if manifest.chunk_ids(source_uri)
+            )
+            synced = changed
+        else:
+            chunks_by_source = self._deduplicate_by_source(chunks_by_source)
+            # A change in one file can move the surviving copy of a chunk to another
+            # file, so every file is synced; unchanged surviving chunks cost nothing
+            synced = {source_uri: manifest.file_hash(source_uri) for source_uri in unchanged}
+            synced.update(changed)
+        
+        added = 0
+        for source_uri, digest in synced.items():
+            chunks = chunks_by_source.get(source_uri, [])
+            chunk_ids = assign_chunk_ids(chunks)
+            old_ids = set(manifest.chunk_ids(source_uri))
+            
+            new_chunks = [
+                (chunk_id, chunk) for chunk_id, chunk in zip(chunk_ids, chunks)
+                if chunk_id not in old_ids
+            ]
+            self._add_chunks(vectorstore, new_chunks)
+            self._delete_chunks(vectorstore, list(old_ids - set(chunk_ids)))
+            if self.dedup_threshold is not None:
+                self._update_metadata(vectorstore, [
+                    (chunk_id, chunk) for chunk_id, chunk in zip(chunk_ids, chunks)
+                    if chunk_id in old_ids
+                ])
+            added += len(new_chunks)
+            
+            manifest.update(source_uri, digest, chunk_ids)
+            manifest.save()
+        
+        manifest.save()
+        print(f"Embedded {added} new chunks")
+        if self.dedup_threshold is not None:
+            self.split_cache().prune({source_uri: manifest.file_hash(source_uri) for source_uri in manifest.files})
+        
+        self.vectorstore = vectorstore
+        
+        split_docs = []
+        for source_uri in self.source_uri:
+            key = str(Path(source_uri))
+            if key in synced:
+                split_docs.extend(chunks_by_source.get(key, []))
+            elif key in unchanged:
+                split_docs.extend(self._get_chunks(vectorstore, manifest.chunk_ids(key)))
+        
+        return split_docs
+    
+    def sync_flat_vectorstore(self) -> List[Document]:
+        """
+        Bring the persisted flat index in line with the current source files.
+        
+        When the ingest manifest shows no changes, the index is memory-mapped as
+        is and no PDF is parsed. Otherwise only changed files are loaded and
+        split, and the index is rewritten with the vectors of unchanged chunks
+        carried over.
+        
+        Returns:
+            All chunks currently in the index, in source order
+        """
+
+        os.makedirs(self.persist_directory, exist_ok=True)
+        manifest = IngestManifest.load(self.persist_directory, self.ingest_settings())
+        self.embeddings = self.create_embedding()
+        
+        store = None
+        if can_truncate(manifest.previous_settings, self.ingest_settings()):
+            store = self._migrate_flat_dimensions()
+            if store is not None:
+                manifest.adopt_previous()
+        elif manifest.exists:
+            store = FlatVectorStore.load(self.flat_index_path(), self.embeddings, settings=self.ingest_settings())
+        
+        changed, unchanged, removed = manifest.diff(self.source_uri)
+        if store is None and unchanged and self.dedup_threshold is None:
+            print("Flat index is missing; rebuilding it.")
+            changed.update({source_uri: file_hash(source_uri) for source_uri in unchanged})
+            unchanged = []
+        
+        if self.dedup_threshold is not None:
+            # The index holds only surviving chunks; the split cache holds all of them
+            raw_chunks_by_source = self._split_with_cache(manifest, changed, unchanged)
+            unchanged = [source_uri for source_uri in unchanged if source_uri not in changed]
+        
+        print(
+            f"Ingest plan: {len(changed)} new/changed, "
+            f"{len(unchanged)} unchanged, {len(removed)} removed files"
+        )
+        
+        chunks_by_source: Dict[str, List[Document]] = {}
+        if self.dedup_threshold is not None:
+            chunks_by_source = self._deduplicate_by_source(raw_chunks_by_source)
+        else:
+            if store is not None:
+                for doc in store.docs:
+                    chunks_by_source.setdefault(str(Path(doc.metadata.get("source", ""))), []).append(doc)
+            previous_chunks = dict(chunks_by_source)
+            
+            for source_uri in changed:
+                chunks_by_source[source_uri] = []
+            if changed:
+                for doc in self.load_and_split(list(changed)):
+                    chunks_by_source.setdefault(str(Path(doc.metadata.get("source", ""))), []).append(doc)
+            # Failed files keep the chunks of their previous version, if any
+            for source_uri in self._drop_failed(changed):
+                chunks_by_source[source_uri] = previous_chunks.get(source_uri, [])
+                if chunks_by_source[source_uri]:
+                    unchanged.append(source_uri)
+        
+        split_docs = []
+        chunk_ids = []
+        for source_uri in self.source_uri:
+            key = str(Path(source_uri))
+            if key in changed or key in unchanged:
+                chunks = chunks_by_source.get(key, [])
+                split_docs.extend(chunks)
+                chunk_ids.extend(assign_chunk_ids(chunks))
+        
+        # Merged provenance can change without changing any chunk id
+        if split_docs and (
+            store is None or store.ids != chunk_ids
+            or [doc.metadata for doc in store.docs] != [doc.metadata for doc in split_docs]
+        ):
+            store = FlatVectorStore.build(
+                split_docs,
+                chunk_ids,
+                self.embeddings,
+                path=self.flat_index_path(),
+                dtype=self.vector_dtype,
+                settings=self.ingest_settings(),
+                batch_size=self.embed_batch_size,
+                reuse=store
+            )
+        
+        for source_uri in removed:
+            manifest.remove(source_uri)
+        for source_uri, digest in changed.items():
+            manifest.update(source_uri, digest, assign_chunk_ids(chunks_by_source.get(source_uri, [])))
+        manifest.save()
+        if self.dedup_threshold is not None:
+            self.split_cache().prune({source_uri: manifest.file_hash(source_uri) for source_uri in manifest.files})
+        
+        if store is not None:
+            self.attach_search_structures(store)
+        
+        self.vectorstore = store
+        return split_docs
+    
+    def split_cache(self) -> SplitCache:
+        """
+        Return the cache of pre-deduplication chunks stored next to the vector store.
+        
+        Returns:
+            Split cache in persist_directory/split_cache
+        """
+
+        return SplitCache(os.path.join(self.persist_directory, "split_cache"), self.ingest_settings())
+    
+    def _split_with_cache(self,
+                          manifest: IngestManifest,
+                          changed: Dict[str, str],
+                          unchanged: List[str]) -> Dict[str, List[Document]]:
+        # Chunks of unchanged files come from the split cache; files missing from it
+        # are moved to changed (in place) and parsed again
+        cache = self.split_cache()
+        chunks_by_source: Dict[str, List[Document]] = {}
+        for source_uri in unchanged:
+            chunks = cache.get(source_uri, manifest.file_hash(source_uri))
+            if chunks is None:
+                changed[source_uri] = file_hash(source_uri)
+            else:
+                chunks_by_source[source_uri] = chunks
+        
+        for source_uri in changed:
+            chunks_by_source[source_uri] = []
+        if changed:
+            for doc in self.load_and_split(list(changed)):
+                chunks_by_source.setdefault(str(Path(doc.metadata.get("source", ""))), []).append(doc)
+        
+        # Failed files keep the cached chunks of their previous version, if any
+        for source_uri in self._drop_failed(changed):
+            previous = cache.get(source_uri, manifest.file_hash(source_uri))
+            if previous is None:
+                del chunks_by_source[source_uri]
+            else:
+                chunks_by_source[source_uri] = previous
+                unchanged.append(source_uri)
+        
+        for source_uri, digest in changed.items():
+            cache.put(source_uri, digest, chunks_by_source[source_uri])
+        
+        return chunks_by_source
+    
+    def _drop_failed(self, changed: Dict[str, str]) -> List[str]:
+        # Files with a page range that failed to parse are taken out of this sync
+        # (in place), so they are not recorded as ingested and are retried next run
+        failed = [source_uri for source_uri in changed if source_uri in self.ingest_failures]
+        for source_uri in failed:
+            del changed[source_uri]
+            print(f"Not recording {source_uri} as ingested; it is retried on the next run")
+        return failed
+    
+    def _deduplicate_by_source(self, chunks_by_source: Dict[str, List[Document]]) -> Dict[str, List[Document]]:
+        chunks = [
+            chunk for source_uri in self.source_uri
+            for chunk in chunks_by_source.get(str(Path(source_uri)), [])
+        ]
+        
+        survivors: Dict[str, List[Document]] = {source_uri: [] for source_uri in chunks_by_source}
+        for doc in self.deduplicate(chunks):
+            survivors.setdefault(str(Path(doc.metadata.get("source", ""))), []).append(doc)
+        
+        return survivors
+    
+    def _update_metadata(self, vectorstore: Chroma, chunks: List[tuple]) -> None:
+        # Rewrite the metadata of kept chunks whose merged provenance changed
+        if not chunks:
+            return
+        
+        stored = vectorstore.get(ids=[chunk_id for chunk_id, _ in chunks], include=["metadatas"])
+        stored_metadata = dict(zip(stored["ids"], stored["metadatas"]))
+        stale = [(chunk_id, chunk) for chunk_id, chunk in chunks if stored_metadata.get(chunk_id) != chunk.metadata]
+        
+        for start in range(0, len(stale), self.embed_batch_size):
+            batch = stale[start:start + self.embed_batch_size]
+            vectorstore._collection.update(
+                ids=[chunk_id for chunk_id, _ in batch],
+                metadatas=[chunk.metadata for _, chunk in batch]
+            )
+    
+    def _add_chunks(self, vectorstore: Chroma, chunks: List[tuple]) -> None:
+        # Bounded batches keep embedding requests and memory use flat for large corpora
+        for start in range(0, len(chunks), self.embed_batch_size):
+            batch = chunks[start:start + self.embed_batch_size]
+            vectorstore.add_documents(
+                documents=[chunk for _, chunk in batch],
+                ids=[chunk_id for chunk_id, _ in batch]
+            )
+    
+    def _delete_chunks(self, vectorstore: Chroma, chunk_ids: List[str]) -> None:
+        for start in range(0, len(chunk_ids), self.embed_batch_size):
+            vectorstore.delete(ids=chunk_ids[start:start + self.embed_batch_size])
+    
+    def _get_chunks(self, vectorstore: Chroma, chunk_ids: List[str]) -> List[Document]:
+        if not chunk_ids:
+            return []
+        
+        result = vectorstore.get(ids=chunk_ids, include=["documents", "metadatas"])
+        by_id = {
+            chunk_id: Document(page_content=text, metadata=metadata or {})
+            for chunk_id, text, metadata in zip(result["ids"], result["documents"], result["metadatas"])
+        }
+        
+        return [by_id[chunk_id] for chunk_id in chunk_ids if chunk_id in by_id]
+    
+    def bytes_per_vector(self) -> Optional[int]:
+        """
+        Size of one stored vector of the current vector store.
+        
+        Returns:
+            Number of bytes, or None if the store is empty or not created yet
+        """
+
+        if isinstance(self.vectorstore, FlatVectorStore):
+            vectors = self.vectorstore.vectors
+            return int(vectors.shape[1] * vectors.itemsize) if vectors.ndim == 2 else None
+        
+        if isinstance(self.vectorstore, Chroma):
+            embeddings = self.vectorstore.get(limit=1, include=["embeddings"])["embeddings"]
+            # Chroma stores float32 vectors
+            return len(embeddings[0]) * 4 if len(embeddings) else None
+        
+        return None
+    
+    def initialize(self) -> "PDFRetrievalChain":
+        """
+        Initialize the retrieval chain.
+        
+        In incremental mode the persisted vector store is synced with the source
+        files instead of being rebuilt or reused as-is.
+        
+        Returns:
+            The initialized retrieval chain instance
+        """
+
+        if not (self.incremental and self.persist_directory):
+            return super().initialize()
+        
+        if self.vector_backend == "flat":
+            self.split_docs = self.sync_flat_vectorstore()
+        else:
+            self.split_docs = self.sync_vectorstore()
+        if not self.split_docs:
+            print("No documents were loaded.")
+            return self
+        
+        self.retrievers = self.build_retrievers(self.split_docs, self.vectorstore)
+        if self.dedup_report:
+            self.dedup_report.print_report(self.bytes_per_vector())
+        
+        print(f"Initialization complete: {len(self.split_docs)} chunks indexed")
+        return self
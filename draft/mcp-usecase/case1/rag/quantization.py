@@ -0,0 +1,375 @@
+from typing import List, Dict, Any, Optional, Tuple
+import json
+import os
+import time
+
+import numpy as np
+
+from rag.keyword_index import top_k_indices
+
+QUANTIZATION_TYPES = ("none", "int8", "pq")
+QUANT_META_FILE = "quant.json"
+CODES_FILE = "codes.npy"
+QUANTIZER_FILE = "quantizer.npz"
+DEFAULT_RERANK_FACTOR = 4
+
+# Rows encoded or scored per block
+_BLOCK_SIZE = 16384
+
+
+def cluster_sums(data: np.ndarray, assign: np.ndarray, n_clusters: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sum the vectors assigned to each cluster.
+
+    Args:
+        data: Vectors
+        assign: Cluster id of each vector
+        n_clusters: Number of clusters
+
+    Returns:
+        Tuple of (per-cluster sums, per-cluster counts)
+    """
+
+    counts = np.bincount(assign, minlength=n_clusters)
+    sums = np.zeros((n_clusters, data.shape[1]), dtype=np.float32)
+
+    # Sorting and reduceat is much faster than np.add.at for this
+    order = np.argsort(assign, kind="stable")
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    nonempty = counts > 0
+    sums[nonempty] = np.add.reduceat(data[order], starts[nonempty], axis=0)
+
+    return sums, counts
+
+
+def nearest_centroids(data: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """
+    Return the index of the closest (Euclidean) centroid of each vector.
+
+    Args:
+        data: Vectors
+        centroids: Centroids
+
+    Returns:
+        Centroid index per vector
+    """
+
+    # argmin ||x - c||^2 == argmax (x.c - ||c||^2 / 2); in-place ops avoid temporaries
+    scores = data @ centroids.T
+    scores -= 0.5 * (centroids ** 2).sum(axis=1)
+    return np.argmax(scores, axis=1)
+
+
+def kmeans(data: np.ndarray, n_clusters: int, iterations: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Euclidean k-means.
+
+    Args:
+        data: Training vectors
+        n_clusters: Number of centroids
+        iterations: Number of Lloyd iterations
+        rng: Random generator
+
+    Returns:
+        Centroids, one row per cluster
+    """
+
+    centroids = data[rng.choice(len(data), size=n_clusters, replace=False)].copy()
+
+    for _ in range(iterations):
+        assign = nearest_centroids(data, centroids)
+
+        sums, counts = cluster_sums(data, assign, n_clusters)
+
+        empty = counts == 0
+        centroids = sums / np.maximum(counts, 1)[:, None]
+        centroids[empty] = data[rng.choice(len(data), size=int(empty.sum()))]
+
+    return centroids
+
+
+class Int8Quantizer:
+    """
+    Symmetric per-dimension int8 scalar quantization (4x smaller than float32).
+
+    Each dimension is scaled by its largest absolute value, so a dot product
+    with a query is approximated by codes @ (query * scale).
+    """
+
+    def __init__(self, scale: np.ndarray, rerank_factor: int = DEFAULT_RERANK_FACTOR) -> None:
+        self.scale = scale
+        self.rerank_factor = rerank_factor
+
+    @property
+    def code_dtype(self) -> str:
+        return "int8"
+
+    def code_width(self, dim: int) -> int:
+        return dim
+
+    @classmethod
+    def train(cls,
+              vectors: np.ndarray,
+              sample_size: int = 100000,
+              seed: int = 0,
+              rerank_factor: int = DEFAULT_RERANK_FACTOR,
+              **kwargs: Any) -> "Int8Quantizer":
+        """
+        Learn the per-dimension scales.
+
+        Args:
+            vectors: Normalized vectors (may be a memmap)
+            sample_size: Maximum number of rows used for training
+            seed: Random seed
+            rerank_factor: Default candidates reranked per result
+
+        Returns:
+            The trained quantizer
+        """
+
+        rng = np.random.default_rng(seed)
+        rows = np.sort(rng.choice(len(vectors), size=min(sample_size, len(vectors)), replace=False))
+        sample = np.asarray(vectors[rows], dtype=np.float32)
+
+        scale = np.maximum(np.abs(sample).max(axis=0), 1e-12) / 127.0
+        return cls(scale.astype(np.float32), rerank_factor=rerank_factor)
+
+    def encode(self, block: np.ndarray) -> np.ndarray:
+        return np.clip(np.rint(block / self.scale), -127, 127).astype(np.int8)
+
+    def scorer(self, query: np.ndarray) -> Any:
+        weights = query * self.scale
+        return lambda codes: codes.astype(np.float32) @ weights
+
+    def save(self, path: str) -> None:
+        np.savez(os.path.join(path, QUANTIZER_FILE), scale=self.scale)
+
+    @classmethod
+    def load(cls, path: str, rerank_factor: int = DEFAULT_RERANK_FACTOR, **kwargs: Any) -> "Int8Quantizer":
+        with np.load(os.path.join(path, QUANTIZER_FILE)) as data:
+            return cls(data["scale"], rerank_factor=rerank_factor)
+
+
+class PQQuantizer:
+    """
+    Product quantization: each vector is split into m sub-vectors, and each
+    sub-vector is replaced by the id of its nearest of 256 learned centroids.
+
+    A vector costs m bytes (e.g. 96 bytes instead of 6 KB for a 1536-dim
+    float32 embedding with m=96). Queries are scored with per-subspace lookup
+    tables of query-centroid dot products.
+    """
+
+    def __init__(self, codebooks: np.ndarray, rerank_factor: int = DEFAULT_RERANK_FACTOR) -> None:
+        """
+        Initialize a product quantizer.
+
+        Args:
+            codebooks: Centroids of shape (m, n_centroids, dim / m)
+            rerank_factor: Default candidates reranked per result
+        """
+
+        self.codebooks = codebooks
+        self.rerank_factor = rerank_factor
+
+    @property
+    def code_dtype(self) -> str:
+        return "uint8"
+
+    def code_width(self, dim: int) -> int:
+        return len(self.codebooks)
+
+    @classmethod
+    def train(cls,
+              vectors: np.ndarray,
+              m: int = 96,
+              iterations: int = 10,
+              sample_size: int = 16384,
+              seed: int = 0,
+              rerank_factor: int = DEFAULT_RERANK_FACTOR,
+              **kwargs: Any) -> "PQQuantizer":
+        """
+        Learn one codebook per subspace.
+
+        Args:
+            vectors: Normalized vectors (may be a memmap)
+            m: Number of subspaces (bytes per vector); must divide the dimension
+            iterations: k-means iterations per subspace
+            sample_size: Maximum number of rows used for training
+            seed: Random seed
+            rerank_factor: Default candidates reranked per result
+
+        Returns:
+            The trained quantizer
+
+        Raises:
+            ValueError: If m does not divide the vector dimension
+        """
+
+        dim = vectors.shape[1]
+        if dim % m != 0:
+            raise ValueError(f"PQ subspaces m={m} must divide the embedding dimension {dim}.")
+
+        rng = np.random.default_rng(seed)
+        rows = np.sort(rng.choice(len(vectors), size=min(sample_size, len(vectors)), replace=False))
+        sample = np.asarray(vectors[rows], dtype=np.float32).reshape(len(rows), m, dim // m)
+        n_centroids = min(256, len(rows))
+
+        codebooks = np.stack([
+            kmeans(np.ascontiguousarray(sample[:, j]), n_centroids, iterations, rng) for j in range(m)
+        ]).astype(np.float32)
+
+        return cls(codebooks, rerank_factor=rerank_factor)
+
+    def encode(self, block: np.ndarray) -> np.ndarray:
+        m, _, dsub = self.codebooks.shape
+        sub = block.reshape(len(block), m, dsub).transpose(1, 0, 2).copy()
+        codes = np.empty((len(block), m), dtype=np.uint8)
+        for j in range(m):
+            codes[:, j] = nearest_centroids(sub[j], self.codebooks[j])
+        return codes
+
+    def scorer(self, query: np.ndarray) -> Any:
+        m, _, dsub = self.codebooks.shape
+        # tables[j, c] = dot product of query subspace j with centroid c
+        tables = np.einsum("jcd,jd->jc", self.codebooks, query.reshape(m, dsub))
+        subspaces = np.arange(m)
+        return lambda codes: tables[subspaces, codes].sum(axis=1)
+
+    def save(self, path: str) -> None:
+        np.savez(os.path.join(path, QUANTIZER_FILE), codebooks=self.codebooks)
+
+    @classmethod
+    def load(cls, path: str, rerank_factor: int = DEFAULT_RERANK_FACTOR, **kwargs: Any) -> "PQQuantizer":
+        with np.load(os.path.join(path, QUANTIZER_FILE)) as data:
+            return cls(data["codebooks"], rerank_factor=rerank_factor)
+
+
+class QuantizedCodes:
+    """
+    Compressed copy of a vector matrix used to shortlist candidates.
+
+    Candidates are shortlisted by scanning the codes, then reranked with exact
+    float dot products read from the full-precision memory map. Only the codes
+    and the reranked rows need to be resident in RAM.
+    """
+
+    def __init__(self, quantizer: Any, codes: np.ndarray) -> None:
+        self.quantizer = quantizer
+        self.codes = codes
+
+    def bytes_per_chunk(self) -> int:
+        return int(self.codes.shape[1] * self.codes.itemsize)
+
+    def search(self,
+               vectors: np.ndarray,
+               vector: List[float],
+               k: int,
+               rerank: Optional[int] = None,
+               **kwargs: Any) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find nearest rows by scanning codes and reranking with exact floats.
+
+        Args:
+            vectors: Full-precision normalized vectors
+            vector: Query embedding
+            k: Number of results to return
+            rerank: Candidates reranked per result (default: the quantizer's rerank_factor)
+
+        Returns:
+            Tuple of (row indices, cosine similarities), best first
+        """
+
+        query = np.asarray(vector, dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        n_candidates = k * (rerank or self.quantizer.rerank_factor)
+        score = self.quantizer.scorer(query)
+
+        best_rows = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float32)
+        for start in range(0, len(self.codes), _BLOCK_SIZE):
+            scores = score(np.asarray(self.codes[start:start + _BLOCK_SIZE]))
+            top = top_k_indices(scores, n_candidates)
+
+            best_rows = np.concatenate([best_rows, top + start])
+            best_scores = np.concatenate([best_scores, scores[top]])
+            if len(best_scores) > n_candidates:
+                keep = top_k_indices(best_scores, n_candidates)
+                best_rows, best_scores = best_rows[keep], best_scores[keep]
+
+        rows = np.sort(best_rows)
+        exact_scores = np.asarray(vectors[rows], dtype=np.float32) @ query
+
+        top = top_k_indices(exact_scores, k)
+        return rows[top], exact_scores[top]
+
+
+def load_or_build_quantized_codes(quantization: str,
+                                  vectors: np.ndarray,
+                                  path: Optional[str] = None,
+                                  params: Optional[Dict[str, Any]] = None) -> Tuple[Optional[QuantizedCodes], bool]:
+    """
+    Load the quantized codes persisted next to a vector matrix, or train and encode them.
+
+    Args:
+        quantization: "none", "int8" or "pq"
+        vectors: Normalized vectors
+        path: Directory of the vector matrix; codes are kept in memory only if omitted
+        params: Quantizer parameters (m for PQ; rerank_factor for both)
+
+    Returns:
+        Tuple of (codes or None for no quantization, whether they were built now)
+
+    Raises:
+        ValueError: If quantization is unknown
+    """
+
+    if quantization not in QUANTIZATION_TYPES:
+        raise ValueError(f"Unknown quantization: {quantization}. Expected one of {QUANTIZATION_TYPES}.")
+
+    if quantization == "none" or len(vectors) == 0:
+        return None, False
+
+    params = dict(params or {})
+    quantizer_cls = Int8Quantizer if quantization == "int8" else PQQuantizer
+    # rerank_factor only affects queries, so changing it does not force a rebuild
+    meta = {
+        "type": quantization,
+        "params": {key: value for key, value in params.items() if key != "rerank_factor"},
+        "count": len(vectors)
+    }
+
+    if path and os.path.exists(os.path.join(path, QUANT_META_FILE)):
+        try:
+            with open(os.path.join(path, QUANT_META_FILE), "r", encoding="utf-8") as f:
+                if json.load(f) == meta:
+                    quantizer = quantizer_cls.load(path, **params)
+                    codes = np.load(os.path.join(path, CODES_FILE), mmap_mode="r")
+                    return QuantizedCodes(quantizer, codes), False
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Could not load {quantization} codes from {path}: {e}")
+
+    started = time.perf_counter()
+    quantizer = quantizer_cls.train(vectors, **params)
+    shape = (len(vectors), quantizer.code_width(vectors.shape[1]))
+
+    if path:
+        codes = np.lib.format.open_memmap(
+            os.path.join(path, CODES_FILE), mode="w+", dtype=quantizer.code_dtype, shape=shape
+        )
+    else:
+        codes = np.empty(shape, dtype=quantizer.code_dtype)
+
+    for start in range(0, len(vectors), _BLOCK_SIZE):
+        codes[start:start + _BLOCK_SIZE] = quantizer.encode(
+            np.asarray(vectors[start:start + _BLOCK_SIZE], dtype=np.float32)
+        )
+
+    if path:
+        codes.flush()
+        quantizer.save(path)
+        with open(os.path.join(path, QUANT_META_FILE), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+    print(f"Built {quantization} codes for {len(vectors)} vectors in {time.perf_counter() - started:.1f}s")
+    return QuantizedCodes(quantizer, codes), True
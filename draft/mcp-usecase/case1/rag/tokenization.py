@@ -0,0 +1,233 @@
+from typing import List, Dict, Optional, Callable
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import os
+import sqlite3
+import threading
+
+# Tokenizing this many uncached texts or fewer is not worth starting a process pool
+_MIN_PARALLEL_TEXTS = 256
+
+# SQLite limits the number of bound parameters per statement
+_SQL_BATCH_SIZE = 500
+
+_TOKEN_SEPARATOR = "\x1f"
+
+
+class WhitespaceTokenizer:
+    """
+    Splits text on whitespace (the BM25Retriever default).
+    """
+
+    name = "whitespace"
+
+    def __call__(self, text: str) -> List[str]:
+        return text.split()
+
+
+class KiwiTokenizer:
+    """
+    Korean morphological tokenizer based on Kiwi (kiwipiepy).
+
+    Splits text into morphemes, so that particles and endings attached to a
+    noun (e.g. "병역판정검사를", "병역판정검사에서") produce the same index terms.
+    Punctuation and symbol tokens are dropped.
+    """
+
+    name = "kiwi"
+
+    # Sentence punctuation, brackets and other symbols carry no search signal
+    SKIP_TAGS = frozenset({"SF", "SP", "SS", "SSO", "SSC", "SE", "SO", "SW", "SB"})
+
+    def __init__(self) -> None:
+        self._kiwi = None
+        self._lock = threading.Lock()
+
+    def _get_kiwi(self):
+        if self._kiwi is None:
+            with self._lock:
+                if self._kiwi is None:
+                    try:
+                        from kiwipiepy import Kiwi
+                    except ImportError as e:
+                        raise ImportError(
+                            "The kiwi tokenizer requires kiwipiepy. Install it with `pip install kiwipiepy`."
+                        ) from e
+                    self._kiwi = Kiwi()
+        return self._kiwi
+
+    def __call__(self, text: str) -> List[str]:
+        return [
+            token.form
+            for token in self._get_kiwi().tokenize(text)
+            if token.tag not in self.SKIP_TAGS
+        ]
+
+
+TOKENIZERS: Dict[str, Callable[[], Callable[[str], List[str]]]] = {
+    "whitespace": WhitespaceTokenizer,
+    "kiwi": KiwiTokenizer,
+}
+
+_instances: Dict[str, Callable[[str], List[str]]] = {}
+
+
+def get_tokenizer(name: str) -> Callable[[str], List[str]]:
+    """
+    Return the process-wide tokenizer registered under name.
+
+    Args:
+        name: Tokenizer name ("whitespace" or "kiwi")
+
+    Returns:
+        A tokenizer with a `name` attribute
+
+    Raises:
+        ValueError: If no tokenizer is registered under name
+    """
+
+    if name not in TOKENIZERS:
+        raise ValueError(f"Unknown tokenizer: {name}. Expected one of {tuple(TOKENIZERS)}.")
+
+    if name not in _instances:
+        _instances[name] = TOKENIZERS[name]()
+    return _instances[name]
+
+
+class TokenCache:
+    """
+    On-disk cache of token streams keyed by tokenizer name and chunk text.
+
+    Lets the keyword index be rebuilt without re-running morphological analysis
+    on chunks that were already tokenized at ingest.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Open (or create) a token cache.
+
+        Args:
+            path: SQLite database file
+        """
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tokens (key TEXT PRIMARY KEY, tokens TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(tokenizer_name: str, text: str) -> str:
+        return hashlib.sha256(f"{tokenizer_name}\x00{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[str]]:
+        """
+        Look up cached token streams.
+
+        Args:
+            keys: Cache keys
+
+        Returns:
+            Mapping of found keys to their tokens
+        """
+
+        found: Dict[str, List[str]] = {}
+        unique_keys = list(dict.fromkeys(keys))
+
+        with self._lock:
+            for start in range(0, len(unique_keys), _SQL_BATCH_SIZE):
+                batch = unique_keys[start:start + _SQL_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, tokens FROM tokens WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, tokens in rows:
+                    found[key] = tokens.split(_TOKEN_SEPARATOR) if tokens else []
+
+        return found
+
+    def put_many(self, items: Dict[str, List[str]]) -> None:
+        """
+        Store token streams.
+
+        Args:
+            items: Mapping of cache keys to tokens
+        """
+
+        if not items:
+            return
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO tokens (key, tokens) VALUES (?, ?)",
+                [(key, _TOKEN_SEPARATOR.join(tokens)) for key, tokens in items.items()]
+            )
+            self._conn.commit()
+
+
+def _tokenize_batch(tokenizer_name: str, texts: List[str]) -> List[List[str]]:
+    # Runs in a worker process; each process builds its own tokenizer once
+    tokenizer = get_tokenizer(tokenizer_name)
+    return [tokenizer(text) for text in texts]
+
+
+def tokenize_texts(texts: List[str],
+                   tokenizer_name: str,
+                   cache: Optional[TokenCache] = None,
+                   workers: Optional[int] = None,
+                   batch_size: int = 64) -> List[List[str]]:
+    """
+    Tokenize texts, reusing cached token streams and parallelizing the rest.
+
+    Uncached texts are tokenized in a process pool when there are enough of
+    them to amortize the pool start-up; otherwise they are tokenized inline.
+
+    Args:
+        texts: Texts to tokenize
+        tokenizer_name: Registered tokenizer name
+        cache: Token cache (optional)
+        workers: Number of worker processes (default: CPU count; 1 disables the pool)
+        batch_size: Number of texts sent to a worker at a time
+
+    Returns:
+        One token list per text
+    """
+
+    keys = [TokenCache.make_key(tokenizer_name, text) for text in texts]
+    found = cache.get_many(keys) if cache is not None else {}
+
+    missing: Dict[str, str] = {}
+    for key, text in zip(keys, texts):
+        if key not in found and key not in missing:
+            missing[key] = text
+
+    if missing:
+        missing_keys = list(missing.keys())
+        missing_texts = list(missing.values())
+        workers = workers or os.cpu_count() or 1
+
+        if workers > 1 and len(missing_texts) > _MIN_PARALLEL_TEXTS:
+            batches = [
+                missing_texts[start:start + batch_size]
+                for start in range(0, len(missing_texts), batch_size)
+            ]
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                token_lists = [
+                    tokens
+                    for batch_tokens in executor.map(_tokenize_batch, [tokenizer_name] * len(batches), batches)
+                    for tokens in batch_tokens
+                ]
+        else:
+            token_lists = _tokenize_batch(tokenizer_name, missing_texts)
+
+        computed = dict(zip(missing_keys, token_lists))
+        if cache is not None:
+            cache.put_many(computed)
+        found.update(computed)
+
+    return [found[key] for key in keys]
@@ -0,0 +1,344 @@
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence, Tuple
+import asyncio
+import bisect
+import random
+import threading
+import time
+
+import httpx
+
+# Upper bounds (seconds) of the latency histogram buckets
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Retried upstream statuses; other errors are returned immediately
+RETRY_STATUS_CODES = (429, 502, 503, 504)
+
+
+class DifyAPIError(Exception):
+    """Non-success response from the Dify API."""
+
+    def __init__(self, status_code: int, message: str) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class DeadlineExceeded(Exception):
+    """The request did not complete, retries included, within its deadline."""
+
+
+class LatencyHistogram:
+    """
+    Thread-safe latency histogram with fixed buckets.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            self.count += 1
+            self.total += seconds
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Return the upper bound of the bucket holding the q-quantile (None past the last bucket)."""
+
+        with self._lock:
+            if not self.count:
+                return 0.0
+            rank, seen = q * self.count, 0
+            for bound, count in zip(self.buckets, self.counts):
+                seen += count
+                if seen >= rank:
+                    return bound
+            return None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the count, sum, mean, estimated percentiles and cumulative buckets."""
+
+        quantiles = {f"p{int(q * 100)}": self.quantile(q) for q in (0.5, 0.95, 0.99)}
+        with self._lock:
+            cumulative, buckets = 0, {}
+            for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+                cumulative += count
+                buckets[f"le_{bound}"] = cumulative
+            return {
+                "count": self.count,
+                "sum": round(self.total, 6),
+                "mean": round(self.total / self.count, 6) if self.count else 0.0,
+                **quantiles,
+                "buckets": buckets
+            }
+
+
+class TTLCache:
+    """
+    Small LRU cache whose entries expire ttl seconds after being stored.
+    """
+
+    def __init__(self, ttl: float, max_size: int = 256) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Tuple, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "ttl": self.ttl,
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0
+            }
+
+
+class DifyKnowledgeClient:
+    """
+    Process-wide client for the Dify External Knowledge retrieval API.
+
+    One pooled httpx.AsyncClient is shared by all tool calls, so searches
+    reuse keep-alive (optionally HTTP/2) connections instead of paying TCP
+    and TLS setup every time. Connection errors, timeouts and 429/5xx
+    responses are retried with full-jitter exponential backoff until the
+    per-request deadline, and successful responses can be cached for a short
+    TTL. Upstream attempts and end-to-end searches are recorded in latency
+    histograms.
+    """
+
+    def __init__(self,
+                 endpoint: str,
+                 api_key: str,
+                 max_connections: int = 20,
+                 max_keepalive_connections: int = 10,
+                 keepalive_expiry: float = 30.0,
+                 http2: bool = False,
+                 retries: int = 2,
+                 backoff_base: float = 0.2,
+                 backoff_max: float = 2.0,
+                 deadline: float = 30.0,
+                 cache_ttl: float = 0.0,
+                 cache_size: int = 256) -> None:
+        """
+        Configure the client; the connection pool is opened on first use.
+
+        Args:
+            endpoint: Retrieval API URL
+            api_key: Bearer token of the API
+            max_connections: Maximum number of open connections
+            max_keepalive_connections: Maximum number of idle connections kept open
+            keepalive_expiry: Seconds an idle connection is kept open
+            http2: Use HTTP/2 (requires the h2 package)
+            retries: Maximum number of retries per request
+            backoff_base: Backoff before the first retry, doubled for every retry
+            backoff_max: Maximum backoff between retries
+            deadline: Seconds a request may take, retries included
+            cache_ttl: Seconds a response is cached (0 disables the cache)
+            cache_size: Maximum number of cached responses
+
+        Raises:
+            ImportError: If http2 is requested but h2 is not installed
+        """
+
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                raise ImportError("h2 is required for HTTP/2. Install it with: pip install 'httpx[http2]'")
+
+        self.endpoint = endpoint
+        self.api_key = api_key
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.http2 = http2
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.deadline = deadline
+        self.cache = TTLCache(cache_ttl, cache_size) if cache_ttl > 0 else None
+        self.retried = 0
+        self.failures = 0
+
+        self.upstream_latency = LatencyHistogram()
+        self.search_latency: Dict[str, LatencyHistogram] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created lazily, inside the server's event loop
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                headers={
+                    "Content-Type": "application/json",
+                    "Authorization": f"Bearer {self.api_key}"
+                },
+                limits=self.limits,
+                http2=self.http2,
+                timeout=httpx.Timeout(self.deadline)
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def _post(self, payload: Dict[str, Any], deadline: float) -> httpx.Response:
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise DeadlineExceeded(f"Deadline of {self.deadline:g}s exceeded")
+
+            started = time.monotonic()
+            try:
+                response = await self.client.post(
+                    self.endpoint,
+                    json=payload,
+                    timeout=httpx.Timeout(remaining)
+                )
+            except httpx.TransportError:
+                self.upstream_latency.observe(time.monotonic() - started)
+                if attempt >= self.retries:
+                    raise
+            else:
+                self.upstream_latency.observe(time.monotonic() - started)
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= self.retries:
+                    return response
+
+            # Give up early rather than sleep past the deadline
+            backoff = self._backoff(attempt)
+            if time.monotonic() + backoff >= deadline:
+                raise DeadlineExceeded(f"Deadline of {self.deadline:g}s exceeded after {attempt + 1} attempts")
+            self.retried += 1
+            attempt += 1
+            await asyncio.sleep(backoff)
+
+    async def search(self,
+                     knowledge_id: str,
+                     query: str,
+                     search_method: str,
+                     top_k: int,
+                     score_threshold: float) -> Dict[str, Any]:
+        """
+        Retrieve records from the knowledge base.
+
+        Args:
+            knowledge_id: Knowledge base ID
+            query: Search query
+            search_method: semantic_search, keyword_search or hybrid_search
+            top_k: Maximum number of records
+            score_threshold: Minimum relevance score
+
+        Returns:
+            Parsed API response
+
+        Raises:
+            DifyAPIError: If the API returns a non-200 status
+            DeadlineExceeded: If the deadline passes before a response
+            httpx.RequestError: If the last attempt fails to connect or times out
+            json.JSONDecodeError: If the response is not JSON
+        """
+
+        started = time.monotonic()
+        key = (knowledge_id, query, search_method, top_k, score_threshold)
+        if self.cache is not None:
+            data = self.cache.get(key)
+            if data is not None:
+                self._observe_search(search_method, started)
+                return data
+
+        payload = {
+            "knowledge_id": knowledge_id,
+            "query": query,
+            "search_method": search_method,
+            "retrieval_setting": {
+                "top_k": top_k,
+                "score_threshold": score_threshold
+            }
+        }
+
+        try:
+            response = await self._post(payload, started + self.deadline)
+            if response.status_code != 200:
+                raise DifyAPIError(response.status_code, self._error_message(response))
+            data = response.json()
+        except Exception:
+            self.failures += 1
+            raise
+        finally:
+            self._observe_search(search_method, started)
+
+        if self.cache is not None:
+            self.cache.put(key, data)
+        return data
+
+    def _observe_search(self, search_method: str, started: float) -> None:
+        histogram = self.search_latency.get(search_method)
+        if histogram is None:
+            histogram = self.search_latency.setdefault(search_method, LatencyHistogram())
+        histogram.observe(time.monotonic() - started)
+
+    @staticmethod
+    def _error_message(response: httpx.Response) -> str:
+        error_message = f"Dify API error: HTTP {response.status_code}"
+        try:
+            error_detail = response.json()
+            if isinstance(error_detail, dict) and "error_msg" in error_detail:
+                error_message += f" - {error_detail['error_msg']}"
+        except ValueError:
+            error_message += f" - {response.text[:100]}"
+        return error_message
+
+    def stats(self) -> Dict[str, Any]:
+        """Return pool settings, retry/failure counters, cache stats and latency histograms."""
+
+        return {
+            "endpoint": self.endpoint,
+            "pool": {
+                "max_connections": self.limits.max_connections,
+                "max_keepalive_connections": self.limits.max_keepalive_connections,
+                "keepalive_expiry": self.limits.keepalive_expiry,
+                "http2": self.http2
+            },
+            "deadline": self.deadline,
+            "retries": self.retried,
+            "failures": self.failures,
+            "cache": self.cache.stats() if self.cache is not None else None,
+            "latency_seconds": {
+                "upstream": self.upstream_latency.snapshot(),
+                "search": {method: h.snapshot() for method, h in sorted(self.search_latency.items())}
+            }
+        }
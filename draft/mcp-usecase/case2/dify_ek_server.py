@@ -1,5 +1,8 @@
+import hashlib
 import logging
 import os
+import re
+import threading
 import time
 from typing import Annotated, Any, Dict, List, Optional, TypedDict
 from pathlib import Path
@@ -7,18 +10,23 @@ from pathlib import Path
 import uvicorn
 from dotenv import load_dotenv
 from fastapi import Depends, FastAPI, HTTPException, Header
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import APIKeyHeader
 from pydantic import BaseModel
 
-from langchain.retrievers.ensemble import EnsembleRetriever
 from langchain_chroma import Chroma
-from langchain_community.retrievers import BM25Retriever
 from langchain_community.document_loaders import PDFPlumberLoader
 from langchain_core.documents import Document
 from langchain_openai import OpenAIEmbeddings
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langgraph.graph import END, START, StateGraph
 
+from embedding_batcher import CoalescingEmbeddings
+from embedding_cache import CachedEmbeddings
+from hybrid import DEFAULT_SATURATION_K, HybridRetriever, HybridSearcher, normalize_saturating
+from keyword_index import KeywordRetriever, load_or_build_index
+from rerank import Reranker, create_reranker
+
 load_dotenv()
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -38,6 +46,34 @@ CHROMA_DB_DIR = BASE_DIR / "chroma_db"
 PDF_FILES = list(DATA_DIR.glob("*.pdf"))
 PDF_PATH = PDF_FILES[0] if PDF_FILES else DATA_DIR / "sample.pdf"
 
+# Knowledge bases served, all built at startup; requests for other ids get a 404
+WARMUP_KNOWLEDGE_IDS = [
+    knowledge_id.strip()
+    for knowledge_id in os.getenv("DIFY_KNOWLEDGE_ID", "test-knowledge-base").split(",")
+    if knowledge_id.strip()
+]
+
+# Knowledge ids used as-is in index directory names; other ids are hashed
+SAFE_KNOWLEDGE_ID = re.compile(r"^[A-Za-z0-9_-]+$")
+
+# Retrievers are built once, so they fetch the largest top_k a client may request
+INDEX_TOP_K = 20
+
+# Concurrent /retrieval queries wait up to this long to share one embedding request
+QUERY_BATCH_WAIT_MS = float(os.getenv("QUERY_BATCH_WAIT_MS", "5"))
+QUERY_BATCH_SIZE = int(os.getenv("QUERY_BATCH_SIZE", "64"))
+
+# Rerank stage ("none", "cross-encoder" or "flashrank"); when enabled, RERANK_CANDIDATES
+# results are retrieved and the best top_k by reranker score are returned
+RERANKER = os.getenv("RERANKER", "none")
+RERANKER_MODEL = os.getenv("RERANKER_MODEL") or None
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))
+
+# BM25 score reported as 0.5 by keyword_search/full_text_search and by the keyword half
+# of hybrid_search; scores are mapped with s / (s + k), so score_threshold means the
+# same for every query
+KEYWORD_SCORE_K = float(os.getenv("KEYWORD_SCORE_K", str(DEFAULT_SATURATION_K)))
+
 app = FastAPI(title="Dify External Knowledge API - LangGraph Version")
 
 
@@ -68,6 +104,83 @@ class KnowledgeState(TypedDict):
     hybrid_retriever: Annotated[Optional[Any], "Hybrid search retriever"]
 
 
+_embedding = None
+_embedding_lock = threading.Lock()
+
+
+def get_embedding() -> CachedEmbeddings:
+    """
+    Returns the embedding model shared by all knowledge indexes.
+
+    Query embeddings that miss the cache go through one micro-batcher, so
+    concurrent requests (to any knowledge base) share embedding API calls
+    and identical in-flight queries are embedded once.
+
+    Returns:
+        Cached, query-batching embedding model
+
+    """
+
+    global _embedding
+    with _embedding_lock:
+        if _embedding is None:
+            _embedding = CachedEmbeddings(
+                CoalescingEmbeddings(
+                    OpenAIEmbeddings(model='text-embedding-3-small'),
+                    max_batch_size=QUERY_BATCH_SIZE,
+                    max_wait_ms=QUERY_BATCH_WAIT_MS
+                ),
+                model_name='text-embedding-3-small'
+            )
+        return _embedding
+
+
+def keyword_index_path(knowledge_id: str) -> Path:
+    """
+    Returns the keyword index directory of a knowledge base.
+
+    The id is only used as the directory name if it cannot leave the index
+    root (e.g. "../x"), since saving the index removes the directory first.
+
+    Args:
+        knowledge_id: ID of the knowledge base
+
+    Returns:
+        Directory below CHROMA_DB_DIR / "keyword_index"
+
+    """
+
+    if SAFE_KNOWLEDGE_ID.match(knowledge_id):
+        name = knowledge_id
+    else:
+        name = "id-" + hashlib.sha256(knowledge_id.encode("utf-8")).hexdigest()[:32]
+
+    return CHROMA_DB_DIR / "keyword_index" / name
+
+
+_reranker = None
+_reranker_lock = threading.Lock()
+
+
+def get_reranker() -> Optional[Reranker]:
+    """
+    Returns the rerank stage shared by all requests, loading the model on first use.
+
+    Returns:
+        Reranker, or None if RERANKER is "none"
+
+    """
+
+    global _reranker
+    if RERANKER == "none":
+        return None
+
+    with _reranker_lock:
+        if _reranker is None:
+            _reranker = create_reranker(RERANKER, model_name=RERANKER_MODEL, candidates=RERANK_CANDIDATES)
+        return _reranker
+
+
 ###### STEP 2. Node Definition ######
 
 class DocumentProcessor:
@@ -96,7 +209,7 @@ class DocumentProcessor:
         os.makedirs(CHROMA_DB_DIR, exist_ok=True)
         
         try:
-            embedding = OpenAIEmbeddings(model='text-embedding-3-small')
+            embedding = get_embedding()
             chroma_exists = (CHROMA_DB_DIR / "chroma.sqlite3").exists()
             
             if chroma_exists:
@@ -117,10 +230,15 @@ class DocumentProcessor:
                     logger.warning(f"Failed to load existing vector store: {str(e)}. Creating a new one.")
                     chroma_exists = False
                     
-                    if CHROMA_DB_DIR.exists():
-                        backup_dir = f"{CHROMA_DB_DIR}_backup_{int(time.time())}"
-                        os.rename(CHROMA_DB_DIR, backup_dir)
-                        os.makedirs(CHROMA_DB_DIR, exist_ok=True)
+                    # Only this knowledge base's collection is dropped: the directory is
+                    # shared with the other cached indexes and their keyword indexes
+                    try:
+                        Chroma(
+                            collection_name=self.knowledge_id,
+                            persist_directory=str(CHROMA_DB_DIR)
+                        ).delete_collection()
+                    except Exception as delete_error:
+                        logger.warning(f"Could not drop collection '{self.knowledge_id}': {str(delete_error)}")
                     
             if not chroma_exists:
                 loader = PDFPlumberLoader(str(PDF_PATH))
@@ -182,6 +300,9 @@ class RetrieverSetup:
     
     """
 
+    def __init__(self, knowledge_id="test-knowledge-base"):
+        self.knowledge_id = knowledge_id
+
     def __call__(self, state: KnowledgeState) -> KnowledgeState:
         """
         Configure retrievers.
@@ -229,13 +350,26 @@ class RetrieverSetup:
                     for text, meta in zip(docs, metadatas)
                 ]
                 
-                keyword_retriever = BM25Retriever.from_documents(doc_objects)
-                keyword_retriever.k = top_k
+                # BM25 index is persisted next to ChromaDB and reused while the chunks are unchanged
+                keyword_index = load_or_build_index(
+                    doc_objects,
+                    path=str(keyword_index_path(self.knowledge_id))
+                )
+                keyword_retriever = KeywordRetriever(index=keyword_index, k=top_k)
                 state["keyword_retriever"] = keyword_retriever
                 
-                hybrid_retriever = EnsembleRetriever(
-                    retrievers=[keyword_retriever, semantic_retriever],
-                    weights=[0.5, 0.5]
+                # Dense and keyword searches run concurrently; blend fusion combines their
+                # relevance scores, so Dify's score_threshold prunes weak matches (RRF scores
+                # would depend on ranks only)
+                hybrid_retriever = HybridRetriever(
+                    searcher=HybridSearcher(
+                        vectorstore=vector_db,
+                        keyword_index=keyword_index,
+                        weights=(0.5, 0.5),
+                        method="blend",
+                        saturation_k=KEYWORD_SCORE_K
+                    ),
+                    k=top_k
                 )
                 state["hybrid_retriever"] = hybrid_retriever
                 
@@ -257,6 +391,38 @@ class PerformRetrieval:
 
     """
 
+    @staticmethod
+    def search_with_scores(retriever: Any, query: str, top_k: int, score_threshold: float) -> List[Any]:
+        """
+        Run a search and return (document, score) pairs with scores in [0, 1].
+
+        Args:
+            retriever: Keyword, semantic or hybrid retriever
+            query: User's search query
+            top_k: Maximum number of results to return
+            score_threshold: Minimum relevance score for inclusion
+
+        Returns:
+            List of (document, score) pairs, best first
+
+        Raises:
+            TypeError: If the retriever does not report relevance scores
+
+        """
+
+        if isinstance(retriever, HybridRetriever):
+            return retriever.search_with_scores(query, top_k, score_threshold)
+
+        if isinstance(retriever, KeywordRetriever):
+            # BM25 scores are unbounded; a fixed mapping keeps weak best matches below the threshold
+            scored = normalize_saturating(retriever.search_with_scores(query, top_k), KEYWORD_SCORE_K)
+        elif hasattr(retriever, "vectorstore"):
+            scored = retriever.vectorstore.similarity_search_with_relevance_scores(query, k=top_k)
+        else:
+            raise TypeError(f"{type(retriever).__name__} does not report relevance scores.")
+
+        return [(doc, score) for doc, score in scored if score >= score_threshold]
+
     def __call__(self, state: KnowledgeState) -> KnowledgeState:
         """
         Execute retrieval process.
@@ -297,17 +463,21 @@ class PerformRetrieval:
             logger.warning(f"Could not find {search_method} retriever, using hybrid retriever instead.")
         
         try:
-            docs = retriever.get_relevant_documents(query)  
-            docs = docs[:top_k]
+            reranker = get_reranker()
+            if reranker is None:
+                scored_docs = self.search_with_scores(retriever, query, top_k, score_threshold)
+            else:
+                # A deeper candidate set is fetched only for reranking; the threshold applies to rerank scores
+                candidates = self.search_with_scores(retriever, query, reranker.fetch_k(top_k), 0.0)
+                scored_docs = reranker.rerank(query, [doc for doc, _ in candidates], top_k, score_threshold)
             
             results = []
-            for i, doc in enumerate(docs):
+            for doc, score in scored_docs:
                 metadata = doc.metadata.copy() if hasattr(doc, 'metadata') and doc.metadata else {}
-                score = max(0.95 - (i * 0.1), score_threshold)
                 
                 results.append({
                     "metadata": metadata,
-                    "score": score,
+                    "score": float(score),
                     "title": doc.metadata.get("Title", doc.metadata.get("title", "Document chunk")),
                     "content": doc.page_content
                 })
@@ -343,11 +513,167 @@ class PerformRetrieval:
         return state
 
 
-###### STEP 3. Graph Creation and Compilation ######
+###### STEP 3. Knowledge Index Service ######
+
+class KnowledgeIndex:
+    """
+    Vector store and retrievers built for a single knowledge base.
+
+    """
+
+    def __init__(self, knowledge_id: str, state: KnowledgeState):
+        self.knowledge_id = knowledge_id
+        self.vector_db = state["vector_db"]
+        self.semantic_retriever = state["semantic_retriever"]
+        self.keyword_retriever = state["keyword_retriever"]
+        self.hybrid_retriever = state["hybrid_retriever"]
+        self.built_at = time.time()
+
+    def to_state(self) -> Dict[str, Any]:
+        """Returns the index fields in the shape expected by KnowledgeState."""
+
+        return {
+            "vector_db": self.vector_db,
+            "semantic_retriever": self.semantic_retriever,
+            "keyword_retriever": self.keyword_retriever,
+            "hybrid_retriever": self.hybrid_retriever
+        }
+
+
+class UnknownKnowledgeError(KeyError):
+    """The knowledge_id is not one of the configured knowledge bases."""
+
+
+class KnowledgeIndexService:
+    """
+    Long-lived registry of knowledge indexes keyed by knowledge_id.
+
+    Each index runs DocumentProcessor and RetrieverSetup once; later requests
+    reuse the cached retrievers until the index is reloaded or invalidated.
+    Only the configured knowledge ids are built, so clients cannot grow the
+    cache (and the Chroma directory) with arbitrary ids.
+
+    """
+
+    def __init__(self, knowledge_ids: List[str]):
+        self.knowledge_ids = set(knowledge_ids)
+        self._indexes: Dict[str, KnowledgeIndex] = {}
+        self._lock = threading.Lock()
+        self._build_locks: Dict[str, threading.Lock] = {}
+
+    def _build_lock(self, knowledge_id: str) -> threading.Lock:
+        with self._lock:
+            return self._build_locks.setdefault(knowledge_id, threading.Lock())
+
+    def _build(self, knowledge_id: str) -> KnowledgeIndex:
+        if knowledge_id not in self.knowledge_ids:
+            raise UnknownKnowledgeError(knowledge_id)
+
+        logger.info(f"Building knowledge index: {knowledge_id}")
+        started = time.time()
+
+        state = KnowledgeState(
+            query="",
+            search_method="hybrid_search",
+            top_k=INDEX_TOP_K,
+            score_threshold=0.0,
+            results=[],
+            vector_db=None,
+            semantic_retriever=None,
+            keyword_retriever=None,
+            hybrid_retriever=None
+        )
+        state = DocumentProcessor(knowledge_id=knowledge_id)(state)
+        state = RetrieverSetup(knowledge_id=knowledge_id)(state)
+
+        logger.info(f"Knowledge index ready: {knowledge_id} ({time.time() - started:.2f}s)")
+        return KnowledgeIndex(knowledge_id, state)
+
+    def get(self, knowledge_id: str) -> KnowledgeIndex:
+        """
+        Returns the index for knowledge_id, building it on first use.
+
+        Args:
+            knowledge_id: ID of the knowledge base
+
+        Returns:
+            Cached knowledge index
+
+        Raises:
+            UnknownKnowledgeError: If knowledge_id is not configured
+
+        """
+
+        index = self._indexes.get(knowledge_id)
+        if index is not None:
+            return index
+
+        with self._build_lock(knowledge_id):
+            index = self._indexes.get(knowledge_id)
+            if index is None:
+                index = self._build(knowledge_id)
+                self._indexes[knowledge_id] = index
+
+        return index
+
+    def reload(self, knowledge_id: str) -> KnowledgeIndex:
+        """
+        Rebuilds the index for knowledge_id and swaps it in.
+
+        Requests keep using the previous index until the rebuild finishes.
+
+        Args:
+            knowledge_id: ID of the knowledge base
+
+        Returns:
+            Newly built knowledge index
+
+        Raises:
+            UnknownKnowledgeError: If knowledge_id is not configured
+
+        """
+
+        with self._build_lock(knowledge_id):
+            index = self._build(knowledge_id)
+            self._indexes[knowledge_id] = index
+
+        return index
+
+    def invalidate(self, knowledge_id: str) -> bool:
+        """
+        Drops the cached index so that the next request rebuilds it.
+
+        Args:
+            knowledge_id: ID of the knowledge base
+
+        Returns:
+            True if an index was cached for knowledge_id
+
+        """
+
+        with self._build_lock(knowledge_id):
+            return self._indexes.pop(knowledge_id, None) is not None
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """Returns build information for every cached index."""
+
+        return {
+            knowledge_id: {"built_at": index.built_at}
+            for knowledge_id, index in list(self._indexes.items())
+        }
+
+
+index_service = KnowledgeIndexService(WARMUP_KNOWLEDGE_IDS)
+
+
+###### STEP 4. Graph Creation and Compilation ######
 
 def create_knowledge_graph():
     """
     Creates a LangGraph-based knowledge retrieval graph.
+
+    Document processing and retriever setup are handled by the index service,
+    so the graph only runs the retrieval step on the request path.
     
     Returns:
         Compiled graph instance
@@ -356,19 +682,15 @@ def create_knowledge_graph():
     
     graph_builder = StateGraph(KnowledgeState)
     
-    graph_builder.add_node("document_processor", DocumentProcessor())
-    graph_builder.add_node("retriever_setup", RetrieverSetup())
     graph_builder.add_node("perform_retrieval", PerformRetrieval())
     
-    graph_builder.add_edge(START, "document_processor")
-    graph_builder.add_edge("document_processor", "retriever_setup")
-    graph_builder.add_edge("retriever_setup", "perform_retrieval")
+    graph_builder.add_edge(START, "perform_retrieval")
     graph_builder.add_edge("perform_retrieval", END)
     
     return graph_builder.compile()
 
 
-###### STEP 4. Graph Instance Creation ######
+###### STEP 5. Graph Instance Creation ######
 
 try:
     knowledge_graph = create_knowledge_graph()
@@ -379,7 +701,7 @@ except Exception as e:
     knowledge_graph = None
 
 
-###### STEP 5. API Request and Response Class Definition ######
+###### STEP 6. API Request and Response Class Definition ######
 
 class RetrievalSetting(BaseModel):
     """Retrieval settings model"""
@@ -397,7 +719,7 @@ class ExternalKnowledgeRequest(BaseModel):
     retrieval_setting: Annotated[RetrievalSetting, "Retrieval settings"]
 
 
-###### STEP 6. API Key Validation Function ######
+###### STEP 7. API Key Validation Function ######
 
 async def verify_api_key(authorization: str = Header(...)):
     """API key validation function"""
@@ -429,7 +751,37 @@ async def verify_api_key(authorization: str = Header(...)):
     return token
 
 
-###### STEP 7. API Endpoint Definition ######
+def require_known_knowledge_id(knowledge_id: str) -> None:
+    """Rejects knowledge ids that are not configured on this server"""
+
+    if knowledge_id not in index_service.knowledge_ids:
+        logger.warning(f"Unknown knowledge_id requested: {knowledge_id!r}")
+
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "error_code": 2001,
+                "error_msg": "The knowledge does not exist"
+            }
+        )
+
+
+###### STEP 8. API Endpoint Definition ######
+
+@app.on_event("startup")
+async def warm_up_indexes():
+    """Builds the configured knowledge indexes before serving requests"""
+
+    for knowledge_id in WARMUP_KNOWLEDGE_IDS:
+        try:
+            await run_in_threadpool(index_service.get, knowledge_id)
+        except Exception as e:
+            logger.error(f"Failed to warm up knowledge index '{knowledge_id}': {str(e)}")
+
+    try:
+        await run_in_threadpool(get_reranker)
+    except Exception as e:
+        logger.error(f"Failed to load reranker '{RERANKER}': {str(e)}")
 
 @app.post("/retrieval")
 async def retrieve_knowledge(
@@ -444,20 +796,21 @@ async def retrieve_knowledge(
 
         raise HTTPException(status_code=500, detail="Knowledge graph is not initialized")
     
-    initial_state = KnowledgeState(
-        query=request.query,
-        search_method=request.search_method,
-        top_k=request.retrieval_setting.top_k,
-        score_threshold=request.retrieval_setting.score_threshold,
-        results=[],
-        vector_db=None,
-        semantic_retriever=None,
-        keyword_retriever=None,
-        hybrid_retriever=None
-    )
-    
+    require_known_knowledge_id(request.knowledge_id)
+
     try:
-        final_state = knowledge_graph.invoke(initial_state)
+        index = await run_in_threadpool(index_service.get, request.knowledge_id)
+
+        initial_state = KnowledgeState(
+            query=request.query,
+            search_method=request.search_method,
+            top_k=request.retrieval_setting.top_k,
+            score_threshold=request.retrieval_setting.score_threshold,
+            results=[],
+            **index.to_state()
+        )
+
+        final_state = await knowledge_graph.ainvoke(initial_state)
         results = final_state.get("results", [])
         
         response_records = []
@@ -489,6 +842,35 @@ async def retrieve_knowledge(
             "content": f"An error occurred: {str(e)}"
         }]}
 
+@app.post("/indexes/{knowledge_id}/reload")
+async def reload_index(
+    knowledge_id: str,
+    token: str = Depends(verify_api_key)):
+    """Rebuilds the cached index of a knowledge base"""
+
+    require_known_knowledge_id(knowledge_id)
+
+    try:
+        index = await run_in_threadpool(index_service.reload, knowledge_id)
+    except Exception as e:
+        logger.error(f"Error reloading knowledge index '{knowledge_id}': {str(e)}")
+
+        raise HTTPException(status_code=500, detail=f"Failed to reload index: {str(e)}")
+
+    return {"knowledge_id": knowledge_id, "status": "reloaded", "built_at": index.built_at}
+
+@app.delete("/indexes/{knowledge_id}")
+async def invalidate_index(
+    knowledge_id: str,
+    token: str = Depends(verify_api_key)):
+    """Drops the cached index of a knowledge base; it is rebuilt on the next request"""
+
+    require_known_knowledge_id(knowledge_id)
+
+    invalidated = await run_in_threadpool(index_service.invalidate, knowledge_id)
+
+    return {"knowledge_id": knowledge_id, "status": "invalidated" if invalidated else "not_loaded"}
+
 @app.get("/health")
 async def health_check():
     """Server health check endpoint"""
@@ -499,7 +881,10 @@ async def health_check():
         "openai_api_key_set": os.getenv("OPENAI_API_KEY") is not None,
         "data_directory_exists": DATA_DIR.exists(),
         "chroma_db_directory_exists": CHROMA_DB_DIR.exists(),
-        "pdf_exists": PDF_PATH.exists()
+        "pdf_exists": PDF_PATH.exists(),
+        "loaded_indexes": index_service.status(),
+        "query_batching": _embedding.embeddings.stats() if _embedding is not None else None,
+        "rerank_cache": _reranker.cache.stats() if _reranker is not None else None
     }
     
     return health_status
@@ -6,12 +6,30 @@ from typing import Dict
 from mcp.server.fastmcp import FastMCP
 from dotenv import load_dotenv
 
+from dify_client import DifyKnowledgeClient, DifyAPIError, DeadlineExceeded
+
 load_dotenv()
 
 API_ENDPOINT = os.getenv("DIFY_API_ENDPOINT", "http://localhost:8000/retrieval")
 API_KEY = os.getenv("DIFY_API_KEY", "dify-external-knowledge-api-key")
 KNOWLEDGE_ID = os.getenv("DIFY_KNOWLEDGE_ID", "test-knowledge-base")
 
+# Connection pool, retry and cache settings (DIFY_CACHE_TTL=0 disables the response cache)
+dify_client = DifyKnowledgeClient(
+    API_ENDPOINT,
+    API_KEY,
+    max_connections=int(os.getenv("DIFY_MAX_CONNECTIONS", "20")),
+    max_keepalive_connections=int(os.getenv("DIFY_MAX_KEEPALIVE_CONNECTIONS", "10")),
+    keepalive_expiry=float(os.getenv("DIFY_KEEPALIVE_EXPIRY", "30")),
+    http2=os.getenv("DIFY_HTTP2", "false").lower() == "true",
+    retries=int(os.getenv("DIFY_RETRIES", "2")),
+    backoff_base=float(os.getenv("DIFY_BACKOFF_BASE", "0.2")),
+    backoff_max=float(os.getenv("DIFY_BACKOFF_MAX", "2")),
+    deadline=float(os.getenv("DIFY_DEADLINE", "30")),
+    cache_ttl=float(os.getenv("DIFY_CACHE_TTL", "0")),
+    cache_size=int(os.getenv("DIFY_CACHE_SIZE", "256"))
+)
+
 mcp = FastMCP(
     name="Dify External Knowledge API",
     version="0.0.1",
@@ -97,48 +115,25 @@ async def dify_ek_search(
         if ctx:
             ctx.info(f"Calling Dify API: {API_ENDPOINT}")
         
-        request_data = {
-            "knowledge_id": KNOWLEDGE_ID,
-            "query": query,
-            "search_method": search_method,
-            "retrieval_setting": {
-                "top_k": top_k,
-                "score_threshold": score_threshold
-            }
-        }
-        
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                API_ENDPOINT,
-                headers={
-                    "Content-Type": "application/json",
-                    "Authorization": f"Bearer {API_KEY}"
-                },
-                json=request_data
-            )
-            
-            if response.status_code != 200:
-                error_message = f"Dify API error: HTTP {response.status_code}"
-                try:
-                    error_detail = response.json()
-                    if isinstance(error_detail, dict) and "error_msg" in error_detail:
-                        error_message += f" - {error_detail['error_msg']}"
-                except:
-                    error_message += f" - {response.text[:100]}"
-                
-                if ctx:
-                    ctx.error(error_message)
-                return f"Search failed\n\n{error_message}"
-            
-            try:
-                data = response.json()
-                return format_search_results(data)
-                
-            except json.JSONDecodeError:
-                if ctx:
-                    ctx.error("JSON parsing error")
-                return "Search failed\n\nCould not parse API response."
-            
+        data = await dify_client.search(KNOWLEDGE_ID, query, search_method, top_k, score_threshold)
+        return format_search_results(data)
+
+    except DifyAPIError as e:
+        if ctx:
+            ctx.error(str(e))
+        return f"Search failed\n\n{str(e)}"
+
+    except DeadlineExceeded as e:
+        error_message = f"API request error: {str(e)}"
+        if ctx:
+            ctx.error(error_message)
+        return f"Search failed\n\n{error_message}"
+
+    except json.JSONDecodeError:
+        if ctx:
+            ctx.error("JSON parsing error")
+        return "Search failed\n\nCould not parse API response."
+
     except httpx.RequestError as e:
         error_message = f"API request error: {str(e)}"
         if ctx:
@@ -151,6 +146,12 @@ async def dify_ek_search(
             ctx.error(error_message)
         return f"Search failed\n\n{error_message}"
 
+@mcp.resource("metrics://dify_ek_search")
+def get_search_metrics() -> str:
+    """Connection pool settings, retry and cache counters, and latency histograms of dify_ek_search."""
+
+    return json.dumps(dify_client.stats(), indent=2)
+
 @mcp.prompt()
 def ai_trend_learning_guide(
     topic: str = "",
@@ -252,7 +253,10 @@ def get_help() -> str:
             - `score_threshold`: Minimum relevance score (default: 0.5)
             - `search_method`: Search method (semantic, keyword, hybrid) (default: hybrid)
 
-            2. prompt(ai_trend_learning_guide)
+            2. resource(metrics://dify_ek_search)
+            - Upstream and per-search-method latency histograms, retry and cache counters
+
+            3. prompt(ai_trend_learning_guide)
             - `topic`: AI topic of interest (optional - e.g., "generative AI", "computer vision", "NLP")
             - `learning_level`: Learner level ("beginner", "intermediate", "advanced")
             - `time_horizon`: Learning plan duration ("short-term", "medium-term", "long-term")
@@ -0,0 +1,256 @@
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+import hashlib
+import threading
+
+from langchain_core.documents import Document
+
+RERANKER_TYPES = ("none", "cross-encoder", "flashrank")
+
+DEFAULT_RERANKER_MODELS = {
+    "cross-encoder": "BAAI/bge-reranker-v2-m3",
+    "flashrank": "ms-marco-MultiBERT-L-12"
+}
+
+# Scorer options accepted per reranker type; options of the other type are
+# ignored, so one configuration can hold the options of both
+RERANKER_PARAM_KEYS = {
+    "cross-encoder": ("batch_size", "max_length"),
+    "flashrank": ("max_length", "cache_dir")
+}
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_id(doc: Document) -> str:
+    """
+    Identify a chunk by its source, page and text.
+
+    Args:
+        doc: Document chunk
+
+    Returns:
+        Hex digest identifying the chunk
+    """
+
+    source = str(doc.metadata.get("source", ""))
+    page = str(doc.metadata.get("page", ""))
+    return text_hash("\x00".join([source, page, doc.page_content]))
+
+
+class CrossEncoderScorer:
+    """
+    Scores (query, passage) pairs with a sentence-transformers cross-encoder on CPU.
+    """
+
+    def __init__(self, model_name: str, batch_size: int = 32, max_length: int = 512) -> None:
+        try:
+            from sentence_transformers import CrossEncoder
+        except ImportError:
+            raise ImportError(
+                "sentence-transformers is required for the cross-encoder reranker. "
+                "Install it with: pip install sentence-transformers"
+            )
+
+        self.model = CrossEncoder(model_name, max_length=max_length, device="cpu")
+        self.batch_size = batch_size
+
+    def score(self, query: str, texts: List[str]) -> List[float]:
+        # Single-logit models get a sigmoid, so scores fall in [0, 1]
+        scores = self.model.predict([(query, text) for text in texts], batch_size=self.batch_size)
+        return [float(score) for score in scores]
+
+
+class FlashRankScorer:
+    """
+    Scores (query, passage) pairs with a FlashRank ONNX model.
+    """
+
+    def __init__(self, model_name: str, max_length: int = 512, cache_dir: Optional[str] = None) -> None:
+        try:
+            from flashrank import Ranker, RerankRequest
+        except ImportError:
+            raise ImportError("flashrank is required for the FlashRank reranker. Install it with: pip install flashrank")
+
+        options = {"cache_dir": cache_dir} if cache_dir else {}
+        self.ranker = Ranker(model_name=model_name, max_length=max_length, **options)
+        self.request_class = RerankRequest
+
+    def score(self, query: str, texts: List[str]) -> List[float]:
+        passages = [{"id": i, "text": text} for i, text in enumerate(texts)]
+        results = self.ranker.rerank(self.request_class(query=query, passages=passages))
+
+        scores = [0.0] * len(texts)
+        for result in results:
+            scores[result["id"]] = float(result["score"])
+        return scores
+
+
+class ScoreCache:
+    """
+    Thread-safe LRU cache of rerank scores keyed by (query hash, chunk id).
+    """
+
+    def __init__(self, max_size: int = 10000) -> None:
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._scores: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: Sequence[Tuple[str, str]]) -> Dict[Tuple[str, str], float]:
+        found = {}
+        with self._lock:
+            for key in keys:
+                score = self._scores.get(key)
+                if score is None:
+                    self.misses += 1
+                    continue
+                self._scores.move_to_end(key)
+                found[key] = score
+                self.hits += 1
+        return found
+
+    def put_many(self, scores: Dict[Tuple[str, str], float]) -> None:
+        with self._lock:
+            for key, score in scores.items():
+                self._scores[key] = score
+                self._scores.move_to_end(key)
+            while len(self._scores) > self.max_size:
+                self._scores.popitem(last=False)
+
+    def stats(self) -> Dict[str, float]:
+        """Return the size and hit/miss counters of the cache."""
+
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._scores),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0
+            }
+
+
+class Reranker:
+    """
+    Rerank stage applied after candidate retrieval.
+
+    The retriever fetches a deeper candidate set (candidates documents), the
+    scorer scores every uncached (query, candidate) pair in one batched
+    forward pass, and the best k candidates are returned with their rerank
+    scores. Scores are cached per (query, chunk), so repeated and paginated
+    queries skip the model entirely.
+    """
+
+    def __init__(self, scorer: Any, candidates: int = 20, cache_size: int = 10000) -> None:
+        """
+        Initialize the rerank stage.
+
+        Args:
+            scorer: Object with score(query, texts) -> one relevance score per text
+            candidates: Number of candidates retrieved for reranking
+            cache_size: Maximum number of cached (query, chunk) scores
+        """
+
+        self.scorer = scorer
+        self.candidates = candidates
+        self.cache = ScoreCache(cache_size)
+
+    def fetch_k(self, k: int) -> int:
+        return max(k, self.candidates)
+
+    def rerank(self,
+               query: str,
+               docs: List[Document],
+               k: int,
+               score_threshold: Optional[float] = None) -> List[Tuple[Document, float]]:
+        """
+        Reorder candidates by cross-encoder relevance.
+
+        Args:
+            query: Search query
+            docs: Candidate documents
+            k: Number of results to return
+            score_threshold: Minimum rerank score for a result to be kept
+
+        Returns:
+            List of (document, rerank score) pairs, best first
+        """
+
+        if not docs:
+            return []
+
+        query_hash = text_hash(query)
+        keys = [(query_hash, chunk_id(doc)) for doc in docs]
+        scores = self.cache.get_many(keys)
+
+        missing = {}
+        for key, doc in zip(keys, docs):
+            if key not in scores:
+                missing.setdefault(key, doc.page_content)
+
+        if missing:
+            computed = dict(zip(missing.keys(), self.scorer.score(query, list(missing.values()))))
+            self.cache.put_many(computed)
+            scores.update(computed)
+
+        ranked = sorted(
+            ((doc, scores[key]) for doc, key in zip(docs, keys)),
+            key=lambda item: item[1],
+            reverse=True
+        )
+        if score_threshold is not None:
+            ranked = [(doc, score) for doc, score in ranked if score >= score_threshold]
+
+        return ranked[:k]
+
+
+def create_reranker(reranker_type: str,
+                    model_name: Optional[str] = None,
+                    candidates: int = 20,
+                    cache_size: int = 10000,
+                    **params: Any) -> Optional[Reranker]:
+    """
+    Create a rerank stage.
+
+    Args:
+        reranker_type: "none", "cross-encoder" or "flashrank"
+        model_name: Reranker model (default: DEFAULT_RERANKER_MODELS[reranker_type])
+        candidates: Number of candidates retrieved for reranking
+        cache_size: Maximum number of cached (query, chunk) scores
+        **params: Scorer options (batch_size and max_length for the cross-encoder;
+            max_length and cache_dir for FlashRank)
+
+    Returns:
+        The reranker, or None for "none"
+
+    Raises:
+        ValueError: If reranker_type is unknown, or params holds options that
+            belong to no reranker type
+    """
+
+    if reranker_type not in RERANKER_TYPES:
+        raise ValueError(f"Unknown reranker type: {reranker_type}. Expected one of {RERANKER_TYPES}.")
+
+    if reranker_type == "none":
+        return None
+
+    known = {key for keys in RERANKER_PARAM_KEYS.values() for key in keys}
+    unknown = sorted(key for key in params if key not in known)
+    if unknown:
+        raise ValueError(
+            f"Unknown options for the {reranker_type} reranker: {unknown}. "
+            f"Expected any of {RERANKER_PARAM_KEYS[reranker_type]}."
+        )
+    params = {key: value for key, value in params.items() if key in RERANKER_PARAM_KEYS[reranker_type]}
+
+    model_name = model_name or DEFAULT_RERANKER_MODELS[reranker_type]
+    if reranker_type == "cross-encoder":
+        scorer = CrossEncoderScorer(model_name, **params)
+    else:
+        scorer = FlashRankScorer(model_name, **params)
+
+    return Reranker(scorer, candidates=candidates, cache_size=cache_size)
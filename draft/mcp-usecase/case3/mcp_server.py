@@ -1,19 +1,34 @@
 import os
-import requests
 
 from dotenv import load_dotenv
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import FastMCP, Context
+
+from workflow_client import DifyWorkflowClient, WorkflowError
 
 load_dotenv()
 
+# Characters of streamed text collected before they are relayed to the client
+TEXT_FLUSH_CHARS = 200
+
 mcp = FastMCP(
     name="Dify Workflow",
     version="0.0.1",
     description="Retrieve Dify Workflow execution results"
 )
 
+# Shared by all tool calls (DIFY_RESPONSE_MODE: "streaming" or "blocking")
+workflow_client = DifyWorkflowClient(
+    os.getenv("DIFY_BASE_URL"),
+    os.getenv("DIFY_APP_SK"),
+    response_mode=os.getenv("DIFY_RESPONSE_MODE", "streaming"),
+    max_concurrent_runs=int(os.getenv("DIFY_MAX_CONCURRENT_RUNS", "4")),
+    timeout=float(os.getenv("DIFY_WORKFLOW_TIMEOUT", "300")),
+    max_connections=int(os.getenv("DIFY_MAX_CONNECTIONS", "20")),
+    max_keepalive_connections=int(os.getenv("DIFY_MAX_KEEPALIVE_CONNECTIONS", "10"))
+)
+
 @mcp.tool()
-async def dify_workflow(input: str) -> str:
+async def dify_workflow(input: str, ctx: Context = None) -> str:
     """
     Executes a Dify workflow and returns the results.
     Automates complex AI tasks and provides immediate results.
@@ -24,30 +39,38 @@ async def dify_workflow(input: str) -> str:
         
     """
 
-    dify_base_url = os.getenv("DIFY_BASE_URL")
-    dify_app_sk = os.getenv("DIFY_APP_SK")
-    
-    url = f"{dify_base_url}/workflows/run"
-    headers = {
-        "Authorization": f"Bearer {dify_app_sk}",
-        "Content-Type": "application/json"
-    }
-    data = {
-        "inputs": {"input": input},
-        "response_mode": "blocking",
-        "user": "default_user",
-    }
-    
-    response = requests.post(url, headers=headers, json=data)
-    response.raise_for_status()
-    result = response.json()
-    
-    outputs = {}
+    finished_nodes = 0
+    text_chunks = []
+    pending_text = []
 
-    if "outputs" in result.get("data", {}):
-        outputs = result["data"]["outputs"]
-    
-    return next(iter(outputs.values()), "No output received from Dify workflow.")
+    async def flush_text() -> None:
+        if pending_text and ctx:
+            await ctx.info("".join(pending_text))
+        pending_text.clear()
+
+    async def on_event(name: str, data: dict) -> None:
+        # Partial outputs: node completions as progress, generated text as log messages
+        nonlocal finished_nodes
+        if name == "text_chunk":
+            text_chunks.append(data.get("text", ""))
+            pending_text.append(data.get("text", ""))
+            if sum(len(text) for text in pending_text) >= TEXT_FLUSH_CHARS:
+                await flush_text()
+        elif name == "node_finished":
+            finished_nodes += 1
+            await flush_text()
+            if ctx:
+                await ctx.report_progress(finished_nodes)
+                await ctx.info(f"Node finished: {data.get('title', data.get('node_type', ''))}")
+        elif name == "workflow_finished":
+            await flush_text()
+
+    try:
+        outputs = await workflow_client.run({"input": input}, on_event=on_event)
+    except TimeoutError:
+        raise WorkflowError(f"Dify workflow timed out after {workflow_client.timeout:g}s.")
+
+    return next(iter(outputs.values()), "".join(text_chunks) or "No output received from Dify workflow.")
 
 if __name__ == "__main__":
-    mcp.run()
\ No newline at end of file
+    mcp.run()
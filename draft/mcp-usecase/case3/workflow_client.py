@@ -0,0 +1,197 @@
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+import asyncio
+import json
+
+import httpx
+from httpx_sse import aconnect_sse
+
+RESPONSE_MODES = ("streaming", "blocking")
+
+# Seconds allowed for the request that stops an aborted run
+STOP_TIMEOUT = 10.0
+
+EventCallback = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
+
+class WorkflowError(Exception):
+    """The workflow run failed or was stopped on the Dify side."""
+
+
+class DifyWorkflowClient:
+    """
+    Process-wide client for the Dify workflow API.
+
+    All tool calls share one pooled httpx.AsyncClient, so the event loop is
+    never blocked and connections are reused. At most max_concurrent_runs
+    workflows run at once; other calls wait for a slot. In streaming mode the
+    server-sent events of a run are passed to a callback as they arrive, and a
+    run that times out or whose caller is cancelled is stopped upstream
+    through the workflow stop API instead of being left running.
+    """
+
+    def __init__(self,
+                 base_url: str,
+                 api_key: str,
+                 response_mode: str = "streaming",
+                 max_concurrent_runs: int = 4,
+                 timeout: float = 300.0,
+                 max_connections: int = 20,
+                 max_keepalive_connections: int = 10) -> None:
+        """
+        Configure the client; the connection pool is opened on first use.
+
+        Args:
+            base_url: Dify API base URL (e.g. https://api.dify.ai/v1)
+            api_key: App secret key
+            response_mode: "streaming" or "blocking"
+            max_concurrent_runs: Maximum number of workflow runs in flight
+            timeout: Seconds a run may take, waiting for a slot included
+            max_connections: Maximum number of open connections
+            max_keepalive_connections: Maximum number of idle connections kept open
+
+        Raises:
+            ValueError: If response_mode is unknown
+        """
+
+        if response_mode not in RESPONSE_MODES:
+            raise ValueError(f"Unknown response mode: {response_mode}. Expected one of {RESPONSE_MODES}.")
+
+        self.base_url = (base_url or "").rstrip("/")
+        self.api_key = api_key
+        self.response_mode = response_mode
+        self.timeout = timeout
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections
+        )
+        self._slots = asyncio.Semaphore(max_concurrent_runs)
+        self._client: Optional[httpx.AsyncClient] = None
+        # Stop requests outlive the cancelled tool call that issued them
+        self._stops: Set[asyncio.Task] = set()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created lazily, inside the server's event loop
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json"
+                },
+                limits=self.limits,
+                # Streaming runs may stay silent between events; the run timeout bounds them
+                timeout=httpx.Timeout(30.0, read=None)
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def run(self,
+                  inputs: Dict[str, Any],
+                  user: str = "default_user",
+                  on_event: Optional[EventCallback] = None) -> Dict[str, Any]:
+        """
+        Run the workflow and return its outputs.
+
+        Args:
+            inputs: Workflow input variables
+            user: End-user identifier sent to Dify
+            on_event: Coroutine called with (event name, event data) for every
+                streamed event
+
+        Returns:
+            Outputs of the finished workflow run
+
+        Raises:
+            WorkflowError: If the run fails or is stopped
+            TimeoutError: If the run does not finish within the timeout
+            httpx.HTTPError: If the API request fails
+        """
+
+        async with asyncio.timeout(self.timeout):
+            async with self._slots:
+                if self.response_mode == "blocking":
+                    return await self._run_blocking(inputs, user)
+                return await self._run_streaming(inputs, user, on_event)
+
+    async def _run_blocking(self, inputs: Dict[str, Any], user: str) -> Dict[str, Any]:
+        # The task id only arrives with the result, so a blocking run cannot be stopped
+        response = await self.client.post(
+            f"{self.base_url}/workflows/run",
+            json={"inputs": inputs, "response_mode": "blocking", "user": user}
+        )
+        response.raise_for_status()
+        return self._outputs(response.json().get("data", {}))
+
+    async def _run_streaming(self,
+                             inputs: Dict[str, Any],
+                             user: str,
+                             on_event: Optional[EventCallback]) -> Dict[str, Any]:
+        task_id = None
+        try:
+            async with aconnect_sse(
+                self.client,
+                "POST",
+                f"{self.base_url}/workflows/run",
+                json={"inputs": inputs, "response_mode": "streaming", "user": user}
+            ) as event_source:
+                if event_source.response.is_error:
+                    await event_source.response.aread()
+                    event_source.response.raise_for_status()
+
+                async for sse in event_source.aiter_sse():
+                    if not sse.data:
+                        continue
+                    event = json.loads(sse.data)
+                    name = event.get("event", sse.event)
+                    task_id = task_id or event.get("task_id")
+
+                    if name == "error":
+                        raise WorkflowError(event.get("message", "Dify workflow error"))
+                    if on_event is not None and name != "ping":
+                        await on_event(name, event.get("data", {}))
+                    if name == "workflow_finished":
+                        return self._outputs(event.get("data", {}))
+
+            raise WorkflowError("Dify workflow stream ended before the run finished.")
+
+        except (asyncio.CancelledError, TimeoutError):
+            if task_id is not None:
+                self._stop_in_background(task_id, user)
+            raise
+
+    @staticmethod
+    def _outputs(data: Dict[str, Any]) -> Dict[str, Any]:
+        if data.get("status") in ("failed", "stopped"):
+            raise WorkflowError(f"Dify workflow {data['status']}: {data.get('error') or 'no details'}")
+        return data.get("outputs") or {}
+
+    def _stop_in_background(self, task_id: str, user: str) -> None:
+        task = asyncio.get_running_loop().create_task(self.stop(task_id, user))
+        self._stops.add(task)
+        task.add_done_callback(self._stops.discard)
+
+    async def stop(self, task_id: str, user: str = "default_user") -> bool:
+        """
+        Stop a running workflow task.
+
+        Args:
+            task_id: Task ID from the streamed events
+            user: End-user identifier the run was started with
+
+        Returns:
+            True if Dify accepted the stop request
+        """
+
+        try:
+            response = await self.client.post(
+                f"{self.base_url}/workflows/tasks/{task_id}/stop",
+                json={"user": user},
+                timeout=STOP_TIMEOUT
+            )
+            return response.status_code == 200
+        except httpx.HTTPError:
+            return False